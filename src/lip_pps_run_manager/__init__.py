@@ -1,8 +1,41 @@
 __version__ = '0.3.0'
 
-from .run_manager import RunManager
-from .run_manager import TaskManager
-from .setup_manager import SetupManager
-from .telegram_reporter import TelegramReporter
+import importlib
 
-__all__ = ["RunManager", "TaskManager", "TelegramReporter", "SetupManager"]
+# The classes are imported from their modules when first used, so that importing the package is fast
+_lazy_attributes = {
+    "RunManager": "run_manager",
+    "TaskManager": "run_manager",
+    "TelegramReporter": "telegram_reporter",
+    "AsyncTelegramReporter": "async_telegram_reporter",
+    "TelegramOutbox": "outbox",
+    "RateLimiter": "rate_limiter",
+    "RetryPolicy": "retry",
+    "CircuitBreaker": "retry",
+    "SharedProgressCounter": "progress",
+    "ProgressEstimator": "progress",
+    "LinearEstimator": "progress",
+    "SlidingWindowEstimator": "progress",
+    "EWMAEstimator": "progress",
+    "RunCatalog": "catalog",
+    "RunScanner": "scanner",
+    "BackupStore": "backup_store",
+    "TaskGraph": "task_graph",
+    "RunBatch": "batch",
+    "SetupManager": "setup_manager",
+}
+
+__all__ = list(_lazy_attributes)
+
+
+def __getattr__(name: str):
+    """Import the classes of the package when first used"""
+    if name not in _lazy_attributes:
+        raise AttributeError("module {} has no attribute {}".format(repr(__name__), repr(name)))
+    value = getattr(importlib.import_module("." + _lazy_attributes[name], __name__), name)
+    globals()[name] = value  # Later uses do not go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
@@ -0,0 +1,561 @@
+# -*- coding: utf-8 -*-
+"""The Async Telegram Reporter module
+
+Contains the asyncio counterpart of the `TelegramReporter`, to report to
+telegram from asyncio code without blocking the event loop.
+
+"""
+
+import asyncio
+import logging
+import threading
+import warnings
+from concurrent.futures import Future
+
+import requests
+
+from lip_pps_run_manager.rate_limiter import RateLimiter
+from lip_pps_run_manager.rate_limiter import get_shared_rate_limiter
+from lip_pps_run_manager.retry import CircuitBreaker
+from lip_pps_run_manager.retry import CircuitOpenError
+from lip_pps_run_manager.retry import RetryPolicy
+from lip_pps_run_manager.telegram_reporter import TelegramAPIError
+
+_logger = logging.getLogger(__name__)
+
+_shared_sessions = {}
+_shared_sessions_lock = threading.Lock()
+
+
+def get_shared_session(bot_token: str, pool_size: int = 10) -> requests.Session:
+    """Get the HTTP session shared by all the asyncio reporters of a bot in this process
+
+    The session keeps a pool of keep-alive connections to the telegram
+    bot API, so that consecutive requests do not pay for a new
+    connection and TLS handshake each time.
+
+    Parameters
+    ----------
+    bot_token
+        The token of the telegram bot
+    pool_size
+        The maximum number of connections kept in the pool, only used
+        when the session is created
+
+    Returns
+    -------
+    requests.Session
+        The session of the bot
+
+    """
+    with _shared_sessions_lock:
+        if bot_token not in _shared_sessions:
+            session = requests.Session()
+            session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+            _shared_sessions[bot_token] = session
+        return _shared_sessions[bot_token]
+
+
+class AsyncTelegramReporter:
+    """Class to report to telegram from asyncio code
+
+    This class is the asyncio counterpart of the `TelegramReporter`,
+    `send_message` and `edit_message` are coroutines which never block
+    the event loop: the rate limits and retry delays are awaited with
+    `asyncio.sleep` and only the HTTP request itself runs in the default
+    executor of the loop. The requests go through an HTTP session shared
+    by all the asyncio reporters of the same bot, which keeps the
+    connections to telegram alive. The rate limit semantics are the same
+    as for the `TelegramReporter`, including the rate limiter shared by
+    all the reporters of a bot.
+
+    For code which is not a coroutine but runs in the event loop (e.g.
+    the `loop_tick` method of a `TaskManager` used with `async with`),
+    `submit_message` and `submit_edit` schedule the requests on the loop
+    and return right away. As with the `TelegramReporter`, the edits of
+    a message are made one after the other, in order, and the pending
+    edits of a message are coalesced so only the newest text is sent.
+
+    Parameters
+    ----------
+    bot_token
+        The telegram bot token to use (this value should be a secret, so do not share it)
+    chat_id
+        The telegram chat ID the reporter should send messages to
+    rate_limit
+        If set, messages will be delayed to respect the rate limits set
+        by telegram
+    rate_limiter
+        The `RateLimiter` to use when `rate_limit` is set. If `None`,
+        the rate limiter shared by all the reporters of the same bot in
+        this process is used
+    retry_policy
+        The `RetryPolicy` used to retry failed requests. If `None`, the
+        default `RetryPolicy` is used
+    circuit_breaker
+        The `CircuitBreaker` used to stop sending requests for a while
+        after repeated connection failures. If `None`, the default
+        `CircuitBreaker` is used
+    session
+        The HTTP session used for the requests. If `None`, the session
+        shared by all the asyncio reporters of the same bot is used, see
+        `get_shared_session`
+
+    Attributes
+    ----------
+    bot_token
+    chat_id
+    asynchronous
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> import lip_pps_run_manager as RM
+    >>> async def main():
+    ...   bot = RM.AsyncTelegramReporter("SecretBotToken", "PostToThisChat_ID")
+    ...   await bot.send_message("Hello World!")
+    >>> asyncio.run(main())
+
+    """
+
+    _bot_token = None
+    _chat_id = None
+    _session = None
+
+    _rate_limit = True
+    _rate_limiter = None
+    _retry_policy = None
+    _circuit_breaker = None
+
+    _loop = None
+    _submitted = None
+    _closed = False
+    _pending_edits = None
+    _pending_futures = None
+    _pending_lock = None
+    _edit_locks = None
+
+    def __init__(
+        self,
+        bot_token: str,
+        chat_id: str,
+        rate_limit: bool = True,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        session: requests.Session = None,
+    ):
+        if not isinstance(bot_token, str):
+            raise TypeError("The `bot_token` must be a str type object, received object of type {}".format(type(bot_token)))
+
+        if not isinstance(chat_id, str):
+            raise TypeError("The `chat_id` must be a str type object, received object of type {}".format(type(chat_id)))
+
+        if not isinstance(rate_limit, bool):
+            raise TypeError("The `rate_limit` must be a bool type object, received object of type {}".format(type(rate_limit)))
+
+        if rate_limiter is not None and not isinstance(rate_limiter, RateLimiter):
+            raise TypeError(
+                "The `rate_limiter` must be a RateLimiter type object or None, received object of type {}".format(type(rate_limiter))
+            )
+
+        if retry_policy is not None and not isinstance(retry_policy, RetryPolicy):
+            raise TypeError(
+                "The `retry_policy` must be a RetryPolicy type object or None, received object of type {}".format(type(retry_policy))
+            )
+
+        if circuit_breaker is not None and not isinstance(circuit_breaker, CircuitBreaker):
+            raise TypeError(
+                "The `circuit_breaker` must be a CircuitBreaker type object or None, received object of type {}".format(
+                    type(circuit_breaker)
+                )
+            )
+
+        self._bot_token = bot_token
+        self._chat_id = chat_id
+        self._session = session if session is not None else get_shared_session(bot_token)
+        self._rate_limit = rate_limit
+        if rate_limit:
+            self._rate_limiter = rate_limiter if rate_limiter is not None else get_shared_rate_limiter(bot_token)
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self._submitted = set()
+        self._closed = False
+        self._pending_edits = {}
+        self._pending_futures = {}
+        self._pending_lock = threading.Lock()
+        self._edit_locks = {}
+
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None  # Set by the first coroutine which runs
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "AsyncTelegramReporter({}, {}, rate_limit={})".format(repr(self.bot_token), repr(self.chat_id), repr(self._rate_limit))
+
+    @property
+    def bot_token(self) -> str:
+        """The token of the telegram bot property getter method"""
+        return self._bot_token
+
+    @property
+    def chat_id(self) -> str:
+        """The chat ID property getter method"""
+        return self._chat_id
+
+    @property
+    def asynchronous(self) -> bool:
+        """Whether the reporter delivers messages without blocking the caller, always true"""
+        return True
+
+    @property
+    def outbox(self):
+        """The outbox of the reporter, outboxes are not supported by the asyncio reporter"""
+        return None
+
+    async def _wait_for_rate_limit(self):
+        """Internal coroutine which sleeps until the rate limits allow a new message to be sent"""
+        if self._rate_limit:
+            wait = self._rate_limiter.reserve(self.chat_id)
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self._rate_limiter.reserve(self.chat_id)
+
+    async def _call_api(self, api_method: str, data: dict, use_post: bool, rate_limit_acquired: bool = False):
+        """Internal coroutine to make a request to the telegram bot API, retrying if needed.
+
+        Follows the same retry and circuit breaker logic as the
+        `TelegramReporter`, but all the waiting is done with
+        `asyncio.sleep` and the request runs in the default executor.
+        If `rate_limit_acquired` is set, the caller already waited for
+        the rate limit of the first attempt.
+
+        Raises
+        ------
+        CircuitOpenError
+            If the circuit breaker is open
+        TelegramAPIError
+            If telegram answered with an error which is not transient or
+            if there are no retries left
+        Exception
+            The exception of the last attempt if there are no retries left
+
+        Returns
+        -------
+        json
+            The decoded json response of telegram
+
+        """
+        self._loop = asyncio.get_running_loop()
+        url = "https://api.telegram.org/bot{}/{}".format(self.bot_token, api_method)
+        request = self._session.post if use_post else self._session.get
+
+        attempt = 0
+        while True:
+            if not self._circuit_breaker.allow():
+                raise CircuitOpenError(
+                    "Telegram could not be reached recently, not trying again for {:.0f} s".format(
+                        self._circuit_breaker.remaining_cool_down
+                    )
+                )
+
+            if attempt > 0 or not rate_limit_acquired:
+                await self._wait_for_rate_limit()
+
+            retry_after = None
+            try:
+                response = await self._loop.run_in_executor(None, lambda: request(url, data=data, timeout=1))
+                response_json = response.json()
+                if not response_json["ok"]:
+                    raise TelegramAPIError(response_json)
+                self._circuit_breaker.record_success()
+                return response_json
+            except TelegramAPIError as e:
+                if not e.is_transient:
+                    self._circuit_breaker.record_success()  # Telegram was reached, so the connection is fine
+                    raise
+                if e.error_code != 429:
+                    self._circuit_breaker.record_failure()
+                retry_after = e.retry_after
+                if attempt >= self._retry_policy.max_retries:
+                    raise
+            except (requests.ConnectionError, requests.Timeout, ValueError):
+                self._circuit_breaker.record_failure()
+                if attempt >= self._retry_policy.max_retries:
+                    raise
+
+            await asyncio.sleep(self._retry_policy.delay(attempt, retry_after))
+            attempt += 1
+
+    async def _resolve_message_id(self, message_id):
+        """Internal coroutine to get the message ID out of a `Future` returned by a submission"""
+        if isinstance(message_id, Future):
+            message_id = await asyncio.wrap_future(message_id)
+        return message_id
+
+    async def _send_message(self, message_text: str, reply_to_message_id=None):
+        """Internal coroutine to send a message, without type checks or protections for exceptions"""
+        message_params = {'chat_id': self.chat_id, 'text': message_text}
+        reply_to_message_id = await self._resolve_message_id(reply_to_message_id)
+        if reply_to_message_id is not None:
+            message_params["reply_to_message_id"] = reply_to_message_id
+
+        return await self._call_api("sendMessage", message_params, use_post=False)
+
+    async def _edit_message(self, message_text: str, message_id, rate_limit_acquired: bool = False):
+        """Internal coroutine to edit a message, without type checks or protections for exceptions"""
+        message_id = await self._resolve_message_id(message_id)
+        return await self._call_api(
+            "editMessageText",
+            {
+                "chat_id": self.chat_id,
+                "text": message_text,
+                "message_id": message_id,
+            },
+            use_post=True,
+            rate_limit_acquired=rate_limit_acquired,
+        )
+
+    async def _edit_pending_message(self, message_id):
+        """Internal coroutine to send the newest pending edit of a message, after the previous edits of the message
+
+        The text is only taken from the pending edits once the previous
+        edits are done and the rate limit allows the edit to be sent, so
+        that only the newest text is sent.
+        """
+        lock = self._edit_locks.setdefault(message_id, asyncio.Lock())
+        try:
+            async with lock:
+                await self._wait_for_rate_limit()
+                with self._pending_lock:
+                    message_text = self._pending_edits.pop(message_id)
+                    self._pending_futures.pop(message_id)
+                return await self._edit_message(message_text, message_id, rate_limit_acquired=True)
+        finally:
+            with self._pending_lock:
+                if message_id not in self._pending_edits:
+                    self._edit_locks.pop(message_id, None)  # No other edit of the message is waiting for the lock
+
+    async def send_message(self, message_text: str, reply_to_message_id: str = None):
+        """Send a message to the chat using the bot.
+
+        Transient failures are retried according to the retry policy of
+        the reporter. If the message still can not be sent, a warning is
+        issued and `None` is returned.
+
+        Parameters
+        ----------
+        message_text
+            The message the bot should send to the chat
+        reply_to_message_id
+            If the message is in reply to another message, place the ID
+            of the message being replied to here
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the wrong type
+        Warning
+            If any irregularity, leading to an exception occurs, it is reinterpreted as a warning
+
+        Returns
+        -------
+        json
+            The decoded json response of telegram, or `None` on failure
+
+        """
+        if not isinstance(message_text, str):
+            raise TypeError("The `message_text` must be a str type object, received object of type {}".format(type(message_text)))
+
+        if reply_to_message_id is not None and not isinstance(reply_to_message_id, str):
+            raise TypeError(
+                "The `reply_to_message_id` must be a str type object, received object of type {}".format(type(reply_to_message_id))
+            )
+
+        try:
+            return await self._send_message(message_text, reply_to_message_id)
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            warnings.warn("Failed sending to telegram. Reason: {}".format(repr(e)), category=RuntimeWarning)
+
+    async def edit_message(self, message_text: str, message_id: str):
+        """Edit a message that was previously sent to the chat using the bot.
+
+        Transient failures are retried according to the retry policy of
+        the reporter. If the message still can not be edited, a warning
+        is issued and `None` is returned.
+
+        Parameters
+        ----------
+        message_text
+            The message the bot should change to message to
+        message_id
+            The ID of the message to edit
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the wrong type
+        Warning
+            If any irregularity, leading to an exception occurs, it is reinterpreted as a warning
+
+        Returns
+        -------
+        json
+            The decoded json response of telegram, or `None` on failure
+
+        """
+        if not isinstance(message_text, str):
+            raise TypeError("The `message_text` must be a str type object, received object of type {}".format(type(message_text)))
+
+        if not isinstance(message_id, str):
+            raise TypeError("The `message_id` must be a str type object, received object of type {}".format(type(message_id)))
+
+        try:
+            return await self._edit_message(message_text, message_id)
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            warnings.warn("Failed sending to telegram. Reason: {}".format(repr(e)), category=RuntimeWarning)
+
+    async def _run_submitted(self, coroutine) -> str:
+        """Internal coroutine wrapping a submitted request, failures are logged since nobody awaits them"""
+        try:
+            response = await coroutine
+            return str(response['result']['message_id'])
+        except Exception as e:
+            _logger.warning("Failed sending to telegram. Reason: {}".format(repr(e)))
+            raise
+
+    def _submit(self, coroutine) -> Future:
+        """Internal function to schedule a request on the event loop of the reporter"""
+        if self._closed:
+            coroutine.close()
+            raise RuntimeError("The AsyncTelegramReporter has been closed, no more messages can be submitted")
+
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is None:
+                coroutine.close()
+                raise RuntimeError("The AsyncTelegramReporter does not know which event loop to submit the message to")
+
+        future = asyncio.run_coroutine_threadsafe(self._run_submitted(coroutine), self._loop)
+        self._submitted.add(future)
+        future.add_done_callback(self._submitted.discard)
+        return future
+
+    def submit_message(self, message_text: str, reply_to_message_id=None) -> Future:
+        """Schedule a message to be sent to the chat on the event loop.
+
+        The call returns right away, the message is sent the next time
+        the running coroutine awaits.
+
+        Parameters
+        ----------
+        message_text
+            The message the bot should send to the chat
+        reply_to_message_id
+            If the message is in reply to another message, place the ID
+            of the message being replied to here. A `Future` returned by
+            a previous submission is also accepted
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the wrong type
+        RuntimeError
+            If the reporter has been closed
+
+        Returns
+        -------
+        Future
+            A future which resolves to the ID of the sent message
+
+        """
+        if not isinstance(message_text, str):
+            raise TypeError("The `message_text` must be a str type object, received object of type {}".format(type(message_text)))
+
+        if reply_to_message_id is not None and not isinstance(reply_to_message_id, (str, Future)):
+            raise TypeError(
+                "The `reply_to_message_id` must be a str or Future type object, received object of type {}".format(
+                    type(reply_to_message_id)
+                )
+            )
+
+        return self._submit(self._send_message(message_text, reply_to_message_id))
+
+    def submit_edit(self, message_text: str, message_id) -> Future:
+        """Schedule an edit of a previously sent message on the event loop.
+
+        The call returns right away, the edit is made the next time the
+        running coroutine awaits, after the previous edits of the same
+        message. If an edit of the message is already pending, its text
+        is replaced and its future is returned instead.
+
+        Parameters
+        ----------
+        message_text
+            The message the bot should change to message to
+        message_id
+            The ID of the message to edit. A `Future` returned by a
+            previous submission is also accepted
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the wrong type
+        RuntimeError
+            If the reporter has been closed
+
+        Returns
+        -------
+        Future
+            A future which resolves to the ID of the edited message
+
+        """
+        if not isinstance(message_text, str):
+            raise TypeError("The `message_text` must be a str type object, received object of type {}".format(type(message_text)))
+
+        if not isinstance(message_id, (str, Future)):
+            raise TypeError("The `message_id` must be a str or Future type object, received object of type {}".format(type(message_id)))
+
+        with self._pending_lock:
+            if message_id in self._pending_edits:
+                self._pending_edits[message_id] = message_text
+                return self._pending_futures[message_id]
+
+            self._pending_edits[message_id] = message_text
+            try:
+                future = self._submit(self._edit_pending_message(message_id))
+            except RuntimeError:
+                del self._pending_edits[message_id]
+                raise
+            self._pending_futures[message_id] = future
+            return future
+
+    async def flush(self):
+        """Wait until all the submitted requests have been processed"""
+        while self._submitted:
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in list(self._submitted)], return_exceptions=True)
+
+    def close(self):
+        """Stop accepting new submissions, the ones already made are still delivered
+
+        Since this method can not block the event loop, use `aclose` to
+        also wait for the submitted requests to be delivered.
+        """
+        self._closed = True
+
+    async def aclose(self):
+        """Stop accepting new submissions and wait for the ones already made to be delivered"""
+        self.close()
+        await self.flush()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""The Backup Index module
+
+Contains the class used to remember which files were backed up, so
+that the backups of unchanged files can be skipped.
+
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from lip_pps_run_manager.backup_store import _hash_file
+
+index_file_name = "backup_index.json"
+
+_index_version = 1
+
+
+class BackupIndex:
+    """Class to keep the index of the backups of a directory
+
+    The index is a json sidecar file in the directory with the backups,
+    with an entry for each backup holding the size and modification
+    time of the source file when it was backed up and, optionally, the
+    sha256 checksum of its content. A file is unchanged if its size and
+    modification time match the ones in the index or, when comparing
+    checksums, if its checksum matches even though it was touched.
+
+    The index can be used by several threads at once, it is written to
+    disk, atomically, with `save`, merged with the entries other indexes
+    of the same directory saved in the meantime.
+
+    Parameters
+    ----------
+    path_to_directory
+        The path to the directory with the backups
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    """
+
+    _path_directory = None
+
+    def __init__(self, path_to_directory: Path):
+        if not isinstance(path_to_directory, Path):
+            raise TypeError(
+                "The `path_to_directory` must be a Path type object, received object of type {}".format(type(path_to_directory))
+            )
+
+        self._path_directory = path_to_directory
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._recorded = set()
+
+    def _load(self) -> dict:
+        """Internal method to read the entries of the index file, empty if there is no readable index"""
+        try:
+            with open(self.path, "r", encoding="utf8") as in_file:
+                content = json.load(in_file)
+            if isinstance(content, dict) and content.get("version") == _index_version:
+                return content.get("files", {})
+        except (FileNotFoundError, ValueError):
+            pass  # An unreadable index is rebuilt from scratch
+        return {}
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "BackupIndex({})".format(repr(self._path_directory))
+
+    @property
+    def path(self) -> Path:
+        """The path to the index file property getter method"""
+        return self._path_directory / index_file_name
+
+    def needs_backup(self, source: Path, destination: Path, compare_hash: bool = False, compare_size: bool = True):
+        """Check whether a file changed since it was backed up
+
+        Parameters
+        ----------
+        source
+            The path to the file
+        destination
+            The path to the backup of the file
+        compare_hash
+            If set, a file whose size matches but whose modification
+            time does not is compared by its checksum, which is computed
+        compare_size
+            If set, the size of the backup must be the size of the file.
+            Unset it for backups which are not copies of the file, such
+            as the manifests of a `BackupStore`
+
+        Returns
+        -------
+        str or bool
+            `False` if the backup is up to date. Otherwise, the
+            checksum of the file if it was computed, else `True`. A
+            backup made from another file with the same name is never
+            up to date
+
+        """
+        stat = source.stat()
+        with self._lock:
+            entry = self._entries.get(destination.name)
+        if entry is not None and entry.get("source") != str(source.resolve()):
+            entry = None
+        stale = entry is None or not destination.is_file() or entry["size"] != stat.st_size
+        if stale or (compare_size and destination.stat().st_size != stat.st_size):
+            return _hash_file(source) if compare_hash else True
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return False
+        if not compare_hash:
+            return True
+
+        digest = _hash_file(source)
+        if digest != entry.get("sha256"):
+            return digest
+        with self._lock:
+            entry["mtime_ns"] = stat.st_mtime_ns  # Only touched, remember the new modification time
+        return False
+
+    def record(self, source: Path, destination: Path, digest: str = None):
+        """Record the backup of a file
+
+        Parameters
+        ----------
+        source
+            The path to the file
+        destination
+            The path to the backup of the file
+        digest
+            The sha256 checksum of the file, if known
+
+        """
+        stat = source.stat()
+        with self._lock:
+            self._entries[destination.name] = {
+                "source": str(source.resolve()),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest,
+            }
+            self._recorded.add(destination.name)
+
+    def save(self):
+        """Write the index to disk, atomically
+
+        The entries recorded with this index take precedence over the
+        ones on disk, the other entries on disk are kept, so that the
+        indexes of the same directory do not overwrite each other.
+        """
+        tmp_path = self.path.with_name(index_file_name + ".{}.tmp".format(threading.get_ident()))
+        with self._lock:
+            entries = self._load()
+            entries.update({name: self._entries[name] for name in self._recorded})
+            self._entries.update(entries)
+            with open(tmp_path, "w", encoding="utf8") as out_file:
+                json.dump({"version": _index_version, "files": entries}, out_file, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+"""The Backup Store module
+
+Contains the class used to keep the backups of files without storing
+the same content more than once.
+
+"""
+
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+from lip_pps_run_manager import __version__
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # Optional, install the zstd extra to use zstd compressed backups
+
+_chunk_size = 1024 * 1024
+
+backup_compressions = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _hash_file(source: Path) -> str:
+    """Internal function to compute the sha256 digest of the content of a file"""
+    digest = hashlib.sha256()
+    with open(source, "rb") as in_file:
+        for chunk in iter(lambda: in_file.read(_chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_file_contents(in_file, out_file):
+    """Internal function to copy the rest of a binary file to another, in large blocks
+
+    Between two plain files, the copy is done by the kernel with
+    `os.sendfile` where available, otherwise the file is streamed with
+    `shutil.copyfileobj`.
+    """
+    if hasattr(os, "sendfile") and isinstance(out_file, io.BufferedWriter) and isinstance(in_file, io.BufferedReader):
+        out_file.flush()
+        offset = in_file.tell()
+        try:
+            while True:
+                sent = os.sendfile(out_file.fileno(), in_file.fileno(), offset, _chunk_size)
+                if sent == 0:
+                    return
+                offset += sent
+        except OSError:  # pragma: no cover
+            in_file.seek(offset)  # Not supported for these files, the copy continues from where it stopped
+    shutil.copyfileobj(in_file, out_file, _chunk_size)
+
+
+def _check_compression(compression):
+    """Internal function to validate the compression of a backup"""
+    if compression not in backup_compressions:
+        raise ValueError(
+            "The `compression` must be one of {}, received {}".format(
+                ", ".join(repr(key) for key in backup_compressions), repr(compression)
+            )
+        )
+    if compression == "zstd" and zstandard is None:  # pragma: no cover
+        raise RuntimeError("The zstd compression requires the zstandard package, install it with the zstd extra")
+
+
+def _open_backup(path: Path, compression: str = None):
+    """Internal function to open a backup file for binary writing, with the given compression"""
+    if compression == "gzip":
+        return gzip.open(path, "wb")
+    if compression == "zstd":
+        return zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def write_script_backup(source: Path, destination: Path, header: str, compression: str = None) -> Path:
+    """Write the backup of a script, a text header followed by the content of the script
+
+    The content of the script is streamed in large blocks, see
+    `_copy_file_contents`, so the time to write the backup is
+    dominated by the disk and not by the size of the script.
+
+    Parameters
+    ----------
+    source
+        The path to the script
+    destination
+        The path to the backup, the suffix of the compression, if any,
+        is added to it
+    header
+        The text written before the script
+    compression
+        The compression of the backup, `None`, "gzip" or "zstd". The
+        zstd compression requires the `zstandard` package
+
+    Raises
+    ------
+    ValueError
+        If the compression is not known
+    RuntimeError
+        If the compression needs a package which is not installed
+
+    Returns
+    -------
+    Path
+        The path to the backup
+
+    """
+    _check_compression(compression)
+    destination = destination.with_name(destination.name + backup_compressions[compression])
+
+    with _open_backup(destination, compression) as out_file:
+        out_file.write(header.encode("utf8"))
+        with open(source, "rb") as in_file:
+            _copy_file_contents(in_file, out_file)
+    return destination
+
+
+class BackupStore:
+    """Class to keep the backups of files, storing each content only once
+
+    The content of each backed up file is stored in a blob named after
+    the sha256 digest of the content, so backing up a file whose content
+    is already in the store costs only the hashing of the file. In place
+    of the full copy, a small json manifest pointing at the blob is
+    written, with the information needed to restore the file, see
+    `restore_backup`.
+
+    A store can be shared by all the tasks of a run, by placing it in
+    the run directory, or by all the runs of a campaign, by placing it
+    in the directory holding the runs. Pass the store to the
+    `RunManager` to have the backups of the run, and of the scripts
+    which process its tasks, kept in the store.
+
+    Parameters
+    ----------
+    path_to_store
+        The path to the directory of the store, it is created if needed
+    compress
+        If set, new blobs are compressed with gzip
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> from pathlib import Path
+    >>> store = RM.BackupStore(Path("backup_store"), compress=True)
+    >>> with RM.RunManager(Path("Run0001"), backup_store=store) as John:
+    ...   John.create_run()
+    ...   John.backup_file(Path("src.file"))
+
+    """
+
+    _path_store = None
+    _compress = False
+
+    def __init__(self, path_to_store: Path, compress: bool = False):
+        if not isinstance(path_to_store, Path):
+            raise TypeError("The `path_to_store` must be a Path type object, received object of type {}".format(type(path_to_store)))
+
+        if not isinstance(compress, bool):
+            raise TypeError("The `compress` must be a bool type object, received object of type {}".format(type(compress)))
+
+        self._path_store = path_to_store
+        self._compress = compress
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "BackupStore({}, compress={})".format(repr(self._path_store), repr(self._compress))
+
+    @property
+    def path(self) -> Path:
+        """The path to the store directory property getter method"""
+        return self._path_store
+
+    @property
+    def compress(self) -> bool:
+        """Whether new blobs are compressed property getter method"""
+        return self._compress
+
+    def _blob_paths(self, digest: str) -> list:
+        """Internal method to get the possible paths of a blob, uncompressed and compressed"""
+        base_path = self._path_store / "objects" / digest[:2] / digest
+        return [base_path, base_path.with_name(digest + ".gz")]
+
+    def blob_path(self, digest: str):
+        """Get the path to the blob of a digest, `None` if the content is not in the store"""
+        for path in self._blob_paths(digest):
+            if path.is_file():
+                return path
+        return None
+
+    def add_file(self, source: Path) -> str:
+        """Add the content of a file to the store
+
+        Parameters
+        ----------
+        source
+            The path to the file
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the incorrect type
+        RuntimeError
+            If the `source` does not exist or is not a file
+
+        Returns
+        -------
+        str
+            The sha256 digest of the content, which identifies its blob
+
+        """
+        if not isinstance(source, Path):
+            raise TypeError("The `source` must be a Path type object, received object of type {}".format(type(source)))
+
+        if not source.is_file():
+            raise RuntimeError("The source file does not exist or it is not a file.")
+
+        digest = _hash_file(source)
+        if self.blob_path(digest) is None:
+            with open(source, "rb") as in_file:
+                self._write_blob(digest, in_file)
+        return digest
+
+    def _write_blob(self, digest: str, in_file):
+        """Internal method to write a blob atomically, so a blob is either complete or absent"""
+        blob_path = self._blob_paths(digest)[1 if self._compress else 0]
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = blob_path.with_name("{}.{}.tmp".format(blob_path.name, uuid.uuid4().hex))
+        try:
+            if self._compress:
+                with gzip.open(tmp_path, "wb") as out_file:
+                    shutil.copyfileobj(in_file, out_file, _chunk_size)
+            else:
+                with open(tmp_path, "wb") as out_file:
+                    _copy_file_contents(in_file, out_file)
+            os.replace(tmp_path, blob_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def open_blob(self, digest: str):
+        """Open the blob of a digest for reading, as a binary file
+
+        Raises
+        ------
+        RuntimeError
+            If the content is not in the store
+
+        """
+        blob_path = self.blob_path(digest)
+        if blob_path is None:
+            raise RuntimeError("The content {} is not in the backup store {}".format(digest, self._path_store))
+        if blob_path.suffix == ".gz":
+            return gzip.open(blob_path, "rb")
+        return open(blob_path, "rb")
+
+    def _hash_blob(self, digest: str) -> str:
+        """Internal method to compute the sha256 digest of the content of a blob"""
+        content_digest = hashlib.sha256()
+        with self.open_blob(digest) as in_file:
+            for chunk in iter(lambda: in_file.read(_chunk_size), b""):
+                content_digest.update(chunk)
+        return content_digest.hexdigest()
+
+    def backup_file(self, source: Path, manifest_path: Path, extra: dict = None, verify: bool = False) -> dict:
+        """Add a file to the store and write a manifest pointing at its blob
+
+        Parameters
+        ----------
+        source
+            The path to the file
+        manifest_path
+            The path to the manifest file to write
+        extra
+            Additional information to keep in the manifest, it must be
+            serialisable to json
+        verify
+            If set, the content of the blob is read back and its
+            checksum compared with the one of the file
+
+        Raises
+        ------
+        RuntimeError
+            If `verify` is set and the checksums do not match
+
+        Returns
+        -------
+        dict
+            The content of the manifest
+
+        """
+        digest = self.add_file(source)
+        if verify and self._hash_blob(digest) != digest:
+            raise RuntimeError("The backup of {} in the store {} is corrupted, the checksums do not match".format(source, self._path_store))
+        try:
+            store = os.path.relpath(self._path_store, manifest_path.parent)
+        except ValueError:  # pragma: no cover
+            store = str(self._path_store.absolute())  # On windows, there is no relative path between different drives
+
+        manifest = {
+            "name": source.name,
+            "source": str(source),
+            "sha256": digest,
+            "size": source.stat().st_size,
+            "store": store,
+            "blob": self.blob_path(digest).relative_to(self._path_store).as_posix(),
+            "created": datetime.datetime.now().isoformat(),
+            "version": __version__,
+        }
+        if extra is not None:
+            manifest.update(extra)
+
+        with open(manifest_path, "w", encoding="utf8") as out_file:
+            json.dump(manifest, out_file, indent=2)
+        return manifest
+
+
+def restore_backup(manifest_path: Path, destination: Path):
+    """Restore a file backed up in a `BackupStore`
+
+    Parameters
+    ----------
+    manifest_path
+        The path to the manifest of the backup
+    destination
+        The path to restore the file to
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+    RuntimeError
+        If the content of the file is not in the store
+
+    """
+    if not isinstance(manifest_path, Path):
+        raise TypeError("The `manifest_path` must be a Path type object, received object of type {}".format(type(manifest_path)))
+
+    if not isinstance(destination, Path):
+        raise TypeError("The `destination` must be a Path type object, received object of type {}".format(type(destination)))
+
+    with open(manifest_path, "r", encoding="utf8") as in_file:
+        manifest = json.load(in_file)
+
+    store = BackupStore(manifest_path.parent / manifest["store"])
+    with store.open_blob(manifest["sha256"]) as in_file:
+        with open(destination, "wb") as out_file:
+            shutil.copyfileobj(in_file, out_file, _chunk_size)
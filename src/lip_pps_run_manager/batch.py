@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""The Batch module
+
+Contains the class used to process the same task over many runs,
+concurrently, such as when re-processing a campaign with a new version
+of an analysis script.
+
+"""
+
+import _thread
+import concurrent.futures
+import datetime
+import glob
+import inspect
+import os
+import signal
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from lip_pps_run_manager.task_graph import _fresh_task_report
+from lip_pps_run_manager.task_graph import _run_graph_task
+from lip_pps_run_manager.task_graph import failed_status
+
+timed_out_status = "timed out"
+
+_poll_interval = 0.05
+
+
+def _interrupt_main_thread():
+    """Internal function to raise a KeyboardInterrupt in the main thread, also interrupting a blocking call, e.g. a sleep, if possible"""
+    if hasattr(signal, "pthread_kill"):
+        signal.pthread_kill(threading.main_thread().ident, signal.SIGINT)
+    else:  # pragma: no cover
+        _thread.interrupt_main()
+
+
+def _run_batch_task(path_to_run: Path, task_name: str, function, task_options: dict, timeout: float = None) -> str:
+    """Internal function to process a run of a batch, in a worker process, returning the status of the task
+
+    If the run takes longer than `timeout`, the main thread of the
+    worker, which processes the run, is interrupted as with a
+    KeyboardInterrupt, and the task reported as "timed out".
+    """
+    if timeout is None:
+        return _run_graph_task(path_to_run, task_name, function, task_options)
+
+    lock = threading.Lock()
+    state = {"finished": False, "timed_out": False}
+
+    def interrupt():
+        with lock:
+            if not state["finished"]:
+                state["timed_out"] = True
+                _interrupt_main_thread()
+
+    timer = threading.Timer(timeout, interrupt)
+    timer.daemon = True
+    try:
+        timer.start()
+        try:
+            status = _run_graph_task(path_to_run, task_name, function, task_options)
+        finally:
+            with lock:
+                state["finished"] = True
+            timer.cancel()
+    except KeyboardInterrupt:
+        if not state["timed_out"]:
+            raise  # pragma: no cover
+        return timed_out_status
+    return status
+
+
+def find_runs(pattern: str) -> list:
+    """Find the run directories matching a glob pattern, e.g. "runs/Run00*"
+
+    Parameters
+    ----------
+    pattern
+        The glob pattern, relative to the working directory or absolute
+
+    Returns
+    -------
+    list of Path
+        The paths to the matching directories which are runs, sorted
+
+    """
+    return [Path(path) for path in sorted(glob.glob(pattern)) if (Path(path) / "run_info.txt").is_file()]
+
+
+class RunBatch:
+    """Class to process the same task over many runs, concurrently
+
+    Each run is processed by its own `TaskManager`, in a pool of
+    `max_workers` worker processes. A run which takes longer than the
+    `timeout` is interrupted, as with a KeyboardInterrupt, and its task
+    reported as "timed out". A run which fails without writing a report
+    of its own, e.g. because its worker process died, is reported with
+    "there were errors". Instead of a telegram status message for each
+    run, a single status message shows the progress of the whole batch.
+
+    The runs can also be processed by other nodes by passing an
+    executor, such as those of `mpi4py.futures` or `dask.distributed`,
+    to `run`, as long as the nodes share the filesystem of the runs. In
+    that case, a run which times out can not be stopped, it is only no
+    longer waited for.
+
+    Parameters
+    ----------
+    task_name
+        The name of the task to process in each run
+    function
+        The function processing the task, called with the `TaskManager`
+        of the task, already inside the task context, as with the
+        `TaskGraph`
+    backup_python_file
+        If `True`, the file where the function is defined is backed up
+        in the task directory of each run
+    telegram_bot_token
+        The telegram bot token to use for the status message of the
+        batch, if any
+    telegram_chat_id
+        The telegram chat ID to send the status message to
+    rate_limit
+        If set, messages will be delayed to respect the rate limits set
+        by telegram
+    task_options
+        Other parameters of the `TaskManager` of each run, e.g.
+        `loop_iterations`
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> def analyse(task):
+    ...   print("Analysing run {}".format(task.run_name))
+    >>> batch = RM.RunBatch("analyse", analyse)
+    >>> summary = batch.run("runs/Run00*", max_workers=8, timeout=3600)
+    >>> print(summary["counts"])
+
+    """
+
+    _task_name = None
+    _function = None
+    _task_options = None
+    _bot_token = None
+    _chat_id = None
+    _rate_limit = True
+
+    def __init__(
+        self,
+        task_name: str,
+        function,
+        backup_python_file: bool = True,
+        telegram_bot_token: str = None,
+        telegram_chat_id: str = None,
+        rate_limit: bool = True,
+        **task_options,
+    ):
+        if not isinstance(task_name, str):
+            raise TypeError("The `task_name` must be a str type object, received object of type {}".format(type(task_name)))
+
+        if not callable(function):
+            raise TypeError("The `function` must be a callable type object, received object of type {}".format(type(function)))
+
+        if not isinstance(backup_python_file, bool):
+            raise TypeError(
+                "The `backup_python_file` must be a bool type object, received object of type {}".format(type(backup_python_file))
+            )
+
+        if telegram_bot_token is not None and not isinstance(telegram_bot_token, str):
+            raise TypeError(
+                "The `telegram_bot_token` must be a str type object, received object of type {}".format(type(telegram_bot_token))
+            )
+
+        if telegram_chat_id is not None and not isinstance(telegram_chat_id, str):
+            raise TypeError("The `telegram_chat_id` must be a str type object, received object of type {}".format(type(telegram_chat_id)))
+
+        if not isinstance(rate_limit, bool):
+            raise TypeError("The `rate_limit` must be a bool type object, received object of type {}".format(type(rate_limit)))
+
+        if backup_python_file:
+            task_options["script_to_backup"] = Path(inspect.getfile(function))
+
+        self._task_name = task_name
+        self._function = function
+        self._task_options = task_options
+        if telegram_bot_token is not None and telegram_chat_id is not None:
+            self._bot_token = telegram_bot_token
+            self._chat_id = telegram_chat_id
+            self._rate_limit = rate_limit
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "RunBatch({}, {})".format(repr(self._task_name), self._function.__name__)
+
+    @property
+    def task_name(self) -> str:
+        """The name of the task processed in each run"""
+        return self._task_name
+
+    def run(self, runs, max_workers: int = None, timeout: float = None, executor: concurrent.futures.Executor = None) -> dict:
+        """Process the task in each run
+
+        Parameters
+        ----------
+        runs
+            The paths to the runs, as a list of `Path`, or a glob
+            pattern matching them, see `find_runs`
+        max_workers
+            The maximum number of runs processed at once, by default
+            the number of processors
+        timeout
+            The maximum time, in seconds, to process each run, by
+            default there is no limit
+        executor
+            The executor processing the runs, by default a pool of
+            `max_workers` processes
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the incorrect type
+
+        Returns
+        -------
+        dict
+            The summary of the batch, with the name of the task, the
+            time it took, in seconds, the number of runs with each
+            status and, for each run, the status of the task, "no
+            errors", "incomplete", "there were errors" or "timed out",
+            and its report, see `read_task_report`, `None` if the task
+            did not write a report during the batch
+
+        """
+        if isinstance(runs, str):
+            runs = find_runs(runs)
+        if not isinstance(runs, list) or not all(isinstance(path, Path) for path in runs):
+            raise TypeError(
+                "The `runs` must be a list of Path type objects or a str type object, received object of type {}".format(type(runs))
+            )
+
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if not isinstance(max_workers, int):
+            raise TypeError("The `max_workers` must be a int type object or None, received object of type {}".format(type(max_workers)))
+
+        if timeout is not None and not isinstance(timeout, (int, float)):
+            raise TypeError("The `timeout` must be a float type object or None, received object of type {}".format(type(timeout)))
+
+        start_time = datetime.datetime.now()
+        # The telegram reporter is imported when needed, since importing requests is slow
+        reporter = None
+        message_id = None
+        if self._bot_token is not None:
+            from lip_pps_run_manager.telegram_reporter import TelegramReporter
+
+            reporter = TelegramReporter(self._bot_token, self._chat_id, rate_limit=self._rate_limit)
+            message_id = self._send_status(reporter, None, runs, {}, start_time)
+        last_update = time.monotonic()
+
+        own_executor = executor is None
+        if own_executor:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+
+        pending = list(runs)
+        running = {}
+        statuses = {}
+        try:
+            while pending or running:
+                while pending and len(running) < max_workers:
+                    path_to_run = pending.pop(0)
+                    arguments = (path_to_run, self._task_name, self._function, self._task_options)
+                    if own_executor:
+                        try:
+                            future = executor.submit(_run_batch_task, *arguments, timeout)
+                        except BrokenProcessPool:  # A worker process died, which breaks the whole pool
+                            executor.shutdown(wait=True)
+                            executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+                            future = executor.submit(_run_batch_task, *arguments, timeout)
+                    else:
+                        future = executor.submit(_run_graph_task, *arguments)
+                    running[future] = (path_to_run, time.monotonic())
+
+                done, _ = concurrent.futures.wait(running, timeout=_poll_interval, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    path_to_run, _ = running.pop(future)
+                    try:
+                        statuses[path_to_run] = future.result()
+                    except Exception:  # e.g. the worker process died
+                        statuses[path_to_run] = failed_status
+
+                if not own_executor and timeout is not None:
+                    for future, (path_to_run, worker_start) in list(running.items()):
+                        if time.monotonic() - worker_start > timeout:
+                            future.cancel()
+                            statuses[path_to_run] = timed_out_status
+                            del running[future]
+
+                if reporter is not None and message_id is not None and time.monotonic() - last_update >= 1:
+                    last_update = time.monotonic()
+                    self._send_status(reporter, message_id, runs, statuses, start_time)
+        finally:
+            for future in running:
+                future.cancel()
+            if own_executor:
+                executor.shutdown(wait=True)
+
+        if reporter is not None:
+            if message_id is not None:
+                self._send_status(reporter, message_id, runs, statuses, start_time)
+            reporter.close()
+
+        counts = {}
+        for status in statuses.values():
+            counts[status] = counts.get(status, 0) + 1
+        return {
+            "task_name": self._task_name,
+            "elapsed": (datetime.datetime.now() - start_time).total_seconds(),
+            "counts": counts,
+            "runs": {
+                str(path_to_run): {"status": statuses[path_to_run], "report": _fresh_task_report(path_to_run / self._task_name, start_time)}
+                for path_to_run in runs
+            },
+        }
+
+    def _send_status(self, reporter, message_id, runs: list, statuses: dict, start_time: datetime.datetime):
+        """Internal method to send, or update, the telegram status message of the batch, returning its ID"""
+        status = "⏩⏩ Processing task {} of {} runs\n".format(self._task_name, len(runs))
+        status += "     Started {}\n".format(start_time.strftime("%Y-%m-%d %H:%M"))
+        status += "     Progress: {} % ({}/{})\n\n".format(
+            int(len(statuses) / len(runs) * 100) if runs else 100, len(statuses), len(runs)
+        )
+        for task_status in sorted(set(statuses.values())):
+            status += "     {}: {}\n".format(task_status, list(statuses.values()).count(task_status))
+        status += "\nLast update of this message: {}".format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+
+        if message_id is None:
+            response = reporter.send_message(status)
+            return None if response is None else response["result"]["message_id"]
+        reporter.edit_message(status, message_id)
+        return message_id
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""The Catalog module
+
+Contains the class used to keep an index of the runs in a directory and
+of the status of their tasks, so that they can be queried without
+visiting every run on disk.
+
+"""
+
+import datetime
+import sqlite3
+import warnings
+from pathlib import Path
+
+from lip_pps_run_manager.scanner import RunScanner
+
+catalog_file_name = "run_catalog.sqlite"
+
+
+class RunCatalog:
+    """Class to keep an index of the runs in a directory
+
+    The catalog is a SQLite database in the directory holding the runs,
+    with a row for each run and a row for each finished task of each
+    run. Once the catalog file exists, `create_run` and the
+    `TaskManager` keep it up to date as runs are created and tasks
+    finish, so queries such as "which runs have not completed task X"
+    are answered from the catalog alone.
+
+    The catalog is only a cache of what is on disk: `rebuild` indexes
+    the directory from scratch, which is also the way to create the
+    catalog for existing runs.
+
+    Parameters
+    ----------
+    path_to_directory
+        The path to the directory holding the runs
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> from pathlib import Path
+    >>> with RM.RunCatalog(Path(".")) as catalog:
+    ...   catalog.rebuild()
+    ...   print(catalog.missing_runs("myTask"))
+
+    """
+
+    _path_directory = None
+    _connection = None
+
+    def __init__(self, path_to_directory: Path):
+        if not isinstance(path_to_directory, Path):
+            raise TypeError(
+                "The `path_to_directory` must be a Path type object, received object of type {}".format(type(path_to_directory))
+            )
+
+        self._path_directory = path_to_directory
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "RunCatalog({})".format(repr(self._path_directory))
+
+    def __enter__(self):
+        """This is the method that is called when using the "with" syntax"""
+        return self
+
+    def __exit__(self, err_type, err_value, err_traceback):
+        """This is the method that is called at the end of the block, when using the "with" syntax"""
+        self.close()
+
+    @property
+    def path(self) -> Path:
+        """The path to the catalog file property getter method"""
+        return self._path_directory / catalog_file_name
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Internal property with the connection to the database, opened and set up on first use"""
+        if self._connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=30)
+            try:
+                with connection:
+                    connection.execute("CREATE TABLE IF NOT EXISTS runs (run_name TEXT PRIMARY KEY, created TEXT)")
+                    connection.execute(
+                        "CREATE TABLE IF NOT EXISTS tasks ("
+                        "run_name TEXT NOT NULL, task_name TEXT NOT NULL, status TEXT, finished TEXT, "
+                        "PRIMARY KEY (run_name, task_name))"
+                    )
+                    connection.execute("CREATE INDEX IF NOT EXISTS tasks_by_name ON tasks (task_name, status)")
+            except sqlite3.Error:
+                connection.close()
+                raise
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        """Close the connection to the catalog"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def add_run(self, run_name: str, created: datetime.datetime = None):
+        """Add a run to the catalog
+
+        Parameters
+        ----------
+        run_name
+            The name of the run
+        created
+            When the run was created, now if `None`
+
+        """
+        if created is None:
+            created = datetime.datetime.now()
+        with self._db as db:
+            db.execute("INSERT OR IGNORE INTO runs (run_name, created) VALUES (?, ?)", (run_name, created.isoformat()))
+
+    def update_task(self, run_name: str, task_name: str, status: str, finished: datetime.datetime = None):
+        """Record the status a task of a run finished with
+
+        Parameters
+        ----------
+        run_name
+            The name of the run
+        task_name
+            The name of the task
+        status
+            The status of the task, as in its report, e.g. "no errors"
+        finished
+            When the task finished, now if `None`
+
+        """
+        if finished is None:
+            finished = datetime.datetime.now()
+        with self._db as db:
+            db.execute("INSERT OR IGNORE INTO runs (run_name, created) VALUES (?, NULL)", (run_name,))
+            db.execute(
+                "INSERT OR REPLACE INTO tasks (run_name, task_name, status, finished) VALUES (?, ?, ?, ?)",
+                (run_name, task_name, status, finished.isoformat()),
+            )
+
+    def rebuild(self):
+        """Index all the runs in the directory, and their tasks, from scratch
+
+        A task is indexed if its directory has a task report. The
+        directory is walked with a `RunScanner`.
+        """
+        runs = []
+        tasks = []
+        for run_name, run in RunScanner(self._path_directory).scan().items():
+            runs.append((run_name, run["created"]))
+            for task_name, info in run["tasks"].items():
+                tasks.append((run_name, task_name, info["status"], info["end_time"]))
+
+        with self._db as db:
+            db.execute("DELETE FROM tasks")
+            db.execute("DELETE FROM runs")
+            db.executemany("INSERT INTO runs (run_name, created) VALUES (?, ?)", runs)
+            db.executemany("INSERT INTO tasks (run_name, task_name, status, finished) VALUES (?, ?, ?, ?)", tasks)
+
+    def runs(self) -> list:
+        """Get the names of all the runs in the catalog, sorted"""
+        return [row[0] for row in self._db.execute("SELECT run_name FROM runs ORDER BY run_name")]
+
+    def task_status(self, run_name: str, task_name: str):
+        """Get the status a task of a run finished with, `None` if it is not in the catalog"""
+        row = self._db.execute("SELECT status FROM tasks WHERE run_name = ? AND task_name = ?", (run_name, task_name)).fetchone()
+        return row[0] if row is not None else None
+
+    def _runs_with_status(self, task_name: str, statuses: list) -> list:
+        """Internal method to get the runs where a task finished with one of the given statuses"""
+        query = "SELECT run_name FROM tasks WHERE task_name = ? AND status IN ({}) ORDER BY run_name".format(
+            ", ".join("?" * len(statuses))
+        )
+        return [row[0] for row in self._db.execute(query, [task_name] + statuses)]
+
+    def completed_runs(self, task_name: str) -> list:
+        """Get the runs where a task completed, i.e. finished with no errors and all its iterations"""
+        return self._runs_with_status(task_name, ["no errors"])
+
+    def successful_runs(self, task_name: str) -> list:
+        """Get the runs where a task ran successfully, i.e. finished with no errors, even if incomplete"""
+        return self._runs_with_status(task_name, ["no errors", "incomplete"])
+
+    def failed_runs(self, task_name: str) -> list:
+        """Get the runs where a task finished with errors"""
+        return self._runs_with_status(task_name, ["there were errors"])
+
+    def missing_runs(self, task_name: str) -> list:
+        """Get the runs where a task has not run yet"""
+        query = (
+            "SELECT run_name FROM runs WHERE run_name NOT IN (SELECT run_name FROM tasks WHERE task_name = ?) ORDER BY run_name"
+        )
+        return [row[0] for row in self._db.execute(query, (task_name,))]
+
+
+def _update_catalog(path_to_directory: Path, update):
+    """Internal function to apply an update to the catalog of a directory, only if the catalog exists
+
+    Failing to update the catalog never stops the processing, a warning
+    is issued instead, since the catalog can always be rebuilt.
+    """
+    if not (path_to_directory / catalog_file_name).is_file():
+        return
+    try:
+        with RunCatalog(path_to_directory) as catalog:
+            update(catalog)
+    except sqlite3.Error as e:
+        warnings.warn("Could not update the run catalog, rebuild it. Reason: {}".format(repr(e)), category=RuntimeWarning)
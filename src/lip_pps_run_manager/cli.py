@@ -15,12 +15,200 @@ Why does this file exist, and why not put this in __main__?
   Also see (1) from http://click.pocoo.org/5/setuptools/#setuptools-integration
 """
 import argparse
+import datetime
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
 
-parser = argparse.ArgumentParser(description='Command description.')
-parser.add_argument('names', metavar='NAME', nargs=argparse.ZERO_OR_MORE,
-                    help="A name of something.")
+from lip_pps_run_manager.batch import RunBatch
+from lip_pps_run_manager.batch import find_runs
+from lip_pps_run_manager.catalog import RunCatalog
+from lip_pps_run_manager.run_manager import load_telegram_config
+from lip_pps_run_manager.scanner import RunScanner
+from lip_pps_run_manager.scanner import scan_cache_file_name
+
+parser = argparse.ArgumentParser(prog="lip-pps-run-manager", description="Manage the runs of the LIP PPS setup.")
+subparsers = parser.add_subparsers(dest="command")
+
+rebuild_catalog_parser = subparsers.add_parser(
+    "rebuild-catalog", help="Index all the runs in a directory, and their tasks, in the run catalog of the directory."
+)
+rebuild_catalog_parser.add_argument("directory", type=Path, help="The directory holding the runs.")
+
+status_parser = subparsers.add_parser("status", help="Show the status of the tasks of all the runs in a directory.")
+status_parser.add_argument("directory", type=Path, help="The directory holding the runs.")
+status_parser.add_argument("--json", action="store_true", help="Print the status as json.")
+status_parser.add_argument(
+    "--cache", action="store_true", help="Keep a cache of the scan in the user cache directory, so later scans only read the changed tasks."
+)
+
+tasks_parser = subparsers.add_parser("tasks", help="Show the status of the tasks of a run.")
+tasks_parser.add_argument("run", type=Path, help="The directory of the run.")
+tasks_parser.add_argument("--json", action="store_true", help="Print the status as json.")
+
+failed_parser = subparsers.add_parser("failed", help="Show the tasks which finished with errors, for all the runs in a directory.")
+failed_parser.add_argument("directory", type=Path, help="The directory holding the runs.")
+failed_parser.add_argument("--json", action="store_true", help="Print the failed tasks as json.")
+failed_parser.add_argument(
+    "--cache", action="store_true", help="Keep a cache of the scan in the user cache directory, so later scans only read the changed tasks."
+)
+
+batch_parser = subparsers.add_parser("batch", help="Process a task over many runs, concurrently.")
+batch_parser.add_argument("function", help="The function processing the task, as path/to/script.py:function_name.")
+batch_parser.add_argument("task", help="The name of the task.")
+batch_parser.add_argument("runs", nargs="+", help="The directories of the runs, or glob patterns matching them.")
+batch_parser.add_argument("--max-workers", type=int, default=None, help="The maximum number of runs processed at once.")
+batch_parser.add_argument("--timeout", type=float, default=None, help="The maximum time, in seconds, to process each run.")
+batch_parser.add_argument("--telegram-bot", default=None, help="The name of the telegram bot to publish the progress with.")
+batch_parser.add_argument("--telegram-chat", default=None, help="The name of the telegram chat to publish the progress to.")
+batch_parser.add_argument("--json", action="store_true", help="Print the summary as json.")
+
+
+def rebuild_catalog(args):
+    with RunCatalog(args.directory) as catalog:
+        catalog.rebuild()
+        print("Indexed {} runs in {}".format(len(catalog.runs()), catalog.path))
+    return 0
+
+
+def _add_durations(run: dict):
+    """Add the duration, in seconds, to each task of a run, `None` if it is not known"""
+    for info in run["tasks"].values():
+        info["duration"] = None
+        if info["start_time"] is not None and info["end_time"] is not None:
+            start = datetime.datetime.fromisoformat(info["start_time"])
+            end = datetime.datetime.fromisoformat(info["end_time"])
+            info["duration"] = (end - start).total_seconds()
+    return run
+
+
+def _format_task(task_name: str, info: dict) -> str:
+    """Get the line describing a task, for the text output"""
+    duration = "-"
+    if info["duration"] is not None:
+        duration = str(datetime.timedelta(seconds=round(info["duration"])))
+    throughput = "-"
+    if info["throughput"] is not None:
+        throughput = "{:.2f} it/s".format(info["throughput"])
+    line = "  {:<24} {:<18} {:>10} {:>14}".format(task_name, info["status"], duration, throughput)
+    if info["exception_type"] is not None:
+        line += "  ({})".format(info["exception_type"])
+    return line
+
+
+def _scan_cache_file(directory: Path) -> Path:
+    """Get the path to the scan cache of a directory, in the user cache directory so that the data directory is not written to"""
+    cache_home = Path(os.environ["XDG_CACHE_HOME"]) if os.environ.get("XDG_CACHE_HOME") else Path.home() / ".cache"
+    key = hashlib.sha256(str(directory.resolve()).encode("utf8")).hexdigest()[:16]
+    return cache_home / "lip_pps_run_manager" / "{}.{}".format(key, scan_cache_file_name)
+
+
+def _scan_directory(directory: Path, cache: bool = False) -> dict:
+    """Scan the runs of a directory, reusing the scan cache of the directory if `cache` is set"""
+    runs = RunScanner(directory, cache_file=_scan_cache_file(directory) if cache else None).scan()
+    for run in runs.values():
+        _add_durations(run)
+    return runs
+
+
+def status(args):
+    runs = _scan_directory(args.directory, args.cache)
+    if args.json:
+        print(json.dumps(runs, indent=2))
+        return 0
+
+    for run_name, run in runs.items():
+        print("{} ({} tasks)".format(run_name, len(run["tasks"])))
+        for task_name, info in sorted(run["tasks"].items()):
+            print(_format_task(task_name, info))
+    print("{} runs".format(len(runs)))
+    return 0
+
+
+def tasks(args):
+    run = RunScanner(args.run.parent).scan_run(args.run.name)
+    if run is None:
+        print("{} is not a run".format(args.run))
+        return 1
+    _add_durations(run)
+    if args.json:
+        print(json.dumps(run, indent=2))
+        return 0
+
+    print("{} ({} tasks)".format(run["run_name"], len(run["tasks"])))
+    for task_name, info in sorted(run["tasks"].items()):
+        print(_format_task(task_name, info))
+    return 0
+
+
+def failed(args):
+    runs = _scan_directory(args.directory, args.cache)
+    failed_tasks = [
+        dict(info, run_name=run_name, task_name=task_name)
+        for run_name, run in runs.items()
+        for task_name, info in sorted(run["tasks"].items())
+        if info["status"] == "there were errors"
+    ]
+    if args.json:
+        print(json.dumps(failed_tasks, indent=2))
+        return 0
+
+    for info in failed_tasks:
+        print("{}:".format(info["run_name"]))
+        print(_format_task(info["task_name"], info))
+    print("{} failed tasks".format(len(failed_tasks)))
+    return 0
+
+
+def _load_function(specification: str):
+    """Load a function from its specification, path/to/script.py:function_name"""
+    script, _, function_name = specification.rpartition(":")
+    module_spec = importlib.util.spec_from_file_location(Path(script).stem, script)
+    module = importlib.util.module_from_spec(module_spec)
+    sys.modules[module_spec.name] = module  # So that the function can be pickled, to send it to the worker processes
+    module_spec.loader.exec_module(module)
+    return getattr(module, function_name)
+
+
+def batch(args):
+    runs = []
+    for pattern in args.runs:
+        runs += find_runs(pattern)
+
+    telegram_options = {}
+    if args.telegram_bot is not None and args.telegram_chat is not None:
+        telegram_config = load_telegram_config()
+        telegram_options = {
+            "telegram_bot_token": telegram_config["bots"][args.telegram_bot],
+            "telegram_chat_id": telegram_config["chats"][args.telegram_chat],
+        }
+
+    run_batch = RunBatch(args.task, _load_function(args.function), **telegram_options)
+    summary = run_batch.run(runs, max_workers=args.max_workers, timeout=args.timeout)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for path_to_run, info in summary["runs"].items():
+            print("  {:<40} {}".format(path_to_run, info["status"]))
+        print("{} runs processed in {}".format(len(runs), datetime.timedelta(seconds=round(summary["elapsed"]))))
+    return 0 if all(info["status"] == "no errors" for info in summary["runs"].values()) else 1
+
+
+commands = {
+    "rebuild-catalog": rebuild_catalog,
+    "status": status,
+    "tasks": tasks,
+    "failed": failed,
+    "batch": batch,
+}
 
 
 def main(args=None):
     args = parser.parse_args(args=args)
-    print(args.names)
+    if args.command in commands:
+        return commands[args.command](args)
+    parser.print_help()
+    return 0
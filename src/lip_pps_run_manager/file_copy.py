@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""The File Copy module
+
+Contains the functions used to copy large files quickly, such as the
+raw data files of a run.
+
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from lip_pps_run_manager.backup_store import _hash_file
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # Not available on windows
+
+_FICLONE = 0x40049409  # The linux ioctl to share the data blocks of a file with another, on filesystems which support it (btrfs, xfs)
+_buffer_size = 8 * 1024 * 1024
+_range_size = 64 * 1024 * 1024
+
+
+def _reflink(in_file, out_file, total: int, progress) -> bool:
+    """Internal function to copy a file by sharing its data blocks, `False` if not available"""
+    if fcntl is None or not sys.platform.startswith("linux"):  # pragma: no cover
+        return False
+    fcntl.ioctl(out_file.fileno(), _FICLONE, in_file.fileno())
+    if progress is not None:
+        progress(total, total)
+    return True
+
+
+def _copy_file_range(in_file, out_file, total: int, progress) -> bool:
+    """Internal function to copy a file within the kernel with `os.copy_file_range`, `False` if not available"""
+    if not hasattr(os, "copy_file_range"):  # pragma: no cover
+        return False  # Only available from python 3.8 onwards, on linux
+    copied = 0
+    while copied < total:
+        sent = os.copy_file_range(in_file.fileno(), out_file.fileno(), min(_range_size, total - copied))
+        if sent == 0:  # pragma: no cover
+            break  # The file shrank while being copied
+        copied += sent
+        if progress is not None:
+            progress(copied, total)
+    return True
+
+
+def _buffered_copy(in_file, out_file, total: int, progress) -> bool:
+    """Internal function to copy a file through a large reusable buffer"""
+    buffer = bytearray(_buffer_size)
+    view = memoryview(buffer)
+    copied = 0
+    while True:
+        size = in_file.readinto(buffer)
+        if not size:
+            break
+        out_file.write(view[:size])
+        copied += size
+        if progress is not None:
+            progress(copied, total)
+    return True
+
+
+_copy_methods = [_reflink, _copy_file_range, _buffered_copy]
+
+
+def copy_file(source: Path, destination: Path, progress=None, verify: bool = False):
+    """Copy a file, using the fastest method supported by the filesystem
+
+    The methods are tried in order: a reflink, where the copy shares the
+    data blocks of the source until either is modified, which is
+    instantaneous; `os.copy_file_range`, where the data is copied within
+    the kernel; and finally a copy through a large buffer. The permission
+    bits are copied as well, as with `shutil.copy`.
+
+    Parameters
+    ----------
+    source
+        The path to the file to copy
+    destination
+        The path to the copy, it is overwritten if it exists
+    progress
+        A function called with the number of bytes copied so far and
+        the size of the file, as the copy progresses
+    verify
+        If set, the sha256 checksums of the source and of the copy are
+        computed, streaming both files, and compared
+
+    Raises
+    ------
+    RuntimeError
+        If `verify` is set and the checksums do not match
+
+    """
+    total = source.stat().st_size
+    with open(source, "rb") as in_file, open(destination, "wb") as out_file:
+        for method in _copy_methods:
+            try:
+                if method(in_file, out_file, total, progress):
+                    break
+            except OSError:
+                if method is _copy_methods[-1]:
+                    raise
+                in_file.seek(0)  # Not supported for these files, try the next method from the start
+                out_file.seek(0)
+                out_file.truncate()
+    os.chmod(destination, source.stat().st_mode & 0o7777)
+
+    if verify and _hash_file(source) != _hash_file(destination):
+        raise RuntimeError("The copy of {} to {} is corrupted, the checksums do not match".format(source, destination))
@@ -1,4 +1,22 @@
-from .functions import get_VISA_ResourceManager
-from .Keithley6487 import Keithley6487
+import importlib
+
+# The instruments are imported when first used, since importing pyvisa is slow
+_lazy_attributes = {
+    "Keithley6487": "Keithley6487",
+    "get_VISA_ResourceManager": "functions",
+}
 
 __all__ = ["Keithley6487", "get_VISA_ResourceManager"]
+
+
+def __getattr__(name: str):
+    """Import the instruments when first used"""
+    if name not in _lazy_attributes:
+        raise AttributeError("module {} has no attribute {}".format(repr(__name__), repr(name)))
+    value = getattr(importlib.import_module("." + _lazy_attributes[name], __name__), name)
+    globals()[name] = value  # Later uses do not go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attributes))
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""The Outbox module
+
+Contains the class used to persist telegram messages which could not be
+delivered, so that they can be sent once the connection is back.
+
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+class TelegramOutbox:
+    """Class to keep an append-only file of undelivered telegram requests
+
+    Each undelivered message or edit is appended to the outbox file as a
+    json line, identified by a unique key. Requests which refer to a
+    message that is itself in the outbox (a reply to it or an edit of it)
+    refer to it by its key, since its telegram message ID is not known
+    yet. Once a request is delivered, a line recording the delivery and
+    the resulting message ID is appended.
+
+    Appends are flushed to the operating system right away, but only
+    synced to disk (with `os.fsync`) at most once every `fsync_interval`
+    seconds, so that writing to the outbox stays cheap.
+
+    Parameters
+    ----------
+    path
+        The path to the outbox file, it is created if it does not exist
+    fsync_interval
+        The minimum time, in seconds, between syncs of the outbox file
+        to disk
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> from pathlib import Path
+    >>> outbox = RM.TelegramOutbox(Path("Run0001") / "telegram_outbox.jsonl")
+    >>> bot = RM.TelegramReporter("SecretBotToken", "PostToThisChat_ID")
+    >>> bot.set_outbox(outbox)
+
+    """
+
+    _path = None
+    _fsync_interval = 1.0
+
+    def __init__(self, path: Path, fsync_interval: float = 1.0):
+        if not isinstance(path, Path):
+            raise TypeError("The `path` must be a Path type object, received object of type {}".format(type(path)))
+
+        if not isinstance(fsync_interval, (int, float)):
+            raise TypeError("The `fsync_interval` must be a float type object, received object of type {}".format(type(fsync_interval)))
+
+        self._path = path
+        self._fsync_interval = float(fsync_interval)
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = False
+        self._last_fsync = time.monotonic()
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "TelegramOutbox({}, fsync_interval={})".format(repr(self._path), repr(self._fsync_interval))
+
+    @property
+    def path(self) -> Path:
+        """The path to the outbox file property getter method"""
+        return self._path
+
+    def _fsync(self):
+        """Internal function to sync the outbox file to disk, the lock must be held"""
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+        self._last_fsync = time.monotonic()
+
+    def _ends_with_newline(self) -> bool:
+        """Internal function to check if the outbox file is empty or ends with a complete line"""
+        with open(self._path, "rb") as in_file:
+            in_file.seek(0, os.SEEK_END)
+            if in_file.tell() == 0:
+                return True
+            in_file.seek(-1, os.SEEK_END)
+            return in_file.read(1) == b"\n"
+
+    def _append(self, record: dict):
+        """Internal function to append a record to the outbox file"""
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._path, "a", encoding="utf-8")
+                if not self._ends_with_newline():  # Do not glue the record to a partially written line
+                    self._file.write("\n")
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            self._unsynced = True
+            if time.monotonic() - self._last_fsync >= self._fsync_interval:
+                self._fsync()
+
+    def add_message(self, message_text: str, reply_to_message_id: str = None, reply_to_key: str = None) -> str:
+        """Add a message which could not be sent to the outbox
+
+        Parameters
+        ----------
+        message_text
+            The text of the message
+        reply_to_message_id
+            The telegram ID of the message this message replies to, if any
+        reply_to_key
+            The outbox key of the message this message replies to, if the
+            message being replied to is itself in the outbox
+
+        Returns
+        -------
+        str
+            The outbox key of the message
+
+        """
+        key = uuid.uuid4().hex
+        self._append(
+            {
+                "key": key,
+                "kind": "send",
+                "text": message_text,
+                "message_id": reply_to_message_id,
+                "message_key": reply_to_key,
+                "time": time.time(),
+            }
+        )
+        return key
+
+    def add_edit(self, message_text: str, message_id: str = None, message_key: str = None) -> str:
+        """Add an edit which could not be made to the outbox
+
+        Parameters
+        ----------
+        message_text
+            The new text of the message
+        message_id
+            The telegram ID of the message to edit
+        message_key
+            The outbox key of the message to edit, if the message is
+            itself in the outbox
+
+        Returns
+        -------
+        str
+            The outbox key of the edit
+
+        """
+        key = uuid.uuid4().hex
+        self._append(
+            {
+                "key": key,
+                "kind": "edit",
+                "text": message_text,
+                "message_id": message_id,
+                "message_key": message_key,
+                "time": time.time(),
+            }
+        )
+        return key
+
+    def mark_delivered(self, key: str, message_id: str = None):
+        """Record that a request of the outbox was delivered
+
+        Parameters
+        ----------
+        key
+            The outbox key of the request
+        message_id
+            The telegram message ID resulting from the request, `None` if
+            the request was given up on
+
+        """
+        self._append({"delivered": key, "message_id": message_id})
+
+    def sync(self):
+        """Sync the outbox file to disk if there are unsynced appends"""
+        with self._lock:
+            self._fsync()
+
+    def _read_unlocked(self):
+        """Internal function to read the records of the outbox file, the lock must be held"""
+        records = []
+        delivered = {}
+        if not self._path.is_file():
+            return records, delivered
+
+        with open(self._path, "r", encoding="utf-8") as in_file:
+            for line in in_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:  # A partially written line, from a crash while appending
+                    continue
+                if "delivered" in record:
+                    delivered[record["delivered"]] = record["message_id"]
+                else:
+                    records.append(record)
+        return records, delivered
+
+    def pending(self) -> list:
+        """Get the requests of the outbox which still have to be delivered
+
+        The requests are compacted before being returned: an edit of a
+        message still in the outbox is merged into the message, and of
+        several edits of the same message only the newest is kept. The
+        keys of the requests which were merged away are listed in the
+        "superseded" field of the request which replaces them. References
+        to messages of the outbox which were already delivered are
+        replaced by the resulting telegram message ID.
+
+        Returns
+        -------
+        list
+            The pending requests, in the order they were added, each as a
+            dictionary with the fields "key", "kind", "text",
+            "message_id", "message_key" and "superseded"
+
+        """
+        with self._lock:
+            records, delivered = self._read_unlocked()
+        return self._pending(records, delivered)
+
+    def _pending(self, records: list, delivered: dict) -> list:
+        """Internal function to compact the records of the outbox file into the pending requests, see `pending`"""
+        pending = {}
+        last_edit = {}
+        for record in records:
+            if record["key"] in delivered:
+                continue
+            record.setdefault("superseded", [])
+
+            message_key = record["message_key"]
+            if message_key is not None and message_key in delivered:
+                record["message_id"] = delivered[message_key]
+                record["message_key"] = message_key = None
+
+            if message_key is not None and message_key not in pending:
+                continue  # Refers to a message which was lost
+
+            if record["kind"] == "edit":
+                if message_key is not None and pending[message_key]["kind"] == "send":
+                    pending[message_key]["text"] = record["text"]
+                    pending[message_key]["superseded"] += [record["key"]] + record["superseded"]
+                    continue
+
+                target = ("key", message_key) if message_key is not None else ("id", record["message_id"])
+                if target in last_edit:
+                    previous = pending.pop(last_edit[target])
+                    record["superseded"] += [previous["key"]] + previous["superseded"]
+                last_edit[target] = record["key"]
+
+            pending[record["key"]] = record
+
+        return list(pending.values())
+
+    def compact(self):
+        """Rewrite the outbox file keeping only the compacted pending requests
+
+        The keys of the merged requests are kept in the "superseded"
+        field, so that their results can still be matched. The file is
+        replaced atomically. If there are no pending requests, the outbox
+        file is removed. The lock is held from the read to the rewrite,
+        so no request appended meanwhile is lost.
+        """
+        with self._lock:
+            records = self._pending(*self._read_unlocked())
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._unsynced = False
+
+            if len(records) == 0:
+                if self._path.is_file():
+                    self._path.unlink()
+                return
+
+            tmp_path = self._path.with_name(self._path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as out_file:
+                for record in records:
+                    out_file.write(json.dumps(record) + "\n")
+                out_file.flush()
+                os.fsync(out_file.fileno())
+            os.replace(tmp_path, self._path)
+
+    def close(self):
+        """Sync and close the outbox file"""
+        with self._lock:
+            self._fsync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""The Progress module
+
+Contains the classes used to keep track of the progress of a task, also
+when the work is spread over several threads or processes.
+
+"""
+
+import collections
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from lip_pps_run_manager.rate_limiter import _lock_file
+from lip_pps_run_manager.rate_limiter import _unlock_file
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    shared_memory = None  # Only available from python 3.8 onwards
+
+
+class SharedProgressCounter:
+    """Class to count processed iterations across threads and processes
+
+    The counter lives in a block of shared memory, split in slots. Each
+    thread of each process which adds to the counter claims a slot of
+    its own the first time it does so, after which adding to the counter
+    is a plain write to that slot, with no locking involved. The value
+    of the counter is the sum of all the slots.
+
+    The counter can be pickled, so it can be passed as an argument to
+    the workers of a `concurrent.futures.ProcessPoolExecutor` or a
+    `multiprocessing.Pool`, which then attach to the same shared memory.
+    Only the process which created the counter removes the shared
+    memory, with `unlink`.
+
+    Usually, the counter is created with `TaskManager.progress_counter`,
+    so that the task takes it into account for its progress.
+
+    Parameters
+    ----------
+    slots
+        The maximum number of threads, across all processes, which can
+        add to the counter
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+    ValueError
+        If the number of slots is not positive
+    RuntimeError
+        If shared memory is not supported by this python version
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> counter = RM.SharedProgressCounter()
+    >>> counter.add(10)
+    >>> counter.value
+    10
+    >>> counter.unlink()
+
+    """
+
+    _slots = 256
+    _shared_memory = None
+    _array = None
+    _owner = False
+
+    def __init__(self, slots: int = 256):
+        if not isinstance(slots, int) or isinstance(slots, bool):
+            raise TypeError("The `slots` must be a int type object, received object of type {}".format(type(slots)))
+        if slots <= 0:
+            raise ValueError("The `slots` must be positive, received {}".format(slots))
+        if shared_memory is None:  # pragma: no cover
+            raise RuntimeError("The SharedProgressCounter requires python 3.8 or newer")
+
+        self._slots = slots
+        # Each slot has the key of the thread which claimed it, followed by the count of that thread
+        self._shared_memory = shared_memory.SharedMemory(create=True, size=2 * 8 * slots)
+        self._owner = True
+        self._attach()
+        for index in range(2 * slots):
+            self._array[index] = 0
+
+    def _attach(self):
+        """Internal method to set up the view of the shared memory and the per-thread slot cache"""
+        self._array = self._shared_memory.buf.cast("q")
+        self._local = threading.local()
+        self._lock_path = Path(tempfile.gettempdir()) / "lip_pps_progress_{}.lock".format(self._shared_memory.name.lstrip("/"))
+
+    def __getstate__(self):
+        """Get the state to pickle, which is only the name of the shared memory"""
+        return {"name": self._shared_memory.name, "slots": self._slots}
+
+    def __setstate__(self, state):
+        """Attach to the shared memory of a pickled counter"""
+        self._slots = state["slots"]
+        self._shared_memory = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._attach()
+
+    def __del__(self):
+        """Release the view of the shared memory before the shared memory itself is closed"""
+        self.close()
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "SharedProgressCounter(slots={})".format(repr(self._slots))
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory block property getter method"""
+        return self._shared_memory.name
+
+    def _claim_slot(self) -> int:
+        """Internal method to find the slot of the calling thread, claiming a free one if needed"""
+        key = (os.getpid() << 32) | (threading.get_ident() & 0xFFFFFFFF)
+
+        self._lock_path.touch(exist_ok=True)
+        with self._lock_path.open("r+", encoding="utf-8") as file:
+            _lock_file(file)
+            try:
+                for slot in range(self._slots):
+                    if self._array[slot] == key:
+                        return slot
+                    if self._array[slot] == 0:
+                        self._array[slot] = key
+                        return slot
+            finally:
+                _unlock_file(file)
+
+        raise RuntimeError("All the {} slots of the SharedProgressCounter are taken, use more slots".format(self._slots))
+
+    def add(self, count: int = 1):
+        """Add processed iterations to the counter
+
+        Parameters
+        ----------
+        count
+            The number of iterations to add
+
+        """
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():  # Also true in a forked child, which must not reuse the slot of its parent
+            local.index = self._slots + self._claim_slot()
+            local.pid = os.getpid()
+        self._array[local.index] += count
+
+    @property
+    def value(self) -> int:
+        """The total number of iterations added to the counter, from all threads and processes"""
+        return sum(self._array[self._slots:])
+
+    def close(self):
+        """Detach from the shared memory, the counter can no longer be used afterwards"""
+        if self._array is not None:
+            self._array.release()
+            self._array = None
+            self._shared_memory.close()
+
+    def unlink(self):
+        """Detach from and remove the shared memory, if this counter created it"""
+        self.close()
+        if self._owner:
+            self._owner = False
+            self._shared_memory.unlink()
+            if self._lock_path.exists():
+                self._lock_path.unlink()
+
+
+class ProgressEstimator:
+    """Base class of the estimators of the processing rate of a task
+
+    An estimator is fed samples of the number of processed iterations at
+    a given time, from which it estimates the current processing rate.
+    Each sample is processed in constant time. The `TaskManager` adds a
+    sample each time it does its bookkeeping, see
+    `TaskManager.loop_tick`, and uses the rate to compute the expected
+    finish time of the task. To implement a new estimator, derive from
+    this class and implement `add_sample` and `rate`.
+    """
+
+    def add_sample(self, timestamp: float, count: int):
+        """Add a sample to the estimator
+
+        Parameters
+        ----------
+        timestamp
+            The time of the sample, in seconds, from a monotonic clock
+            such as `time.monotonic`
+        count
+            The total number of iterations processed at that time
+
+        """
+        raise NotImplementedError  # pragma: no cover
+
+    @property
+    def rate(self):
+        """The estimated processing rate, in iterations per second, or `None` if not known yet"""
+        raise NotImplementedError  # pragma: no cover
+
+    def remaining_time(self, count: int, total: int):
+        """Estimate the time needed to finish the task
+
+        Parameters
+        ----------
+        count
+            The number of iterations processed so far
+        total
+            The total number of iterations of the task
+
+        Returns
+        -------
+        float
+            The estimated remaining time in seconds, or `None` if the
+            rate is not known or not positive
+
+        """
+        rate = self.rate
+        if rate is None or rate <= 0:
+            return None
+        return max(0.0, (total - count) / rate)
+
+
+class LinearEstimator(ProgressEstimator):
+    """Estimator of the average processing rate since the first sample
+
+    This is the simplest estimator, which assumes the rate is constant
+    for the whole task. It is thrown off by a slow start of the task.
+    """
+
+    _first = None
+    _last = None
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "LinearEstimator()"
+
+    def add_sample(self, timestamp: float, count: int):
+        if self._first is None:
+            self._first = (timestamp, count)
+        self._last = (timestamp, count)
+
+    @property
+    def rate(self):
+        if self._first is None or self._last[0] <= self._first[0]:
+            return None
+        return (self._last[1] - self._first[1]) / (self._last[0] - self._first[0])
+
+
+class SlidingWindowEstimator(ProgressEstimator):
+    """Estimator of the processing rate over the last few samples
+
+    The samples are kept in a ring buffer of fixed size, the rate is
+    computed between the oldest and the newest sample in it. Once the
+    buffer is full, a slow start of the task no longer affects the
+    estimate.
+
+    Parameters
+    ----------
+    window
+        The number of samples kept, at least 2
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+    ValueError
+        If the window is smaller than 2
+
+    """
+
+    _window = 60
+
+    def __init__(self, window: int = 60):
+        if not isinstance(window, int) or isinstance(window, bool):
+            raise TypeError("The `window` must be a int type object, received object of type {}".format(type(window)))
+        if window < 2:
+            raise ValueError("The `window` must be at least 2, received {}".format(window))
+
+        self._window = window
+        self._samples = collections.deque(maxlen=window)
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "SlidingWindowEstimator(window={})".format(repr(self._window))
+
+    def add_sample(self, timestamp: float, count: int):
+        self._samples.append((timestamp, count))
+
+    @property
+    def rate(self):
+        if len(self._samples) < 2:
+            return None
+        first_time, first_count = self._samples[0]
+        last_time, last_count = self._samples[-1]
+        if last_time <= first_time:
+            return None
+        return (last_count - first_count) / (last_time - first_time)
+
+
+class EWMAEstimator(ProgressEstimator):
+    """Estimator of the exponentially weighted moving average of the processing rate
+
+    Each sample gives the rate since the previous sample, which is
+    averaged with a weight that decays with the age of the sample: a
+    sample `half_life` seconds old has half the weight of a new one.
+
+    Parameters
+    ----------
+    half_life
+        The time, in seconds, after which the weight of a sample is halved
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+    ValueError
+        If the half life is not positive
+
+    """
+
+    _half_life = 60.0
+    _rate = None
+    _last = None
+
+    def __init__(self, half_life: float = 60.0):
+        if not isinstance(half_life, (int, float)) or isinstance(half_life, bool):
+            raise TypeError("The `half_life` must be a float type object, received object of type {}".format(type(half_life)))
+        if half_life <= 0:
+            raise ValueError("The `half_life` must be positive, received {}".format(half_life))
+
+        self._half_life = float(half_life)
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "EWMAEstimator(half_life={})".format(repr(self._half_life))
+
+    def add_sample(self, timestamp: float, count: int):
+        if self._last is not None:
+            elapsed = timestamp - self._last[0]
+            if elapsed <= 0:
+                return
+            instantaneous_rate = (count - self._last[1]) / elapsed
+            if self._rate is None:
+                self._rate = instantaneous_rate
+            else:
+                self._rate += (1 - 0.5 ** (elapsed / self._half_life)) * (instantaneous_rate - self._rate)
+        self._last = (timestamp, count)
+
+    @property
+    def rate(self):
+        return self._rate
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""The Rate Limiter module
+
+Contains classes and functions used to keep the messages sent to telegram
+within the rate limits imposed by telegram.
+
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+    import msvcrt
+
+
+def _lock_file(file_handle):
+    """Acquire an exclusive lock on an open file, blocking until it is available"""
+    if fcntl is not None:
+        fcntl.flock(file_handle.fileno(), fcntl.LOCK_EX)
+    else:  # pragma: no cover
+        file_handle.seek(0)
+        msvcrt.locking(file_handle.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(file_handle):
+    """Release the lock acquired with `_lock_file`"""
+    if fcntl is not None:
+        fcntl.flock(file_handle.fileno(), fcntl.LOCK_UN)
+    else:  # pragma: no cover
+        file_handle.seek(0)
+        msvcrt.locking(file_handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class RateLimiter:
+    """Class implementing a token bucket rate limiter for telegram bots
+
+    Two token buckets are kept, one for each chat and one for the bot as
+    a whole. Every message takes one token from the bucket of its chat
+    and one from the global bucket, and can only be sent when both have
+    a token available. The buckets refill continuously at the configured
+    rates, up to the burst size.
+
+    The limiter is thread safe. If a `lock_file` is given, the state of
+    the buckets is stored in that file and protected with a file lock,
+    so that several processes using the same bot can share the budget.
+
+    Parameters
+    ----------
+    chat_rate
+        The number of messages per second allowed in a single chat
+    chat_burst
+        The maximum number of messages which can be sent to a single
+        chat in a burst
+    global_rate
+        The number of messages per second allowed for the bot over all
+        the chats
+    global_burst
+        The maximum number of messages which can be sent by the bot in a
+        burst
+    lock_file
+        The path to a file used to share the state of the buckets
+        between processes. If `None`, the state is only shared within
+        the current process
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+    ValueError
+        If a rate or burst is not positive
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> limiter = RM.RateLimiter(chat_rate=1, chat_burst=3)
+    >>> limiter.acquire("PostToThisChat_ID")
+
+    """
+
+    _chat_rate = 1.0
+    _chat_burst = 1.0
+    _global_rate = 30.0
+    _global_burst = 30.0
+    _lock_file = None
+
+    def __init__(
+        self,
+        chat_rate: float = 1.0,
+        chat_burst: int = 1,
+        global_rate: float = 30.0,
+        global_burst: int = 30,
+        lock_file: Path = None,
+    ):
+        parameters = [("chat_rate", chat_rate), ("chat_burst", chat_burst), ("global_rate", global_rate), ("global_burst", global_burst)]
+        for name, value in parameters:
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise TypeError("The `{}` must be a float type object, received object of type {}".format(name, type(value)))
+            if value <= 0:
+                raise ValueError("The `{}` must be positive, received {}".format(name, value))
+
+        if lock_file is not None and not isinstance(lock_file, Path):
+            raise TypeError("The `lock_file` must be a Path type object or None, received object of type {}".format(type(lock_file)))
+
+        self._chat_rate = float(chat_rate)
+        self._chat_burst = float(chat_burst)
+        self._global_rate = float(global_rate)
+        self._global_burst = float(global_burst)
+        self._lock_file = lock_file
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+        # The wall clock is needed to compare times across processes
+        self._clock = time.monotonic if lock_file is None else time.time
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "RateLimiter(chat_rate={}, chat_burst={}, global_rate={}, global_burst={}, lock_file={})".format(
+            repr(self._chat_rate), repr(self._chat_burst), repr(self._global_rate), repr(self._global_burst), repr(self._lock_file)
+        )
+
+    def _take(self, buckets: dict, chat_id: str) -> float:
+        """Internal function to take a token from the buckets of a chat, if available
+
+        The `buckets` dictionary maps a bucket name to a list with the
+        number of tokens and the time they were last updated, it is
+        modified in place.
+
+        Returns
+        -------
+        float
+            0 if the tokens were taken, otherwise the number of seconds
+            to wait until they are available
+
+        """
+        now = self._clock()
+        limits = [("chat:" + chat_id, self._chat_rate, self._chat_burst), ("global", self._global_rate, self._global_burst)]
+
+        wait = 0.0
+        for name, rate, burst in limits:
+            tokens, last_time = buckets.get(name, (burst, now))
+            tokens = min(burst, tokens + max(0.0, now - last_time) * rate)
+            buckets[name] = [tokens, now]
+            if tokens < 1:
+                wait = max(wait, (1 - tokens) / rate)
+
+        if wait == 0.0:
+            for name, _, _ in limits:
+                buckets[name][0] -= 1
+        return wait
+
+    def reserve(self, chat_id: str) -> float:
+        """Try to take the tokens needed to send one message to a chat
+
+        Parameters
+        ----------
+        chat_id
+            The telegram chat ID the message will be sent to
+
+        Raises
+        ------
+        TypeError
+            If the parameter has the incorrect type
+
+        Returns
+        -------
+        float
+            0 if the message can be sent right away (the tokens are then
+            consumed), otherwise the number of seconds to wait before
+            trying again
+
+        """
+        if not isinstance(chat_id, str):
+            raise TypeError("The `chat_id` must be a str type object, received object of type {}".format(type(chat_id)))
+
+        with self._lock:
+            if self._lock_file is None:
+                return self._take(self._buckets, chat_id)
+
+            self._lock_file.touch(exist_ok=True)
+            with self._lock_file.open("r+", encoding="utf-8") as file:
+                _lock_file(file)
+                try:
+                    content = file.read()
+                    buckets = json.loads(content) if content else {}
+                    wait = self._take(buckets, chat_id)
+                    file.seek(0)
+                    file.truncate()
+                    file.write(json.dumps(buckets))
+                    file.flush()
+                finally:
+                    _unlock_file(file)
+            return wait
+
+    def acquire(self, chat_id: str):
+        """Block until a message can be sent to a chat, consuming the tokens
+
+        Parameters
+        ----------
+        chat_id
+            The telegram chat ID the message will be sent to
+
+        """
+        wait = self.reserve(chat_id)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.reserve(chat_id)
+
+
+_shared_limiters = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(bot_token: str) -> RateLimiter:
+    """Get the rate limiter shared by all the reporters of a bot in this process
+
+    If no rate limiter has been set for the bot with
+    `set_shared_rate_limiter`, a `RateLimiter` with the default telegram
+    limits is created.
+
+    Parameters
+    ----------
+    bot_token
+        The token of the telegram bot
+
+    Returns
+    -------
+    RateLimiter
+        The rate limiter of the bot
+
+    """
+    with _shared_limiters_lock:
+        if bot_token not in _shared_limiters:
+            _shared_limiters[bot_token] = RateLimiter()
+        return _shared_limiters[bot_token]
+
+
+def set_shared_rate_limiter(bot_token: str, rate_limiter: RateLimiter):
+    """Set the rate limiter shared by all the reporters of a bot in this process
+
+    Use this function to configure custom rates or a lock file shared
+    with other processes. Only reporters created afterwards are affected.
+
+    Parameters
+    ----------
+    bot_token
+        The token of the telegram bot
+    rate_limiter
+        The rate limiter to use for the bot
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Examples
+    --------
+    >>> from pathlib import Path
+    >>> import lip_pps_run_manager.rate_limiter as RL
+    >>> RL.set_shared_rate_limiter("SecretBotToken", RL.RateLimiter(lock_file=Path("/tmp/bot.lock")))
+
+    """
+    if not isinstance(bot_token, str):
+        raise TypeError("The `bot_token` must be a str type object, received object of type {}".format(type(bot_token)))
+
+    if not isinstance(rate_limiter, RateLimiter):
+        raise TypeError("The `rate_limiter` must be a RateLimiter type object, received object of type {}".format(type(rate_limiter)))
+
+    with _shared_limiters_lock:
+        _shared_limiters[bot_token] = rate_limiter
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""The Retry module
+
+Contains classes used to retry failed requests to telegram and to stop
+trying for a while when telegram can not be reached.
+
+"""
+
+import random
+import threading
+import time
+
+
+class CircuitOpenError(RuntimeError):
+    """Exception raised when a request is refused because the circuit breaker is open"""
+
+
+class RetryPolicy:
+    """Class describing how failed requests are retried
+
+    The delay before each retry grows exponentially with the number of
+    the attempt, up to `max_delay`, and is jittered so that several
+    reporters do not retry in lockstep. If the server states how long to
+    wait (as telegram does with `retry_after`), that time is used
+    instead, also capped at `max_delay`.
+
+    Parameters
+    ----------
+    max_retries
+        The maximum number of retries after the first attempt. Use 0 to
+        disable retrying
+    base_delay
+        The delay, in seconds, before the first retry
+    max_delay
+        The maximum delay, in seconds, between retries
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> policy = RM.RetryPolicy(max_retries=5, base_delay=1)
+    >>> bot = RM.TelegramReporter("SecretBotToken", "PostToThisChat_ID", retry_policy=policy)
+
+    """
+
+    _max_retries = 3
+    _base_delay = 0.5
+    _max_delay = 30.0
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 30.0):
+        if not isinstance(max_retries, int):
+            raise TypeError("The `max_retries` must be a int type object, received object of type {}".format(type(max_retries)))
+
+        if not isinstance(base_delay, (int, float)):
+            raise TypeError("The `base_delay` must be a float type object, received object of type {}".format(type(base_delay)))
+
+        if not isinstance(max_delay, (int, float)):
+            raise TypeError("The `max_delay` must be a float type object, received object of type {}".format(type(max_delay)))
+
+        self._max_retries = max_retries
+        self._base_delay = float(base_delay)
+        self._max_delay = float(max_delay)
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "RetryPolicy(max_retries={}, base_delay={}, max_delay={})".format(
+            repr(self._max_retries), repr(self._base_delay), repr(self._max_delay)
+        )
+
+    @property
+    def max_retries(self) -> int:
+        """The maximum number of retries property getter method"""
+        return self._max_retries
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """Get the time to wait before retrying
+
+        Parameters
+        ----------
+        attempt
+            The number of the retry, starting at 0 for the first retry
+        retry_after
+            The time requested by the server before retrying, if any
+
+        Returns
+        -------
+        float
+            The number of seconds to wait
+
+        """
+        if retry_after is not None:
+            return min(self._max_delay, float(retry_after))
+
+        delay = min(self._max_delay, self._base_delay * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Class to stop sending requests for a while after repeated failures
+
+    After `failure_threshold` consecutive failures, the circuit opens and
+    requests are refused right away during `cool_down` seconds. Once the
+    cool down expires, a single trial request is let through: if it
+    succeeds the circuit closes again, otherwise it stays open for
+    another cool down period. The class is thread safe.
+
+    Parameters
+    ----------
+    failure_threshold
+        The number of consecutive failures which opens the circuit
+    cool_down
+        The time, in seconds, the circuit stays open
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    """
+
+    _failure_threshold = 3
+    _cool_down = 60.0
+
+    def __init__(self, failure_threshold: int = 3, cool_down: float = 60.0):
+        if not isinstance(failure_threshold, int):
+            raise TypeError(
+                "The `failure_threshold` must be a int type object, received object of type {}".format(type(failure_threshold))
+            )
+
+        if not isinstance(cool_down, (int, float)):
+            raise TypeError("The `cool_down` must be a float type object, received object of type {}".format(type(cool_down)))
+
+        self._failure_threshold = failure_threshold
+        self._cool_down = float(cool_down)
+        self._failures = 0
+        self._open_until = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "CircuitBreaker(failure_threshold={}, cool_down={})".format(repr(self._failure_threshold), repr(self._cool_down))
+
+    @property
+    def is_open(self) -> bool:
+        """Whether requests are currently being refused"""
+        with self._lock:
+            return self._open_until is not None and time.monotonic() < self._open_until
+
+    @property
+    def remaining_cool_down(self) -> float:
+        """The time, in seconds, until the circuit lets a trial request through"""
+        with self._lock:
+            if self._open_until is None:
+                return 0.0
+            return max(0.0, self._open_until - time.monotonic())
+
+    def allow(self) -> bool:
+        """Check if a request may be sent
+
+        Returns
+        -------
+        bool
+            `False` while the circuit is open, `True` otherwise. When the
+            cool down has expired, only the first caller is allowed
+            through, until the outcome of its request is recorded.
+
+        """
+        with self._lock:
+            if self._open_until is None:
+                return True
+            now = time.monotonic()
+            if now < self._open_until:
+                return False
+            self._open_until = now + self._cool_down  # Half-open, let a single trial through
+            return True
+
+    def record_success(self):
+        """Record a successful request, which closes the circuit"""
+        with self._lock:
+            self._failures = 0
+            self._open_until = None
+
+    def record_failure(self):
+        """Record a failed request, which opens the circuit if the threshold is reached"""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self._failure_threshold:
+                self._open_until = time.monotonic() + self._cool_down
@@ -5,22 +5,102 @@ Contains classes and functions used to manage the runs and their tasks.
 
 """
 
+import concurrent.futures
 import datetime
 import inspect
 import json
 import logging
+import os
 import shutil
+import threading
+import time
 import traceback
+import uuid
 import warnings
+from concurrent.futures import Future
 from pathlib import Path
 
-import humanize
-
 from lip_pps_run_manager import __version__
-from lip_pps_run_manager.telegram_reporter import TelegramReporter
+from lip_pps_run_manager.backup_index import BackupIndex
+from lip_pps_run_manager.backup_store import BackupStore
+from lip_pps_run_manager.backup_store import _check_compression
+from lip_pps_run_manager.backup_store import write_script_backup
+from lip_pps_run_manager.catalog import _update_catalog
+from lip_pps_run_manager.file_copy import copy_file
+from lip_pps_run_manager.outbox import TelegramOutbox
+from lip_pps_run_manager.progress import ProgressEstimator
+from lip_pps_run_manager.progress import SharedProgressCounter
+from lip_pps_run_manager.progress import SlidingWindowEstimator
+from lip_pps_run_manager.snapshot import snapshot_locals
+from lip_pps_run_manager.task_graph import TaskGraph
+from lip_pps_run_manager.task_report import read_task_report
+from lip_pps_run_manager.task_report import read_task_status
+from lip_pps_run_manager.task_report import task_fingerprint
+from lip_pps_run_manager.task_report import write_task_report
 
 # TODO: Add logger options to the managers
 
+trash_directory_name = ".trash"
+
+
+def _empty_trash(trash_path: Path):
+    """Internal function to delete everything in a trash directory
+
+    Errors are ignored, whatever can not be deleted now is deleted the
+    next time the trash is emptied.
+    """
+    for entry in list(trash_path.iterdir()):
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            try:
+                entry.unlink()
+            except OSError:  # pragma: no cover
+                pass
+
+
+_trash_cleanup_lock = threading.Lock()
+_trash_cleanup_threads = {}
+_trash_cleanup_pending = set()
+
+
+def _clean_trash(trash_path: Path):
+    """Internal function of the cleanup thread of a run, emptying the trash until nothing more is moved to it"""
+    while True:
+        with _trash_cleanup_lock:
+            _trash_cleanup_pending.discard(trash_path)
+        _empty_trash(trash_path)
+        with _trash_cleanup_lock:
+            if trash_path not in _trash_cleanup_pending:
+                del _trash_cleanup_threads[trash_path]
+                return
+
+
+def _start_trash_cleanup(trash_path: Path) -> threading.Thread:
+    """Internal function to empty the trash of a run in the background, returning the cleanup thread
+
+    There is at most one cleanup thread per run, if it is already
+    running it empties the trash once more instead of starting another.
+    """
+    trash_path = trash_path.absolute()
+    with _trash_cleanup_lock:
+        thread = _trash_cleanup_threads.get(trash_path)
+        if thread is not None:
+            _trash_cleanup_pending.add(trash_path)
+            return thread
+        thread = threading.Thread(target=_clean_trash, args=(trash_path,), name="task_cleanup")
+        _trash_cleanup_threads[trash_path] = thread
+        thread.start()
+        return thread
+
+
+def _wait_for_trash_cleanup(trash_path: Path):
+    """Internal function to wait for the cleanup thread of a run, if any, to finish emptying its trash"""
+    with _trash_cleanup_lock:
+        thread = _trash_cleanup_threads.get(trash_path.absolute())
+    if thread is not None:
+        thread.join()
+
 
 def clean_path(path_to_clean: Path) -> Path:
     """Clean a path from dangerous characters
@@ -114,6 +194,9 @@ def run_exists(path_to_directory: Path, run_name: str) -> bool:
 def create_run(path_to_directory: Path, run_name: str) -> Path:
     """Create a new run in a given directory
 
+    If the directory has a run catalog, see `RunCatalog`, the run is
+    added to it.
+
     Parameters
     ----------
     path_to_directory
@@ -164,10 +247,17 @@ def create_run(path_to_directory: Path, run_name: str) -> Path:
             )
         )
 
+    _update_catalog(path_to_directory, lambda catalog: catalog.add_run(run_name))
+
     return run_path
 
 
-def load_telegram_config() -> json:
+_telegram_config_lock = threading.Lock()
+_telegram_config_cache = {}
+_injected_telegram_config = None
+
+
+def load_telegram_config(path_to_config: Path = None) -> json:
     """Load the config file with the telegram configuration information.
 
     The function searches for a config file in the working directory
@@ -175,27 +265,79 @@ def load_telegram_config() -> json:
     does not exist, it tries searching for a config file in the home
     directory with the name '.run_manager_telegram_config.json'
 
+    The parsed config is cached for the whole process, keyed on the path
+    of the file, its modification time and its size, so the file is
+    only read again if it changes and all the managers share the same
+    config. The cache is inherited by the worker processes started with
+    fork, so calling this function before starting them preloads the
+    config for all of them. A config set with `set_telegram_config`
+    takes precedence over the config files.
+
+    Parameters
+    ----------
+    path_to_config
+        The path to a specific config file, instead of searching for it
+
     Returns
     -------
     json
-        The json representation of the config file
+        The json representation of the config file, it is shared so it
+        should not be modified
 
     Examples
     --------
     >>> import lip_pps_run_manager.run_manager as RM
-    >>> print(RM.create_run(Path("."), "Run0001"))
+    >>> print(RM.load_telegram_config())
     """
+    if _injected_telegram_config is not None:
+        return _injected_telegram_config
+
+    if path_to_config is None:
+        path_to_config = Path.cwd() / "run_manager_telegram_config.json"
+        try:
+            stat = path_to_config.stat()
+        except FileNotFoundError:  # pragma: no cover
+            path_to_config = Path.home() / ".run_manager_telegram_config.json"
+            stat = path_to_config.stat()
+    else:
+        stat = path_to_config.stat()
+
+    key = (str(path_to_config.absolute()), stat.st_mtime_ns, stat.st_size)
+    with _telegram_config_lock:
+        config = _telegram_config_cache.get(key)
+        if config is None:
+            with path_to_config.open("r", encoding="utf-8") as file:
+                config = json.load(file)
+            _telegram_config_cache.clear()  # Only the current version of the config files is kept
+            _telegram_config_cache[key] = config
+    return config
+
+
+def set_telegram_config(config: dict = None):
+    """Set the telegram configuration of the process, instead of loading it from a config file
+
+    Parameters
+    ----------
+    config
+        The telegram configuration, with the syntax of the config file,
+        see the `RunManager`. If `None`, the config files are used again
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
 
-    home_config = Path.home() / ".run_manager_telegram_config.json"
-    script_config = Path.cwd() / "run_manager_telegram_config.json"
+    Examples
+    --------
+    >>> import lip_pps_run_manager.run_manager as RM
+    >>> RM.set_telegram_config({"bots": {"bot_name": "bot_token"}, "chats": {"chat_name": "chat_id"}})
+    """
+    global _injected_telegram_config
 
-    if script_config.is_file():
-        config_file = script_config
-    else:  # pragma: no cover
-        config_file = home_config
+    if config is not None and not isinstance(config, dict):
+        raise TypeError("The `config` must be a dict type object or None, received object of type {}".format(type(config)))
 
-    with config_file.open("r", encoding="utf-8") as file:
-        return json.load(file)
+    _injected_telegram_config = config
 
 
 class RunManager:
@@ -215,7 +357,10 @@ class RunManager:
     A default config file should be placed in the home directory and
     have the name '.run_manager_telegram_config.json'. A specific config
     file should be placed in the current running directory and have the
-    name 'run_manager_telegram_config.json'
+    name 'run_manager_telegram_config.json'. The config is only read
+    once per process while it does not change, see
+    `load_telegram_config`, and it can also be set without a file with
+    `set_telegram_config`.
 
     .. code-block::
         :caption: Example Telegram Bot Configuration File
@@ -256,6 +401,23 @@ class RunManager:
         The telegram bot token to use (this value should be a secret, so do not share it) for the `TelegramReporter`, if any.
     telegram_chat_id
         The telegram chat ID the reporter should send messages to
+    rate_limit
+        If set, messages will be delayed to respect the rate limits set
+        by telegram
+    asynchronous_telegram
+        If set, the messages to telegram are delivered by a background
+        worker thread so that sending a message never blocks. In this
+        mode, `send_message` and `edit_message` return a `Future` which
+        resolves to the message ID instead of the message ID itself
+    telegram_outbox
+        If set, the messages to telegram which can not be delivered
+        because of connection problems are stored in the
+        'telegram_outbox.jsonl' file in the run directory and sent once
+        the connection is back
+    backup_store
+        If set, the backups of the run, and of the scripts processing
+        its tasks, are kept in this `BackupStore`, with only a small
+        manifest in the run directory, instead of full copies
 
     Raises
     ------
@@ -279,7 +441,15 @@ class RunManager:
     _status_message_id = None
     _in_run_context = False
     _rate_limit = True
+    _rate_limiter = None
+    _asynchronous_telegram = False
+    _telegram_outbox = False
+    _asyncio_telegram = False
+    _backup_store = None
+    _copy_executor = None
+    _backup_indexes = None
     _logger = None
+    _message_id_timeout = 10.0
 
     def __init__(
         self,
@@ -289,6 +459,9 @@ class RunManager:
         telegram_bot_token: str = None,
         telegram_chat_id: str = None,
         rate_limit: bool = True,
+        asynchronous_telegram: bool = False,
+        telegram_outbox: bool = False,
+        backup_store: BackupStore = None,
     ):
         if not isinstance(path_to_run_directory, Path):
             raise TypeError(
@@ -316,7 +489,23 @@ class RunManager:
         if not isinstance(rate_limit, bool):
             raise TypeError("The `rate_limit` must be a bool type object, received object of type {}".format(type(rate_limit)))
 
+        if not isinstance(asynchronous_telegram, bool):
+            raise TypeError(
+                "The `asynchronous_telegram` must be a bool type object, received object of type {}".format(type(asynchronous_telegram))
+            )
+
+        if not isinstance(telegram_outbox, bool):
+            raise TypeError(
+                "The `telegram_outbox` must be a bool type object, received object of type {}".format(type(telegram_outbox))
+            )
+
+        if backup_store is not None and not isinstance(backup_store, BackupStore):
+            raise TypeError(
+                "The `backup_store` must be a BackupStore type object or None, received object of type {}".format(type(backup_store))
+            )
+
         self._path_directory = path_to_run_directory
+        self._backup_store = backup_store
 
         telegram_config = None
         if telegram_bot_name is not None or telegram_chat_name is not None:
@@ -336,16 +525,24 @@ class RunManager:
 
         if self._bot_token is not None and self._chat_id is not None:
             self._rate_limit = rate_limit
+            self._asynchronous_telegram = asynchronous_telegram
+            self._telegram_outbox = telegram_outbox
         else:
             self._bot_token = None
             self._chat_id = None
 
+        self._backup_indexes = {}
+        self._backup_indexes_lock = threading.Lock()
         self._logger = logging.getLogger(self.run_name)
 
     def __repr__(self):
         """Get the python representation of this class"""
+        store_str = ""
+        if self._backup_store is not None:
+            store_str = ", backup_store={}".format(repr(self._backup_store))
+
         if self._bot_token is None or self._chat_id is None:
-            return "RunManager({})".format(repr(self.path_directory))
+            return "RunManager({}{})".format(repr(self.path_directory), store_str)
         else:
             classRepr = "RunManager({}".format(repr(self.path_directory))
             if self._bot_name is not None:
@@ -356,7 +553,12 @@ class RunManager:
                 classRepr += ", telegram_chat_name={}".format(repr(self._chat_name))
             else:
                 classRepr += ", telegram_chat_id={}".format(repr(self._chat_id))
-            classRepr += ", rate_limit={})".format(self._rate_limit)
+            classRepr += ", rate_limit={}".format(self._rate_limit)
+            if self._asynchronous_telegram:
+                classRepr += ", asynchronous_telegram={}".format(self._asynchronous_telegram)
+            if self._telegram_outbox:
+                classRepr += ", telegram_outbox={}".format(self._telegram_outbox)
+            classRepr += store_str + ")"
             return classRepr
 
     @property
@@ -416,12 +618,41 @@ class RunManager:
         """The name of the run property getter method"""
         return self._path_directory.parts[-1]
 
+    def _create_telegram_reporter(self):
+        """Internal method to create the telegram reporter, the asyncio one when inside an "async with" block"""
+        # The reporters are imported when first needed, since importing requests and asyncio is slow
+        if self._asyncio_telegram:
+            from lip_pps_run_manager.async_telegram_reporter import AsyncTelegramReporter
+
+            return AsyncTelegramReporter(self._bot_token, self._chat_id, rate_limit=self._rate_limit, rate_limiter=self._rate_limiter)
+        from lip_pps_run_manager.telegram_reporter import TelegramReporter
+
+        return TelegramReporter(
+            self._bot_token,
+            self._chat_id,
+            rate_limit=self._rate_limit,
+            asynchronous=self._asynchronous_telegram,
+            rate_limiter=self._rate_limiter,
+        )
+
+    def _attach_telegram_outbox(self):
+        """Internal method to give the telegram reporter an outbox in the run directory, if configured and possible"""
+        if not self._telegram_outbox or self._telegram_reporter is None or self._telegram_reporter.outbox is not None:
+            return
+        if not hasattr(self._telegram_reporter, "set_outbox"):
+            return  # Not supported by the asyncio reporter
+        if not run_exists(self.path_directory.parent, self.run_name):
+            return  # The outbox is attached once the run is created
+
+        self._telegram_reporter.set_outbox(TelegramOutbox(self.path_directory / "telegram_outbox.jsonl"))
+
     def __enter__(self):
         """This is the method that is called when using the "with" syntax"""
         self._in_run_context = True
 
         if self._bot_token is not None and self._chat_id is not None:
-            self._telegram_reporter = TelegramReporter(self._bot_token, self._chat_id, rate_limit=self._rate_limit)
+            self._telegram_reporter = self._create_telegram_reporter()
+            self._attach_telegram_outbox()
             self._status_message_id = self.send_message("⏰ Preparing for Run {}".format(self.run_name))
 
         return self
@@ -435,9 +666,36 @@ class RunManager:
                 self.send_message("✔️✔️ Successfully Finished processing Run {} ✔️✔️".format(self.run_name), self._status_message_id)
             else:
                 self.send_message("🚫🚫 Finished processing Run {} with errors 🚫🚫".format(self.run_name), self._status_message_id)
+            self._telegram_reporter.close()
 
+        self._wait_for_copies()
+        _wait_for_trash_cleanup(self.path_directory / trash_directory_name)
         self._in_run_context = False
 
+    async def __aenter__(self):
+        """This is the method that is called when using the "async with" syntax
+
+        Inside an "async with" block, the messages to telegram are sent
+        by an `AsyncTelegramReporter` on the running event loop, so that
+        they overlap with the other coroutines (e.g. instrument I/O)
+        instead of blocking them. `send_message` and `edit_message`
+        return a `Future` which resolves to the message ID.
+        """
+        self._asyncio_telegram = True
+        return self.__enter__()
+
+    async def __aexit__(self, err_type, err_value, err_traceback):
+        """This is the method that is called at the end of the block, when using the "async with" syntax
+
+        Waits for all the messages to telegram to be delivered.
+        """
+        from lip_pps_run_manager.async_telegram_reporter import AsyncTelegramReporter
+
+        self.__exit__(err_type, err_value, err_traceback)
+        if isinstance(self._telegram_reporter, AsyncTelegramReporter):
+            await self._telegram_reporter.flush()
+        self._asyncio_telegram = False
+
     def create_run(self, raise_error: bool = False):
         """Creates a run where this `RunManager` is pointing to.
 
@@ -477,6 +735,7 @@ class RunManager:
             create_run(path_to_directory=self.path_directory.parent, run_name=self.run_name)
 
         if self._telegram_reporter is not None:
+            self._attach_telegram_outbox()
             run_status = "🚀🚀🚀 Started processing Run {}".format(self.run_name)
             if not self._status_message_id:
                 self._status_message_id = self.send_message(run_status)
@@ -493,6 +752,12 @@ class RunManager:
         loop_iterations: int = None,
         minimum_update_time_seconds: int = 60,
         minimum_warn_time_seconds: int = 60,
+        eta_estimator: ProgressEstimator = None,
+        locals_repr_limit: int = 200,
+        backup_compression: str = None,
+        background_cleanup: bool = False,
+        inputs: list = None,
+        parameters: dict = None,
     ):
         """Method that creates a handle to a manager for a specific task
 
@@ -525,6 +790,28 @@ class RunManager:
             The minimum time allowed between warnings to telegram. This
             parameter is important in order to guarantee that the limits
             imposed by telegram are respected.
+        eta_estimator
+            The estimator of the processing rate used to compute the
+            expected finish time of the task, see the `TaskManager`
+        locals_repr_limit
+            The maximum length of the repr of each local variable kept
+            in the backup of the python file, see the `TaskManager`
+        backup_compression
+            The compression of the backup of the python file, `None`,
+            "gzip" or "zstd", see the `TaskManager`
+        background_cleanup
+            If set, the old data of the task is deleted in the
+            background, see the `TaskManager`
+        inputs
+            The paths to the input files of the task, see the
+            `TaskManager`
+        parameters
+            The parameters of the task, see the `TaskManager`. When
+            `inputs` or `parameters` are declared, the task is up to
+            date if they, and the python file if `backup_python_file` is
+            set, did not change since the task last finished with no
+            errors. The body of the "with" block must check `up_to_date`
+            to skip the processing
 
         Raises
         ------
@@ -546,6 +833,15 @@ class RunManager:
 
         The above code should create the Run0001 directory and then
         create a subdirectory for the task "myTask".
+
+        >>> with RM.RunManager("Run0001") as John:
+        ...   with John.handle_task("myTask", inputs=[Path("raw.bin")], parameters={"threshold": 3}) as taskHandler:
+        ...     if not taskHandler.up_to_date:
+        ...       print("Processing task")
+
+        The above code only processes the task if the input file, the
+        parameters or the script changed since the task last ran with
+        no errors.
         """
         if not self._in_run_context:
             raise RuntimeError("Tried calling handle_task() while not inside a run context. Use the 'with RunManager as handle' syntax")
@@ -595,6 +891,13 @@ class RunManager:
             loop_iterations=loop_iterations,
             minimum_update_time_seconds=minimum_update_time_seconds,
             minimum_warn_time_seconds=minimum_warn_time_seconds,
+            eta_estimator=eta_estimator,
+            backup_store=self._backup_store,
+            locals_repr_limit=locals_repr_limit,
+            backup_compression=backup_compression,
+            background_cleanup=background_cleanup,
+            inputs=inputs,
+            parameters=parameters,
         )
         TM._run_created = self._run_created
         TM._in_run_context = self._in_run_context
@@ -603,11 +906,105 @@ class RunManager:
             TM._chat_name = self._chat_name
             TM._bot_token = self._bot_token
             TM._chat_id = self._chat_id
+            TM._asynchronous_telegram = self._asynchronous_telegram
+            TM._telegram_outbox = self._telegram_outbox
+            TM._asyncio_telegram = self._asyncio_telegram
             TM._telegram_reporter = self._telegram_reporter
             TM._status_message_id = self._status_message_id
 
         return TM
 
+    def run_task_graph(self, graph: TaskGraph, max_workers: int = None, executor: concurrent.futures.Executor = None) -> dict:
+        """Process the tasks of a `TaskGraph`, running the independent tasks concurrently
+
+        Each task is processed, in a worker process, by its own
+        `TaskManager` as soon as all the tasks it depends on finished
+        with no errors (or incomplete), so the time to process the run
+        is that of the longest chain of dependent tasks. The tasks which
+        depend on a task which failed are skipped. The telegram
+        configuration of the run is used by all the tasks, their
+        messages are replies to the status message of the run and,
+        since the workers may be other processes, they share the rate
+        limits of telegram through the 'telegram_rate_limit.json' file
+        of the run. The workers do not keep a telegram outbox, so that
+        they do not all write to the same file.
+
+        Parameters
+        ----------
+        graph
+            The graph of tasks to process
+        max_workers
+            The maximum number of tasks processed at once, by default
+            the number of processors
+        executor
+            The executor processing the tasks, by default a pool of
+            `max_workers` processes
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the incorrect type
+        RuntimeError
+            If called while not inside a run context
+
+        Returns
+        -------
+        dict
+            The status of each task: "no errors", "incomplete", "there
+            were errors" or "skipped"
+
+        Examples
+        --------
+        See the `TaskGraph`.
+
+        """
+        if not self._in_run_context:
+            raise RuntimeError("Tried calling run_task_graph() while not inside a run context. Use the 'with RunManager as handle' syntax")
+
+        if not isinstance(graph, TaskGraph):
+            raise TypeError("The `graph` must be a TaskGraph type object, received object of type {}".format(type(graph)))
+
+        if max_workers is not None and not isinstance(max_workers, int):
+            raise TypeError("The `max_workers` must be a int type object or None, received object of type {}".format(type(max_workers)))
+
+        if not self._run_created:
+            self.create_run(True)
+
+        task_options = {"backup_store": self._backup_store}
+        rate_limit_file = None
+        if self._bot_token is not None and self._chat_id is not None:
+            task_options.update(
+                {
+                    "telegram_bot_token": self._bot_token,
+                    "telegram_chat_id": self._chat_id,
+                    "rate_limit": self._rate_limit,
+                }
+            )
+            if self._rate_limit:
+                rate_limit_file = self.path_directory / "telegram_rate_limit.json"
+        return graph.run(
+            self.path_directory,
+            max_workers=max_workers,
+            executor=executor,
+            task_options=task_options,
+            status_message_id=self._resolved_status_message_id(),
+            rate_limit_file=rate_limit_file,
+        )
+
+    def _resolved_status_message_id(self):
+        """Internal method to get the ID of the status message of the run, waiting for it if the messages are asynchronous
+
+        Returns `None` if the message was not sent in time or failed.
+        Inside an "async with" block the message is sent by the event
+        loop this method blocks, so it is only used if already sent.
+        """
+        if not isinstance(self._status_message_id, Future):
+            return self._status_message_id
+        try:
+            return self._status_message_id.result(timeout=0 if self._asyncio_telegram else self._message_id_timeout)
+        except Exception:  # e.g. a TimeoutError
+            return None
+
     def get_task_path(self, task_name: str) -> Path:
         """Retrieve the `Path` of a given task
 
@@ -679,18 +1076,7 @@ class RunManager:
         if not isinstance(task_name, str):
             raise TypeError("The `task_name` must be a str type object, received object of type {}".format(type(task_name)))
 
-        success = False
-
-        try:
-            with open(self.get_task_path(task_name) / "task_report.txt", "r") as in_file:
-                for line in in_file:
-                    if "task_status: no errors" in line or "task_status: incomplete" in line:
-                        success = True
-                        break
-        except FileNotFoundError:
-            pass
-
-        return success
+        return read_task_status(self.get_task_path(task_name)) in ["no errors", "incomplete"]
 
     def task_completed(self, task_name: str) -> bool:
         """Check if a task has completed with success
@@ -722,18 +1108,7 @@ class RunManager:
         if not isinstance(task_name, str):
             raise TypeError("The `task_name` must be a str type object, received object of type {}".format(type(task_name)))
 
-        success = False
-
-        try:
-            with open(self.get_task_path(task_name) / "task_report.txt", "r") as in_file:
-                for line in in_file:
-                    if "task_status: no errors" in line:
-                        success = True
-                        break
-        except FileNotFoundError:
-            pass
-
-        return success
+        return read_task_status(self.get_task_path(task_name)) == "no errors"
 
     def send_message(self, message: str, reply_to_message_id: str = None):
         """Send a message to telegram
@@ -757,7 +1132,10 @@ class RunManager:
         Returns
         -------
         message_id: str
-            The telegram message id of the message which was just written
+            The telegram message id of the message which was just written,
+            or `None` if the communication with telegram failed. If the
+            telegram messages are asynchronous, a `Future` which resolves to
+            the message id is returned instead
 
         Examples
         --------
@@ -773,7 +1151,7 @@ class RunManager:
         if not isinstance(message, str):
             raise TypeError("The `message` must be a str type object, received object of type {}".format(type(message)))
 
-        if reply_to_message_id is not None and not isinstance(reply_to_message_id, str):
+        if reply_to_message_id is not None and not isinstance(reply_to_message_id, (str, Future)):
             raise TypeError(
                 "The `reply_to_message_id` must be a str type object or None, received object of type {}".format(type(reply_to_message_id))
             )
@@ -781,11 +1159,17 @@ class RunManager:
         if self._telegram_reporter is None:
             raise RuntimeError("You can only send messages if the TelegramReporter is configured")
 
+        if self._telegram_reporter.asynchronous:
+            return self._telegram_reporter.submit_message(message, reply_to_message_id)
+
         try:
             self._telegram_response = self._telegram_reporter.send_message(message, reply_to_message_id)
         except Exception as e:
+            self._telegram_response = None
             warnings.warn("Could not connect to Telegram to send the message. Reason: {}".format(repr(e)), category=RuntimeWarning)
 
+        if self._telegram_response is None:
+            return None
         return self._telegram_response['result']['message_id']
 
     def edit_message(self, message: str, message_id: str):
@@ -810,7 +1194,10 @@ class RunManager:
         Returns
         -------
         message_id: str
-            The telegram message id of the message which was just written
+            The telegram message id of the message which was just written,
+            or `None` if the communication with telegram failed. If the
+            telegram messages are asynchronous, a `Future` which resolves to
+            the message id is returned instead
 
         Examples
         --------
@@ -827,22 +1214,33 @@ class RunManager:
         if not isinstance(message, str):
             raise TypeError("The `message` must be a str type object, received object of type {}".format(type(message)))
 
-        if not isinstance(message_id, str):
+        if not isinstance(message_id, (str, Future)):
             raise TypeError("The `message_id` must be a str type object, received object of type {}".format(type(message_id)))
 
         if self._telegram_reporter is None:
             raise RuntimeError("You can only send messages if the TelegramReporter is configured")
 
+        if self._telegram_reporter.asynchronous:
+            return self._telegram_reporter.submit_edit(message, message_id)
+
         try:
             self._telegram_response = self._telegram_reporter.edit_message(message, message_id)
         except Exception as e:
+            self._telegram_response = None
             warnings.warn("Could not connect to Telegram to send the message. Reason: {}".format(repr(e)), category=RuntimeWarning)
 
+        if self._telegram_response is None:
+            return None
         return self._telegram_response['result']['message_id']
 
-    def copy_file_to(self, source: Path, destination: Path, overwrite: bool = False):
+    def copy_file_to(self, source: Path, destination: Path, overwrite: bool = False, verify: bool = False, background: bool = False):
         """Creates a copy of the source file to the destination.
 
+        The copy is made with the fastest method supported by the
+        filesystem, see `file_copy.copy_file`, so that large files, such
+        as raw data files, are copied quickly. Within a task, the
+        progress of the copy is shown in the status of the task.
+
         Parameters
         ----------
         source
@@ -855,6 +1253,14 @@ class RunManager:
             action will only be taken if the `overwrite` flag is set.
         overwrite
             Whether to overwrite the destination file in case it already exists
+        verify
+            If set, the checksums of the source and of the copy are
+            compared once the copy is done
+        background
+            If set, the copy is made by a background thread, so the
+            processing can continue while the file is being copied. All
+            the background copies are waited for at the end of the run
+            or task context
 
         Raises
         ------
@@ -864,10 +1270,18 @@ class RunManager:
             If the `source` does not exist, if the `destination` does not exist
             and the parent directory does not exist or if the `destination`
             does exist and `overwrite` is not set.
+            If `verify` is set and the checksums of the copy do not match
         SameFileError
             If `source` and `destination` are the same file, a SameFileError
             will be raised.
 
+        Returns
+        -------
+        Future
+            If `background` is set, a `concurrent.futures.Future` which
+            resolves to the path of the copy once it is done, and raises
+            the error of the copy if it fails. Otherwise `None`
+
         Examples
         --------
         >>> import lip_pps_run_manager as RM
@@ -887,6 +1301,12 @@ class RunManager:
         if not isinstance(destination, Path):
             raise TypeError(f"The `destination` must be a Path type object, received object of type {type(destination)} instead")
 
+        if not isinstance(verify, bool):
+            raise TypeError(f"The `verify` must be a bool type object, received object of type {type(verify)} instead")
+
+        if not isinstance(background, bool):
+            raise TypeError(f"The `background` must be a bool type object, received object of type {type(background)} instead")
+
         if not source.exists() or not source.is_file():
             raise RuntimeError("The source file does not exist or it is not a file.")
 
@@ -900,9 +1320,37 @@ class RunManager:
             else:
                 destination = destination / source.name
 
-        shutil.copy(source, destination)
+        if destination.exists() and os.path.samefile(source, destination):
+            raise shutil.SameFileError("{!r} and {!r} are the same file".format(source, destination))
+
+        if background:
+            return self._submit_copy(self._copy_file, source, destination, verify)
+        self._copy_file(source, destination, verify)
+
+    def _submit_copy(self, function, *args) -> Future:
+        """Internal method to run a copy in a background thread"""
+        if self._copy_executor is None:
+            self._copy_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="file_copy")
+        return self._copy_executor.submit(function, *args)
 
-    def backup_file(self, source: Path):
+    def _copy_file(self, source: Path, destination: Path, verify: bool) -> Path:
+        """Internal method to copy a file, reporting the progress of the copy"""
+        copy_file(source, destination, progress=lambda copied, total: self._report_copy_progress(destination, copied, total), verify=verify)
+        return destination
+
+    def _report_copy_progress(self, destination: Path, copied: int, total: int):
+        """Internal method called as a copy progresses, the run does not show the progress of copies"""
+        pass
+
+    def _wait_for_copies(self):
+        """Internal method to wait for all the background copies to finish"""
+        if self._copy_executor is not None:
+            self._copy_executor.shutdown(wait=True)
+            self._copy_executor = None
+
+    def backup_file(
+        self, source: Path, verify: bool = False, background: bool = False, incremental: bool = False, compare_hash: bool = False
+    ):
         """Creates a backup of the file inside the run directory under the
         backup subdirectory.
 
@@ -910,13 +1358,37 @@ class RunManager:
         ----------
         source
             The path to the source file. The file must exist
+        verify
+            If set, the checksums of the source and of the copy are
+            compared, see `copy_file_to`
+        background
+            If set, the copy is made by a background thread, see
+            `copy_file_to`
+        incremental
+            If set, the backup is skipped if the file did not change
+            since its last backup, i.e. if its size and modification
+            time are the ones recorded in the 'backup_index.json' index
+            of the backup directory, see `BackupIndex`
+        compare_hash
+            If set, in the incremental mode, a file which was touched
+            but whose size did not change is compared by its checksum,
+            also recorded in the index, before being copied again
 
         Raises
         ------
         TypeError
             If the type of one of the parameters is not correct
         RuntimeError
-            If the `source` does not exist.
+            If the `source` does not exist, or if `verify` is set and the
+            checksums do not match
+
+        Returns
+        -------
+        Future
+            If `background` is set, a `concurrent.futures.Future` of the
+            backup, see `copy_file_to`, whose result is the path to the
+            backup, or to its manifest if the run has a `BackupStore`.
+            Otherwise `None`
 
         Examples
         --------
@@ -928,20 +1400,171 @@ class RunManager:
 
         The above code should create a backup copy of the `src.file` in the
         backup directory of the run, if the `src.file` exists. If not, a
-        RuntimeError will be raised.
+        RuntimeError will be raised. If the run has a `BackupStore`, the
+        content is kept in the store and a 'src.file.manifest.json'
+        manifest is created in the backup directory instead. The options
+        apply to the store as well: `verify` reads the stored content
+        back and the incremental mode skips the file if its manifest is
+        up to date.
+
+        """
+        return self._backup_file(source, verify, background, incremental, compare_hash)
+
+    def backup_files(
+        self, sources: list, verify: bool = False, incremental: bool = False, compare_hash: bool = False, max_workers: int = 4
+    ):
+        """Creates backups of several files at once, see `backup_file`
+
+        The files are backed up concurrently by a pool of threads, and
+        the index of the incremental mode is written once for all the
+        files.
+
+        Parameters
+        ----------
+        sources
+            The list of paths to the source files. The files must exist
+        verify
+            If set, the checksums of the sources and of the copies are
+            compared
+        incremental
+            If set, the files which did not change since their last
+            backup are skipped
+        compare_hash
+            If set, in the incremental mode, the files which were
+            touched are compared by their checksum
+        max_workers
+            The number of threads making the backups
+
+        Raises
+        ------
+        TypeError
+            If the type of one of the parameters is not correct
+        RuntimeError
+            If one of the `sources` does not exist.
+        ValueError
+            If two of the `sources` have the same file name, since their
+            backups would have the same name
+
+        Returns
+        -------
+        list
+            For each source file, whether it was backed up (`False` if
+            it was skipped because it did not change)
+
+        Examples
+        --------
+        >>> import lip_pps_run_manager as RM
+        >>> from pathlib import Path
+        >>> with RM.RunManager("Run0001") as John
+        ...   John.create_run(True)
+        ...   John.backup_files(list(Path("calibration").glob("*.json")), incremental=True)
 
         """
+        if not isinstance(sources, list):
+            raise TypeError(f"The `sources` must be a list type object, received object of type {type(sources)} instead")
+
+        if not isinstance(max_workers, int):
+            raise TypeError(f"The `max_workers` must be a int type object, received object of type {type(max_workers)} instead")
+
+        backup_names = set()
+        for source in sources:
+            self._check_backup_parameters(source, verify, incremental, compare_hash)
+            if self._backup_name(source) in backup_names:
+                raise ValueError("The `sources` must have distinct file names, {} is backed up more than once".format(source.name))
+            backup_names.add(self._backup_name(source))
+
+        backup_path = self._backup_directory_of_files()
+        index = self._backup_index(backup_path) if incremental else None
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backup") as executor:
+                return list(executor.map(lambda source: self._backup_one_file(source, backup_path, index, verify, compare_hash), sources))
+        finally:
+            if index is not None:
+                index.save()
+
+    def _backup_index(self, backup_path: Path) -> BackupIndex:
+        """Internal method to get the index of a backup directory, shared by all the backups of this manager"""
+        with self._backup_indexes_lock:
+            if backup_path not in self._backup_indexes:
+                self._backup_indexes[backup_path] = BackupIndex(backup_path)
+            return self._backup_indexes[backup_path]
+
+    def _backup_directory_of_files(self) -> Path:
+        """Internal method to get the directory where the backups of files are kept, creating it if needed"""
+        backup_path = self.backup_directory
+        backup_path.mkdir(exist_ok=True)
+        return backup_path
+
+    def _backup_name(self, source: Path) -> str:
+        """Internal method to get the name of the backup of a file"""
+        return source.name
+
+    def _check_backup_parameters(self, source: Path, verify: bool, incremental: bool, compare_hash: bool):
+        """Internal method to check the parameters of a backup"""
         if not isinstance(source, Path):
             raise TypeError(f"The `source` must be a Path type object, received object of type {type(source)} instead")
 
+        if not isinstance(incremental, bool):
+            raise TypeError(f"The `incremental` must be a bool type object, received object of type {type(incremental)} instead")
+
+        if not isinstance(compare_hash, bool):
+            raise TypeError(f"The `compare_hash` must be a bool type object, received object of type {type(compare_hash)} instead")
+
+        if not isinstance(verify, bool):
+            raise TypeError(f"The `verify` must be a bool type object, received object of type {type(verify)} instead")
+
         if not source.exists() or not source.is_file():
             raise RuntimeError("The source file does not exist or it is not a file.")
 
-        backup_path = self.backup_directory
-        if not backup_path.exists():
-            backup_path.mkdir()
+    def _backup_file(self, source: Path, verify: bool, background: bool, incremental: bool, compare_hash: bool):
+        """Internal method with the implementation of `backup_file`"""
+        self._check_backup_parameters(source, verify, incremental, compare_hash)
+
+        if not isinstance(background, bool):
+            raise TypeError(f"The `background` must be a bool type object, received object of type {type(background)} instead")
+
+        backup_path = self._backup_directory_of_files()
+        if self._backup_store is None and not incremental:
+            return self.copy_file_to(source, backup_path / self._backup_name(source), overwrite=True, verify=verify, background=background)
 
-        self.copy_file_to(source, backup_path, overwrite=True)
+        index = self._backup_index(backup_path) if incremental else None
+
+        def backup():
+            self._backup_one_file(source, backup_path, index, verify, compare_hash)
+            if index is not None:
+                index.save()
+            return self._backup_destination(source, backup_path)
+
+        if background:
+            return self._submit_copy(backup)
+        backup()
+
+    def _backup_destination(self, source: Path, backup_path: Path) -> Path:
+        """Internal method to get the path to the backup of a file, the manifest if the run has a `BackupStore`"""
+        destination = backup_path / self._backup_name(source)
+        if self._backup_store is not None:
+            return destination.with_name(destination.name + ".manifest.json")
+        return destination
+
+    def _store_backup(self, source: Path, destination: Path, verify: bool):
+        """Internal method to back up a file, to the `BackupStore` if the run has one"""
+        if self._backup_store is not None:
+            self._backup_store.backup_file(source, destination, verify=verify)
+        else:
+            self._copy_file(source, destination, verify)
+
+    def _backup_one_file(self, source: Path, backup_path: Path, index: BackupIndex, verify: bool, compare_hash: bool) -> bool:
+        """Internal method to back up a file, skipping it if it is in the index and did not change, `False` if skipped"""
+        destination = self._backup_destination(source, backup_path)
+        if index is None:
+            self._store_backup(source, destination, verify)
+            return True
+
+        needed = index.needs_backup(source, destination, compare_hash, compare_size=self._backup_store is None)
+        if needed:
+            self._store_backup(source, destination, verify)
+            index.record(source, destination, needed if isinstance(needed, str) else None)
+        return bool(needed)
 
 
 class TaskManager(RunManager):
@@ -993,14 +1616,73 @@ class TaskManager(RunManager):
         The minimum time allowed between warnings to telegram. This
         parameter is important in order to guarantee that the limits
         imposed by telegram are respected.
+    rate_limit
+        If set, messages will be delayed to respect the rate limits set
+        by telegram
+    asynchronous_telegram
+        If set, the messages to telegram are delivered by a background
+        worker thread so that the task loop never blocks on telegram
+    telegram_outbox
+        If set, the messages to telegram which can not be delivered are
+        stored in an outbox file in the run directory and sent later
+    eta_estimator
+        The estimator of the processing rate, from which the expected
+        finish time and the throughput of the task are computed. If
+        `None`, a `SlidingWindowEstimator` is used, so that a slow start
+        of the task does not affect the estimate for long. Until the
+        estimator knows the rate, the expected finish time is
+        extrapolated from the start of the task
+    backup_store
+        If set, the backups of the task, including the backup of
+        `script_to_backup`, are kept in this `BackupStore`, with only a
+        small manifest in the task directory, instead of full copies
+    locals_repr_limit
+        The local variables of the code entering the task are described
+        in the backup of `script_to_backup`. They are described when the
+        task is entered, by their type, shape, dtype, length and a repr
+        of at most this many characters, so that large variables, such
+        as big arrays, are neither slow to describe nor kept alive
+        during the task, see `snapshot.summarize_value`
+    backup_compression
+        The compression of the backup of `script_to_backup`, `None`,
+        "gzip" or "zstd", which adds the '.gz' or '.zst' suffix to the
+        backup. The zstd compression requires the `zstandard` package,
+        installed with the zstd extra. Ignored if there is a
+        `backup_store`
+    background_cleanup
+        If set, with `drop_old_data`, the old task directory is not
+        emptied when entering the task. Instead, it is renamed to the
+        '.trash' directory of the run, which is instantaneous, and
+        deleted by a background thread, so the task starts right away
+        with an empty directory. There is a single cleanup thread per
+        run, which the run context, or the task context if it is not
+        inside a run context, waits for when exiting
+    inputs
+        The paths to the input files of the task, which must exist. If
+        one does not, the task fails when it is entered: a report with
+        "there were errors" is written and the error is raised
+    parameters
+        The parameters of the task, which must be serialisable to json.
+        When `inputs` or `parameters` are declared, a fingerprint of the
+        inputs (their size and modification time), of the parameters
+        and of the content of `script_to_backup` is recorded in the task
+        report. If the previous run of the task finished with no errors
+        and with the same fingerprint, the task is up to date, see
+        `up_to_date`: if the body checks it, the data of the task is
+        kept and its reports are not rewritten. Only the script in `script_to_backup` is part of the
+        fingerprint, so without it changes to the script processing the
+        task do not make the task out of date
 
     Raises
     ------
     TypeError
         If the parameter has the incorrect type
+    ValueError
+        If the `backup_compression` is not known
     RuntimeError
         If the paths point to the wrong types (i.e. not a file for a file)
         If a directory which is not the directory of a run is passed
+        If the `backup_compression` needs a package which is not installed
 
     Examples
     --------
@@ -1027,6 +1709,25 @@ class TaskManager(RunManager):
     _minimum_update_time = None
     _minimum_warn_time = None
     _own_run_context = False
+    _bookkeeping_interval = 1.0  # The maximum time, in seconds, between two rounds of bookkeeping in loop_tick
+    _next_bookkeeping = 0.0  # The time.monotonic() deadline for the next round of bookkeeping, 0 forces one on the next tick
+    _tick_limit = float("inf")  # A tick above this count triggers the bookkeeping right away, to warn about the excess
+    _max_warning_categories = 100  # The maximum number of warning categories counted in the task report
+    _warning_samples_per_category = 3  # The number of recent messages of each warning category kept in the task report
+    _shared_progress = None
+    _eta_estimator = None
+    _custom_eta_estimator = False
+    _locals_repr_limit = 200
+    _backup_compression = None
+    _background_cleanup = False
+    _cleanup_thread = None
+    _inputs = None
+    _parameters = None
+    _fingerprint = None
+    _up_to_date = False
+    _up_to_date_checked = False
+    _old_data_pending = False
+    _input_error = None
 
     def __init__(
         self,
@@ -1042,6 +1743,15 @@ class TaskManager(RunManager):
         minimum_update_time_seconds: int = 60,
         minimum_warn_time_seconds: int = 60,
         rate_limit: bool = True,
+        asynchronous_telegram: bool = False,
+        telegram_outbox: bool = False,
+        eta_estimator: ProgressEstimator = None,
+        backup_store: BackupStore = None,
+        locals_repr_limit: int = 200,
+        backup_compression: str = None,
+        background_cleanup: bool = False,
+        inputs: list = None,
+        parameters: dict = None,
     ):
         if not isinstance(path_to_run, Path):
             raise TypeError("The `path_to_run` must be a Path type object, received object of type {}".format(type(path_to_run)))
@@ -1086,6 +1796,35 @@ class TaskManager(RunManager):
                 )
             )
 
+        if eta_estimator is not None and not isinstance(eta_estimator, ProgressEstimator):
+            raise TypeError(
+                "The `eta_estimator` must be a ProgressEstimator type object or None, received object of type {}".format(
+                    type(eta_estimator)
+                )
+            )
+
+        if not isinstance(locals_repr_limit, int):
+            raise TypeError(
+                "The `locals_repr_limit` must be a int type object, received object of type {}".format(type(locals_repr_limit))
+            )
+
+        if backup_compression is not None and not isinstance(backup_compression, str):
+            raise TypeError(
+                "The `backup_compression` must be a str type object or None, received object of type {}".format(type(backup_compression))
+            )
+        _check_compression(backup_compression)
+
+        if not isinstance(background_cleanup, bool):
+            raise TypeError(
+                "The `background_cleanup` must be a bool type object, received object of type {}".format(type(background_cleanup))
+            )
+
+        if inputs is not None and (not isinstance(inputs, list) or not all(isinstance(path, Path) for path in inputs)):
+            raise TypeError("The `inputs` must be a list of Path type objects or None, received object of type {}".format(type(inputs)))
+
+        if parameters is not None and not isinstance(parameters, dict):
+            raise TypeError("The `parameters` must be a dict type object or None, received object of type {}".format(type(parameters)))
+
         if not run_exists(path_to_directory=path_to_run.parent, run_name=path_to_run.parts[-1]):
             raise RuntimeError("The 'path_to_run' ({}) does not look like the directory of a run...".format(path_to_run))
 
@@ -1099,6 +1838,9 @@ class TaskManager(RunManager):
             telegram_bot_token=telegram_bot_token,
             telegram_chat_id=telegram_chat_id,
             rate_limit=rate_limit,
+            asynchronous_telegram=asynchronous_telegram,
+            telegram_outbox=telegram_outbox,
+            backup_store=backup_store,
         )
         self._task_name = task_name
         self._drop_old_data = drop_old_data
@@ -1109,16 +1851,54 @@ class TaskManager(RunManager):
         self._minimum_warn_time = datetime.timedelta(seconds=float(minimum_warn_time_seconds))
         if loop_iterations is not None:
             self._processed_iterations = 0
+            self._tick_limit = loop_iterations
+        self._custom_eta_estimator = eta_estimator is not None
+        self._locals_repr_limit = locals_repr_limit
+        self._copy_progress = {}
+        self._backup_compression = backup_compression
+        self._background_cleanup = background_cleanup
+        self._inputs = inputs
+        self._parameters = parameters
+        if inputs is not None or parameters is not None:
+            try:
+                self._fingerprint = task_fingerprint(inputs or [], parameters or {}, script_to_backup)
+            except RuntimeError as e:
+                self._input_error = e  # Raised when entering the task, so that the failure is in the task report
+            else:
+                report = read_task_report(self.task_path) if self.task_path.is_dir() else None
+                self._up_to_date = (
+                    report is not None and report.get("status") == "no errors" and report.get("fingerprint") == self._fingerprint
+                )
+        self._eta_estimator = eta_estimator if eta_estimator is not None else SlidingWindowEstimator()
+        self._bookkeeping_interval = min(
+            TaskManager._bookkeeping_interval, float(minimum_update_time_seconds), float(minimum_warn_time_seconds)
+        )
 
         self._logger = logging.getLogger(self.run_name + ":" + self.task_name)
 
     def __repr__(self):
         """Get the python representation of this class"""
+        estimator_str = ""
+        if self._custom_eta_estimator:
+            estimator_str = ", eta_estimator={}".format(repr(self._eta_estimator))
+        if self._backup_store is not None:
+            estimator_str += ", backup_store={}".format(repr(self._backup_store))
+        if self._locals_repr_limit != TaskManager._locals_repr_limit:
+            estimator_str += ", locals_repr_limit={}".format(repr(self._locals_repr_limit))
+        if self._backup_compression is not None:
+            estimator_str += ", backup_compression={}".format(repr(self._backup_compression))
+        if self._background_cleanup:
+            estimator_str += ", background_cleanup={}".format(repr(self._background_cleanup))
+        if self._inputs is not None:
+            estimator_str += ", inputs={}".format(repr(self._inputs))
+        if self._parameters is not None:
+            estimator_str += ", parameters={}".format(repr(self._parameters))
+
         if self._bot_token is None or self._chat_id is None:
             return (
                 "TaskManager({}, {}, drop_old_data={}, script_to_backup={}, "
                 "loop_iterations={}, minimum_update_time_seconds={}, "
-                "minimum_warn_time_seconds={})".format(
+                "minimum_warn_time_seconds={}{})".format(
                     repr(self.path_directory),
                     repr(self.task_name),
                     repr(self._drop_old_data),
@@ -1126,6 +1906,7 @@ class TaskManager(RunManager):
                     repr(self._loop_iterations),
                     repr(int(self._minimum_update_time.total_seconds())),
                     repr(int(self._minimum_warn_time.total_seconds())),
+                    estimator_str,
                 )
             )
         else:
@@ -1139,11 +1920,17 @@ class TaskManager(RunManager):
             else:
                 chat_str = "telegram_chat_id={}".format(repr(self._chat_id))
 
+            async_str = ""
+            if self._asynchronous_telegram:
+                async_str += ", asynchronous_telegram={}".format(repr(self._asynchronous_telegram))
+            if self._telegram_outbox:
+                async_str += ", telegram_outbox={}".format(repr(self._telegram_outbox))
+
             return (
                 "TaskManager({}, {}, drop_old_data={}, script_to_backup={}, "
                 "{}, {}, loop_iterations={}, "
                 "minimum_update_time_seconds={}, minimum_warn_time_seconds={}, "
-                "rate_limit={})".format(
+                "rate_limit={}{})".format(
                     repr(self.path_directory),
                     repr(self.task_name),
                     repr(self._drop_old_data),
@@ -1154,6 +1941,7 @@ class TaskManager(RunManager):
                     repr(int(self._minimum_update_time.total_seconds())),
                     repr(int(self._minimum_warn_time.total_seconds())),
                     repr(self._rate_limit),
+                    async_str + estimator_str,
                 )
             )
 
@@ -1162,16 +1950,107 @@ class TaskManager(RunManager):
         """The task name property getter method"""
         return self._task_name
 
+    @property
+    def up_to_date(self) -> bool:
+        """Whether the task is up to date, i.e. its inputs, parameters and script did not change since it last ran with no errors
+
+        An up to date task does not need to be processed again. If this
+        property is checked, its data is kept and, if the task is left
+        without errors, its reports and backups are not rewritten.
+        Tasks which declare no `inputs` nor `parameters` are never up to
+        date.
+
+        The body of the "with" block always runs, so it is up to the
+        caller to check this property and skip the processing. Until it
+        is checked, the old data of an up to date task is only set aside:
+        if the body accesses `task_path`, or backs up a file, before
+        checking this property, or leaves the task without checking it,
+        the body is assumed to process the task again, so, with
+        `drop_old_data`, the old data is dropped at that point, the task
+        is no longer up to date and its reports and backups are
+        rewritten.
+        """
+        self._up_to_date_checked = True
+        self._old_data_pending = False  # The body decides, the old data is kept
+        return self._up_to_date
+
     @property
     def task_path(self) -> Path:
-        """The task path property getter method"""
+        """The task path property getter method
+
+        Inside the task, accessing the task path before checking
+        `up_to_date` drops the old data of an up to date task, see
+        `up_to_date`.
+        """
+        if self._old_data_pending:
+            self._drop_old_task_data()
         return self.get_task_path(self.task_name)
 
     @property
     def processed_iterations(self) -> int:
-        """The processed iterations property getter method"""
+        """The processed iterations property getter method
+
+        Includes the iterations added to the shared progress counter of
+        the task, if any, see `progress_counter`.
+        """
+        if self._shared_progress is not None:
+            return (self._processed_iterations or 0) + self._shared_progress.value
         return self._processed_iterations
 
+    def progress_counter(self, slots: int = 256) -> SharedProgressCounter:
+        """Get a progress counter which worker threads and processes can add to
+
+        The iterations added to the counter, from any thread or process,
+        are counted as processed iterations of the task, so they show up
+        in the status message and are used to estimate the finish time.
+        Pass the counter to the workers (it can be pickled) and have them
+        call `add` on it for each processed iteration. The task itself
+        keeps the status up to date when `loop_tick` is called, so, while
+        waiting for the workers, call `loop_tick(count=0)` from time to
+        time. The counter is removed when the task finishes.
+
+        Parameters
+        ----------
+        slots
+            The maximum number of threads, across all processes, which
+            can add to the counter
+
+        Raises
+        ------
+        RuntimeError
+            If called while not inside a task context
+
+        Returns
+        -------
+        SharedProgressCounter
+            The shared progress counter of the task, the same one is
+            returned if this method is called again
+
+        Examples
+        --------
+        >>> import concurrent.futures
+        >>> import lip_pps_run_manager as RM
+        >>> def process_file(file, counter):
+        ...   # Process the file
+        ...   counter.add()
+        >>> with RM.TaskManager(Path("Run0001"), "myTask", loop_iterations=len(files)) as taskHandler:
+        ...   counter = taskHandler.progress_counter()
+        ...   with concurrent.futures.ProcessPoolExecutor() as executor:
+        ...     futures = [executor.submit(process_file, file, counter) for file in files]
+        ...     for future in concurrent.futures.as_completed(futures):
+        ...       taskHandler.loop_tick(count=0)
+        """
+        if not self._in_task_context:
+            raise RuntimeError(
+                "Tried calling progress_counter() while not inside a task context. Use the 'with TaskManager as handle' syntax"
+            )
+
+        if self._shared_progress is None:
+            self._shared_progress = SharedProgressCounter(slots)
+            if self._processed_iterations is None:
+                self._processed_iterations = 0
+        return self._shared_progress
+
     @property
     def expected_finish_time(self):
         """The time at which the task is expected to be finished"""
@@ -1182,10 +2061,18 @@ class TaskManager(RunManager):
             and self._loop_iterations is not None
             and self._loop_iterations != 0
         ):
+            remaining_time = self._eta_estimator.remaining_time(self.processed_iterations, self._loop_iterations)
+            if remaining_time is not None:
+                return datetime.datetime.now() + datetime.timedelta(seconds=remaining_time)
             elapsed_time = datetime.datetime.now() - self._start_time
             return self._start_time + elapsed_time / self.processed_iterations * self._loop_iterations
         return None
 
+    @property
+    def throughput(self):
+        """The current processing rate of the task in iterations per second, `None` if not known yet"""
+        return self._eta_estimator.rate
+
     def loop_tick(self, count: int = 1):
         """Increase the internal loop count, it is assumed this method is called at the end of the loop
 
@@ -1201,6 +2088,13 @@ class TaskManager(RunManager):
         mind that `_update_status` keeps an eye on when the status was
         last updated, so if it is too soon, no update will be made.
 
+        So that it can be called in tight loops, most calls of this
+        method only increase the counter and check the monotonic clock.
+        The bookkeeping is only done on the first call and then once a
+        second at most (or more often, if the minimum update or warn
+        times are shorter), or right away when the number of processed
+        iterations exceeds the expected number.
+
         Parameters
         ----------
         count
@@ -1219,39 +2113,58 @@ class TaskManager(RunManager):
         if not self._in_task_context:
             raise RuntimeError("Tried calling loop_tick() while not inside a task context. Use the 'with TaskManager as handle' syntax")
 
+        processed_iterations = self._processed_iterations
+        if processed_iterations is None:
+            processed_iterations = 0
+        processed_iterations += count
+        self._processed_iterations = processed_iterations
+
+        if processed_iterations > self._tick_limit or time.monotonic() >= self._next_bookkeeping:
+            self._loop_bookkeeping()
+
+    def _loop_bookkeeping(self):
+        """Internal method with the slow part of `loop_tick`: status updates, logging and warnings"""
         if not hasattr(self, '_last_update'):
             self._last_update = datetime.datetime.now() - 2 * self._minimum_update_time
 
-        if self._processed_iterations is None:
-            self._processed_iterations = 0
+        self._eta_estimator.add_sample(time.monotonic(), self.processed_iterations)
 
-        self._processed_iterations += count
         if self._loop_iterations is not None and self.processed_iterations > self._loop_iterations:
             self.warn(
                 "The number of processed iterations has exceeded the "
                 "set number of iterations.\n  - Expected {} iterations;"
-                "\n  - Processed {} iterations".format(self._loop_iterations, self._processed_iterations)
+                "\n  - Processed {} iterations".format(self._loop_iterations, self.processed_iterations),
+                category="iterations exceeded",
             )
 
         self._update_status()
         self._send_warnings()
+        self._next_bookkeeping = time.monotonic() + self._bookkeeping_interval
 
     def _update_status(self):
         """Internal method to update the status of the task on the telegram status message"""
+        import humanize  # Imported when first needed, to keep importing the package fast
+
         if not self._in_task_context:
             raise RuntimeError(
                 "Tried calling _update_status() while not inside a task context. Use the 'with TaskManager as handle' syntax"
             )
 
-        message = f'Processing task {self.task_name} of run {self.run_name}'
-        if self.expected_finish_time is not None:
-            message += '\n  - Progress: {} % ({}/{})\n  - Expected finish: {}'.format(
-                int(float(self.processed_iterations) / self._loop_iterations * 100),
-                int(self.processed_iterations),
-                int(self._loop_iterations),
-                self.expected_finish_time.strftime("%Y-%m-%d %H:%M"),
-            )
-        self._logger.info(message)
+        expected_finish_time = self.expected_finish_time
+        if self._logger.isEnabledFor(logging.INFO):
+            message = f'Processing task {self.task_name} of run {self.run_name}'
+            if expected_finish_time is not None:
+                message += '\n  - Progress: {} % ({}/{})\n  - Expected finish: {}'.format(
+                    int(float(self.processed_iterations) / self._loop_iterations * 100),
+                    int(self.processed_iterations),
+                    int(self._loop_iterations),
+                    expected_finish_time.strftime("%Y-%m-%d %H:%M"),
+                )
+            if self.throughput is not None:
+                message += '\n  - Throughput: {:.2f} it/s'.format(self.throughput)
+            for name, (copied, total) in list(self._copy_progress.items()):
+                message += '\n  - Copying {}: {} %'.format(name, int(copied / total * 100) if total > 0 else 100)
+            self._logger.info(message)
 
         if self._telegram_reporter is not None:
             create_status = False
@@ -1266,10 +2179,10 @@ class TaskManager(RunManager):
                     self.task_name, self.run_name
                 )  # Four leaf clover is to wish good luck on the completion of the task
                 new_status += "     Started {}\n".format(self._start_time.strftime("%Y-%m-%d %H:%M"))
-                if self.expected_finish_time is not None:
-                    new_status += "     Expected finish: {}\n".format(self.expected_finish_time.strftime("%Y-%m-%d %H:%M"))
+                if expected_finish_time is not None:
+                    new_status += "     Expected finish: {}\n".format(expected_finish_time.strftime("%Y-%m-%d %H:%M"))
                     new_status += "     Remaining time: {}\n\n".format(
-                        humanize.naturaltime(datetime.datetime.now() - self.expected_finish_time)
+                        humanize.naturaltime(datetime.datetime.now() - expected_finish_time)
                     )
                     new_status += "     Progress: {} % ({}/{})\n\n\n".format(
                         int(float(self.processed_iterations) / self._loop_iterations * 100),
@@ -1285,6 +2198,9 @@ class TaskManager(RunManager):
                             new_status += "     Progress: {} out of {} iterations\n\n\n".format(
                                 self.processed_iterations, self._loop_iterations
                             )
+                if self.throughput is not None:
+                    new_status += "     Throughput: {:.2f} it/s\n\n".format(self.throughput)
+                new_status += self._copy_status()
                 new_status += "Last update of this message: {}".format(datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
 
                 if create_status:
@@ -1292,6 +2208,132 @@ class TaskManager(RunManager):
                 else:
                     self.edit_message(new_status, self._task_status_message_id)
 
+    def _report_copy_progress(self, destination: Path, copied: int, total: int):
+        """Internal method called as a copy progresses, to show the ongoing copies in the status of the task"""
+        if copied >= total:
+            self._copy_progress.pop(destination.name, None)
+        else:
+            self._copy_progress[destination.name] = (copied, total)
+
+    def _copy_status(self) -> str:
+        """Internal method to describe the ongoing copies, for the status message"""
+        import humanize
+
+        status = ""
+        for name, (copied, total) in list(self._copy_progress.items()):
+            status += "     Copying {}: {} of {}\n\n".format(name, humanize.naturalsize(copied), humanize.naturalsize(total))
+        return status
+
+    def track(self, iterable, total: int = None, chunked: bool = False):
+        """Iterate over an iterable, keeping track of the progress of the task
+
+        Use this method to wrap the loop of the task instead of calling
+        `loop_tick` by hand. The counter is increased in batches, whose
+        size adapts so that the counter is updated a few times per
+        second at most, so wrapping even very tight loops adds a
+        negligible overhead per item. An item only counts as processed
+        once the loop asks for the next one, so leaving the loop early
+        (with `break` or an exception) does not count the item which was
+        being processed.
+
+        If the number of loop iterations of the task is not set, it is
+        set to `total`. If `total` is `None`, it is inferred with `len`
+        when the iterable supports it.
+
+        Parameters
+        ----------
+        iterable
+            The iterable to iterate over
+        total
+            The total number of iterations, if known
+        chunked
+            If set, each item of the iterable is a chunk of iterations
+            (e.g. a batch of events in a NumPy array) and counts for
+            `len(chunk)` iterations. In this case, when `total` is `None`
+            and the iterable supports `len`, the total is the sum of the
+            lengths of the chunks, so the iterable must support being
+            iterated more than once
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the incorrect type
+        RuntimeError
+            If called while not inside a task context
+
+        Returns
+        -------
+        generator
+            A generator over the items of the iterable
+
+        Examples
+        --------
+        >>> import lip_pps_run_manager as RM
+        >>> John = RM.RunManager("Run0001")
+        >>> John.create_run()
+        >>> with John.handle_task("myTask") as taskHandler:
+        ...   for event in taskHandler.track(range(1000)):
+        ...     # Process the event
+        ...     pass
+        """
+        if not self._in_task_context:
+            raise RuntimeError("Tried calling track() while not inside a task context. Use the 'with TaskManager as handle' syntax")
+
+        if total is not None and not isinstance(total, int):
+            raise TypeError("The `total` must be a int type object or None, received object of type {}".format(type(total)))
+
+        if not isinstance(chunked, bool):
+            raise TypeError("The `chunked` must be a bool type object, received object of type {}".format(type(chunked)))
+
+        if total is None and hasattr(iterable, "__len__"):
+            if chunked:
+                total = sum(len(chunk) for chunk in iterable)
+            else:
+                total = len(iterable)
+
+        if self._loop_iterations is None and total is not None:
+            self._loop_iterations = total
+            self._tick_limit = total
+        if self._processed_iterations is None:
+            self._processed_iterations = 0
+
+        if chunked:
+            return self._track_chunks(iterable)
+        return self._track_items(iterable)
+
+    def _track_items(self, iterable):
+        """Internal generator of `track`, ticking the counter in batches of adaptive size"""
+        index = 0
+        ticked = 0
+        stride = 1
+        next_tick = 1
+        last_tick_time = time.monotonic()
+        try:
+            for index, item in enumerate(iterable, 1):
+                yield item
+                if index >= next_tick:
+                    self.loop_tick(index - ticked)
+                    ticked = index
+                    now = time.monotonic()
+                    if now - last_tick_time < 0.01:
+                        stride = min(2 * stride, 65536)
+                    elif now - last_tick_time > 0.1 and stride > 1:
+                        stride //= 2
+                    last_tick_time = now
+                    next_tick = index + stride
+        except GeneratorExit:
+            index -= 1  # The loop was left while the last item was being processed
+            raise
+        finally:
+            if index > ticked and self._in_task_context:
+                self.loop_tick(index - ticked)
+
+    def _track_chunks(self, iterable):
+        """Internal generator of `track`, ticking the counter once per chunk"""
+        for chunk in iterable:
+            yield chunk
+            self.loop_tick(len(chunk))
+
     def set_completed(self):
         """Set the task as if it had completed
 
@@ -1308,6 +2350,8 @@ class TaskManager(RunManager):
             raise RuntimeError("Tried calling set_completed() while not inside a task context. Use the 'with TaskManager as handle' syntax")
 
         self._processed_iterations = self._loop_iterations
+        if self._shared_progress is not None and self._loop_iterations is not None:
+            self._processed_iterations -= self._shared_progress.value
 
     def clean_task_directory(self):
         """Clean directory of task of all previous data
@@ -1328,27 +2372,65 @@ class TaskManager(RunManager):
             else:  # p.is_dir():
                 shutil.rmtree(p)
 
+    def _trash_task_directory(self) -> bool:
+        """Internal method to move the task directory to the trash of the run, and empty the trash in the background
+
+        Returns `False` if the directory could not be moved, e.g. on
+        windows if one of its files is open.
+        """
+        trash_path = self.path_directory / trash_directory_name
+        trash_path.mkdir(exist_ok=True)
+        try:
+            self.task_path.rename(trash_path / "{}.{}".format(self.task_name, uuid.uuid4().hex))
+        except OSError:  # pragma: no cover
+            return False
+
+        self._cleanup_thread = _start_trash_cleanup(trash_path)
+        return True
+
+    def _drop_old_task_data(self):
+        """Internal method to drop the data of a previous run of the task, leaving an empty task directory"""
+        self._old_data_pending = False
+        self._up_to_date = False  # Without its data, the task is processed again
+        if not self._background_cleanup or not self._trash_task_directory():
+            self.clean_task_directory()
+        self.get_task_path(self.task_name).mkdir(exist_ok=True)
+
     def __enter__(self):
         """This is the method that is called when using the "with" syntax"""
+        return self._enter_task(inspect.currentframe().f_back.f_locals)
+
+    def _enter_task(self, locals_on_call: dict):
+        """Internal method to set up the task context, `locals_on_call` are the local variables of the caller"""
         if hasattr(self, "_already_processed"):
             raise RuntimeError("Once a task has processed its data, it can not be processed again. Use a new task")
 
         if self._drop_old_data and self.task_path.is_dir():
-            self.clean_task_directory()
-        self.task_path.mkdir(exist_ok=True)
+            if not self._up_to_date:
+                self._drop_old_task_data()
+            elif not self._up_to_date_checked:
+                self._old_data_pending = True  # Dropped if the body processes the task again, see `up_to_date`
+        self.get_task_path(self.task_name).mkdir(exist_ok=True)
 
-        frame = inspect.currentframe()
-        self._locals_on_call = frame.f_back.f_locals
+        self._locals_on_call = snapshot_locals(locals_on_call, self._locals_repr_limit)
 
         self._in_task_context = True
         if not self._in_run_context:
             self._own_run_context = True
             self._in_run_context = True
             if self._bot_token is not None and self._chat_id is not None:
-                self._telegram_reporter = TelegramReporter(self._bot_token, self._chat_id, rate_limit=self._rate_limit)
+                self._telegram_reporter = self._create_telegram_reporter()
+                self._attach_telegram_outbox()
 
         self._start_time = datetime.datetime.now()
-        if self._telegram_reporter is not None:
+        if self._input_error is not None:
+            self.__exit__(type(self._input_error), self._input_error, self._input_error.__traceback__)
+            raise self._input_error
+
+        self._eta_estimator.add_sample(time.monotonic(), self._processed_iterations or 0)
+        if self._up_to_date:
+            self._logger.info("Task {} of run {} is up to date".format(self.task_name, self.run_name))
+        elif self._telegram_reporter is not None:
             if self._loop_iterations is None:
                 self._task_status_message_id = self.send_message(
                     "Started processing task {} of run {}.\nAn update should come soon".format(self.task_name, self.run_name),
@@ -1367,72 +2449,169 @@ class TaskManager(RunManager):
     def __exit__(self, err_type, err_value, err_traceback):
         """This is the method that is called at the end of the block, when using the "with" syntax"""
         self._already_processed = True
+        self._wait_for_copies()
 
         self._in_task_context = False
 
+        if not self._up_to_date or not self._up_to_date_checked or err_type is not None:
+            if self._old_data_pending:
+                self._drop_old_task_data()  # Left without checking `up_to_date`, the task was processed again
+            self._write_task_outputs(err_type, err_value, err_traceback)
+
+        if self._shared_progress is not None:
+            self._processed_iterations = self.processed_iterations
+            self._shared_progress.unlink()
+            self._shared_progress = None
+
+        if self._own_run_context:
+            _wait_for_trash_cleanup(self.path_directory / trash_directory_name)
+            self._in_run_context = False
+            if self._telegram_reporter is not None:
+                self._telegram_reporter.close()
+
+    def _write_task_outputs(self, err_type, err_value, err_traceback):
+        """Internal method to write the reports of the task and the backup of the script, at the end of the task"""
+        end_time = datetime.datetime.now()
+        if all([err is None for err in [err_type, err_value, err_traceback]]):
+            status_message = "no errors"
+            if self._loop_iterations is not None and self._loop_iterations > 0:
+                if self.processed_iterations != self._loop_iterations:
+                    status_message = "incomplete"
+        else:
+            status_message = "there were errors"
+
         with open(self.task_path / "task_report.txt", "w", encoding="utf8") as out_file:
-            if all([err is None for err in [err_type, err_value, err_traceback]]):
-                status_message = "no errors"
-                if self._loop_iterations is not None and self._loop_iterations > 0:
-                    if self._processed_iterations != self._loop_iterations:
-                        status_message = "incomplete"
-                out_file.write("task_status: {}\n".format(status_message))
+            out_file.write("task_status: {}\n".format(status_message))
+            if err_type is None:
                 out_file.write("Task completed successfully with no errors\n")
-                out_file.write("The task finished running on: {}.\n".format(datetime.datetime.now()))
+                out_file.write("The task finished running on: {}.\n".format(end_time))
             else:
-                out_file.write("task_status: there were errors\n")
                 out_file.write("Task could not be completed because there were errors\n")
-                out_file.write("The task finished running on: {}\n".format(datetime.datetime.now()))
+                out_file.write("The task finished running on: {}\n".format(end_time))
                 out_file.write("--------\n")
                 traceback.print_tb(err_traceback, file=out_file)
                 out_file.write("\n")
                 out_file.write("{}: {}\n".format(err_type.__name__, err_value))
             out_file.write("\nLIP-PPS-Run-Manager v {} was used as the managing backend.\n".format(__version__))
 
+        write_task_report(self.task_path, self._build_report(status_message, end_time, err_type, err_value))
+        _update_catalog(
+            self.path_directory.parent, lambda catalog: catalog.update_task(self.run_name, self.task_name, status_message, end_time)
+        )
+
         if self._script_to_backup is not None:
-            if self._script_to_backup.is_file():
-                outPath = self.task_path / ("backup.{}".format(self._script_to_backup.parts[-1]))
-                with open(outPath, "w", encoding="utf8") as out_file:
-                    out_file.write("# ------------------------------------------------------------------------------------------------\n")
-                    out_file.write("# This is an automatic backup of the script that processed this task, made at the end of the task.\n")
-                    out_file.write("# Please note that the same script may process multiple tasks, so it may show up multiple times.\n")
-                    out_file.write("# The original location and name of the script was {}.\n".format(self._script_to_backup))
-                    out_file.write("# LIP-PPS-Run-Manager v {} was used as the managing backend.\n".format(__version__))
-                    out_file.write("# The backup was created on {}.\n".format(datetime.datetime.now()))
-                    out_file.write("# A copy of all the local variables at the time the __enter__ method of the task started:\n")
-                    for key in self._locals_on_call:
-                        out_file.write("#   {}: {}\n".format(key, repr(self._locals_on_call[key])))
-                    out_file.write("# ------------------------------------------------------------------------------------------------\n")
-                    with open(self._script_to_backup, "r", encoding="utf8") as in_file:
-                        for line in in_file:
-                            out_file.write(line)
-                # shutil.copyfile(self._script_to_backup, self.task_path / ("backup.{}".format(self._script_to_backup.parts[-1])))
+            if self._script_to_backup.is_file() and self._backup_store is not None:
+                self._backup_store.backup_file(
+                    self._script_to_backup,
+                    self.task_path / ("backup.{}.manifest.json".format(self._script_to_backup.parts[-1])),
+                    extra={"task_name": self.task_name, "locals": self._locals_on_call},
+                )
+            elif self._script_to_backup.is_file():
+                header = (
+                    "# ------------------------------------------------------------------------------------------------\n"
+                    "# This is an automatic backup of the script that processed this task, made at the end of the task.\n"
+                    "# Please note that the same script may process multiple tasks, so it may show up multiple times.\n"
+                    "# The original location and name of the script was {}.\n"
+                    "# LIP-PPS-Run-Manager v {} was used as the managing backend.\n"
+                    "# The backup was created on {}.\n"
+                    "# A summary of all the local variables at the time the __enter__ method of the task started:\n"
+                ).format(self._script_to_backup, __version__, datetime.datetime.now())
+                for key in self._locals_on_call:
+                    header += "#   {}: {}\n".format(key, self._locals_on_call[key])
+                header += "# ------------------------------------------------------------------------------------------------\n"
+                write_script_backup(
+                    self._script_to_backup,
+                    self.task_path / ("backup.{}".format(self._script_to_backup.parts[-1])),
+                    header,
+                    compression=self._backup_compression,
+                )
             else:
                 raise RuntimeError("Somehow you are trying to backup a file that does not exist")
 
-        if self._own_run_context:
-            self._in_run_context = False
+    async def __aenter__(self):
+        """This is the method that is called when using the "async with" syntax
+
+        If the task is not inside the context of a run, the messages to
+        telegram are sent by an `AsyncTelegramReporter` on the running
+        event loop, see `RunManager.__aenter__`. Otherwise, the reporter
+        of the run is used.
+        """
+        if not self._in_run_context:
+            self._asyncio_telegram = True
+        return self._enter_task(inspect.currentframe().f_back.f_locals)
+
+    async def __aexit__(self, err_type, err_value, err_traceback):
+        """This is the method that is called at the end of the block, when using the "async with" syntax
+
+        Waits for all the messages to telegram of the task to be delivered.
+        """
+        from lip_pps_run_manager.async_telegram_reporter import AsyncTelegramReporter
+
+        self.__exit__(err_type, err_value, err_traceback)
+        if isinstance(self._telegram_reporter, AsyncTelegramReporter):
+            await self._telegram_reporter.flush()
+
+    def _build_report(self, status: str, end_time: datetime.datetime, err_type, err_value) -> dict:
+        """Internal method to gather the content of the machine-readable report of the task"""
+        elapsed_seconds = (end_time - self._start_time).total_seconds()
+        processed_iterations = self.processed_iterations
+        throughput = None
+        if processed_iterations is not None and elapsed_seconds > 0:
+            throughput = processed_iterations / elapsed_seconds
+
+        warning_counts = getattr(self, "_warning_counts", {})
+        warning_samples = getattr(self, "_warning_samples", {})
+        return {
+            "task_name": self.task_name,
+            "run_name": self.run_name,
+            "status": status,
+            "start_time": self._start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "processed_iterations": processed_iterations,
+            "expected_iterations": self._loop_iterations,
+            "throughput": throughput,
+            "warning_count": sum(warning_counts.values()),
+            "warnings": warning_counts,
+            "warning_samples": warning_samples,
+            "exception_type": err_type.__name__ if err_type is not None else None,
+            "exception_message": str(err_value) if err_type is not None else None,
+            "fingerprint": self._fingerprint,
+            "version": __version__,
+        }
 
-    def warn(self, message: str):
+    def warn(self, message: str, category: str = None):
         """Send a warning to telegram
 
         Send the warning as a reply to the original status message. If
         the warnings are sent with less than `minimum_warn_time_seconds`
         parameter, the messages are stored and sent later.
 
+        The warnings are also counted in the task report, by category,
+        with a sample of the most recent messages of each category. At
+        most 100 categories are kept, the warnings of any further
+        categories are counted as "other warnings".
+
         Parameters
         ----------
         message
             The warning message to be sent
+        category
+            The category the warning is counted under in the task
+            report, by default the message itself. Warnings whose
+            message changes each time (e.g. includes a counter) should
+            set a category
 
         Raises
         ------
         TypeError
-            If the parameter has the incorrect type
+            If a parameter has the incorrect type
         """
         if not isinstance(message, str):
             raise TypeError("The `message` must be a str type object, received object of type {}".format(type(message)))
 
+        if category is not None and not isinstance(category, str):
+            raise TypeError("The `category` must be a str type object or None, received object of type {}".format(type(category)))
+
         if not hasattr(self, "_accumulated_warnings"):
             self._accumulated_warnings = {}
 
@@ -1443,10 +2622,25 @@ class TaskManager(RunManager):
         else:
             self._accumulated_warnings[message] += 1
 
+        if not hasattr(self, "_warning_counts"):
+            self._warning_counts = {}
+            self._warning_samples = {}
+        if category is None:
+            category = message
+        if category not in self._warning_counts and len(self._warning_counts) >= self._max_warning_categories:
+            category = "other warnings"
+        self._warning_counts[category] = self._warning_counts.get(category, 0) + 1
+        samples = self._warning_samples.setdefault(category, [])
+        if message not in samples:
+            samples.append(message)
+            del samples[: -self._warning_samples_per_category]
+
         self._send_warnings()
 
     def _send_warnings(self):
         """Actually send the warnings to telegram, multiple warnings are combined into one"""
+        import humanize
+
         if not hasattr(self, "_accumulated_warnings") or self._accumulated_warnings == {}:
             return
 
@@ -1480,20 +2674,43 @@ class TaskManager(RunManager):
             self._supposedly_just_sent_warnings = self._accumulated_warnings  # Do this just because of the testing
             self._accumulated_warnings = {}
 
-    def backup_file(self, source: Path):
+    def backup_file(
+        self, source: Path, verify: bool = False, background: bool = False, incremental: bool = False, compare_hash: bool = False
+    ):
         """Creates a backup of the source file inside the task directory.
 
         Parameters
         ----------
         source
             The path to the source file. The file must exist
+        verify
+            If set, the checksums of the source and of the copy are
+            compared, see `copy_file_to`
+        background
+            If set, the copy is made by a background thread, see
+            `copy_file_to`
+        incremental
+            If set, the backup is skipped if the file did not change
+            since its last backup, see `RunManager.backup_file`
+        compare_hash
+            If set, in the incremental mode, a touched file is compared
+            by its checksum, see `RunManager.backup_file`
 
         Raises
         ------
         TypeError
             If the type of one of the parameters is not correct
         RuntimeError
-            If the `source` does not exist.
+            If the `source` does not exist, or if `verify` is set and the
+            checksums do not match
+
+        Returns
+        -------
+        Future
+            If `background` is set, a `concurrent.futures.Future` of the
+            backup, see `copy_file_to`, whose result is the path to the
+            backup, or to its manifest if the run has a `BackupStore`.
+            Otherwise `None`
 
         Examples
         --------
@@ -1510,12 +2727,12 @@ class TaskManager(RunManager):
         RuntimeError will be raised.
 
         """
-        if not isinstance(source, Path):
-            raise TypeError(f"The `source` must be a Path type object, received object of type {type(source)} instead")
-
-        if not source.exists() or not source.is_file():
-            raise RuntimeError("The source file does not exist or it is not a file.")
+        return self._backup_file(source, verify, background, incremental, compare_hash)
 
-        backup_path = self.task_path
+    def _backup_directory_of_files(self) -> Path:
+        """Internal method to get the directory where the backups of files are kept, the task directory"""
+        return self.task_path
 
-        self.copy_file_to(source, backup_path / (source.name + ".bak"), overwrite=True)
+    def _backup_name(self, source: Path) -> str:
+        """Internal method to get the name of the backup of a file"""
+        return source.name + ".bak"
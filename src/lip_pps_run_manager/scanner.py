@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""The Scanner module
+
+Contains the class used to quickly collect the status of all the runs
+in a directory, and of their tasks, from the files on disk.
+
+"""
+
+import concurrent.futures
+import datetime
+import json
+import os
+from pathlib import Path
+
+from lip_pps_run_manager.task_report import read_task_report
+from lip_pps_run_manager.task_report import read_task_status
+
+_task_fields = [
+    "status",
+    "start_time",
+    "end_time",
+    "processed_iterations",
+    "expected_iterations",
+    "throughput",
+    "warning_count",
+    "exception_type",
+]
+
+_cache_version = 1
+
+scan_cache_file_name = "run_scan_cache.json"
+
+
+def _read_task_info(task_path: Path):
+    """Internal function to get the information of a task from its report, `None` if it has no report"""
+    report = read_task_report(task_path)
+    if report is not None and "status" in report:
+        return {field: report.get(field) for field in _task_fields}
+
+    status = read_task_status(task_path)  # Tasks from older versions only have the text report
+    if status is None:
+        return None
+    info = {field: None for field in _task_fields}
+    info["status"] = status
+    return info
+
+
+class RunScanner:
+    """Class to collect the status of all the runs in a directory
+
+    The run directories are walked concurrently by a pool of threads,
+    using `os.scandir` so that most of the information comes from the
+    directory listings themselves. A directory is a run if it has a
+    'run_info.txt' file, and each of its subdirectories with a task
+    report is a task.
+
+    The information read from each task directory is cached, keyed by
+    the modification time of the directory. Since the task report is
+    replaced atomically when a task finishes, which changes that
+    modification time, a new scan only reads the reports of the tasks
+    which changed since the previous one. The cache can be kept in a
+    file, so that it is also reused across processes.
+
+    Parameters
+    ----------
+    path_to_directory
+        The path to the directory holding the runs
+    max_workers
+        The number of threads walking the run directories
+    cache_file
+        The path to a file to load the cache from and to save it to
+        after each scan, if any. Its directory is created if needed, and
+        a cache file which can not be read or written is ignored
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> from pathlib import Path
+    >>> scanner = RM.RunScanner(Path("."))
+    >>> runs = scanner.scan()
+    >>> print(scanner.summary())
+
+    """
+
+    _path_directory = None
+    _max_workers = 8
+    _cache_file = None
+
+    def __init__(self, path_to_directory: Path, max_workers: int = 8, cache_file: Path = None):
+        if not isinstance(path_to_directory, Path):
+            raise TypeError(
+                "The `path_to_directory` must be a Path type object, received object of type {}".format(type(path_to_directory))
+            )
+
+        if not isinstance(max_workers, int) or isinstance(max_workers, bool):
+            raise TypeError("The `max_workers` must be a int type object, received object of type {}".format(type(max_workers)))
+
+        if cache_file is not None and not isinstance(cache_file, Path):
+            raise TypeError("The `cache_file` must be a Path type object or None, received object of type {}".format(type(cache_file)))
+
+        self._path_directory = path_to_directory
+        self._max_workers = max_workers
+        self._cache_file = cache_file
+        self._cache = {}
+        self._runs = {}
+        self._reads = 0
+
+        if cache_file is not None:
+            self._load_cache()
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "RunScanner({}, max_workers={}, cache_file={})".format(
+            repr(self._path_directory), repr(self._max_workers), repr(self._cache_file)
+        )
+
+    @property
+    def reads(self) -> int:
+        """The number of task directories whose report was read in the last scan, i.e. not taken from the cache"""
+        return self._reads
+
+    def _load_cache(self):
+        """Internal method to load the cache from the cache file, an unreadable cache file is ignored"""
+        try:
+            with open(self._cache_file, "r", encoding="utf8") as in_file:
+                content = json.load(in_file)
+        except (OSError, ValueError):
+            return
+        if isinstance(content, dict) and content.get("version") == _cache_version:
+            self._cache = content.get("tasks", {})
+
+    def _save_cache(self):
+        """Internal method to save the cache to the cache file, atomically, the cache is not saved if the file can not be written"""
+        tmp_path = self._cache_file.with_name(self._cache_file.name + ".tmp")
+        try:
+            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf8") as out_file:
+                json.dump({"version": _cache_version, "tasks": self._cache}, out_file)
+            os.replace(tmp_path, self._cache_file)
+        except OSError:
+            pass
+
+    def _scan_run(self, run_path: str):
+        """Internal method to collect the information of a single run, `None` if the directory is not a run
+
+        Returns the information of the run, the cache entries of its task
+        directories and the number of task reports which were read.
+        """
+        created = None
+        task_entries = []
+        with os.scandir(run_path) as entries:
+            for entry in entries:
+                if entry.name == "run_info.txt" and entry.is_file():
+                    created = datetime.datetime.fromtimestamp(entry.stat().st_mtime).isoformat()
+                elif entry.is_dir() and not entry.name.startswith("."):  # Hidden directories, such as the trash, are not tasks
+                    task_entries.append(entry)
+        if created is None:
+            return None, {}, 0
+
+        tasks = {}
+        cache = {}
+        reads = 0
+        for entry in task_entries:
+            mtime = entry.stat().st_mtime_ns
+            cached = self._cache.get(entry.path)
+            if cached is not None and cached["mtime"] == mtime:
+                info = cached["info"]
+            else:
+                info = _read_task_info(Path(entry.path))
+                reads += 1
+                if info is not None and info["end_time"] is None:
+                    info["end_time"] = datetime.datetime.fromtimestamp(mtime / 1e9).isoformat()
+            cache[entry.path] = {"mtime": mtime, "info": info}
+            if info is not None:
+                tasks[entry.name] = info
+
+        return {"run_name": os.path.basename(run_path), "created": created, "tasks": tasks}, cache, reads
+
+    def scan_run(self, run_name: str):
+        """Collect the status of a single run in the directory
+
+        Parameters
+        ----------
+        run_name
+            The name of the run
+
+        Returns
+        -------
+        dict
+            The information of the run, as in `scan`, `None` if there is
+            no such run
+
+        """
+        run_path = os.path.join(str(self._path_directory), run_name)
+        if not os.path.isdir(run_path):
+            return None
+        run, _, self._reads = self._scan_run(run_path)
+        return run
+
+    def scan(self) -> dict:
+        """Collect the status of all the runs in the directory
+
+        Returns
+        -------
+        dict
+            A dictionary with an entry per run, keyed by the name of the
+            run. Each entry is a dictionary with the "run_name", the
+            "created" time of the run and its "tasks", a dictionary
+            keyed by the name of the task with the "status", the
+            "start_time", "end_time", "processed_iterations",
+            "expected_iterations", "throughput", "warning_count" and
+            "exception_type" of the task. The fields not known for a
+            task (e.g. tasks from older versions, which only have the
+            text report) are `None`
+
+        """
+        with os.scandir(self._path_directory) as entries:
+            run_paths = sorted(entry.path for entry in entries if entry.is_dir())
+
+        runs = {}
+        cache = {}
+        self._reads = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for run, run_cache, reads in executor.map(self._scan_run, run_paths):
+                cache.update(run_cache)
+                self._reads += reads
+                if run is not None:
+                    runs[run["run_name"]] = run
+
+        self._cache = cache
+        self._runs = runs
+        if self._cache_file is not None:
+            self._save_cache()
+        return runs
+
+    def summary(self) -> dict:
+        """Count the runs per status of each task, from the last scan
+
+        Returns
+        -------
+        dict
+            A dictionary keyed by the name of the task, with a
+            dictionary of the number of runs per status of the task. Runs
+            where the task did not run yet are counted as "missing"
+
+        """
+        summary = {}
+        for run in self._runs.values():
+            for task_name, info in run["tasks"].items():
+                task_summary = summary.setdefault(task_name, {})
+                task_summary[info["status"]] = task_summary.get(info["status"], 0) + 1
+        for task_name, task_summary in summary.items():
+            missing = len(self._runs) - sum(task_summary.values())
+            if missing > 0:
+                task_summary["missing"] = missing
+        return summary
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""The Snapshot module
+
+Contains the functions used to keep a bounded description of the local
+variables of the code which processes a task.
+
+"""
+
+import reprlib
+
+
+def summarize_value(value, max_length: int = 200) -> str:
+    """Describe a value with a string of bounded length
+
+    The description has the type of the value, the shape and dtype of
+    array-like values (e.g. NumPy arrays or pandas DataFrames), the
+    length of sized values and a repr truncated to `max_length`
+    characters. The repr of large containers is built lazily, so only
+    the part which is kept is ever computed, and array-like values,
+    whose repr can take long, are only described by their shape.
+
+    Parameters
+    ----------
+    value
+        The value to describe
+    max_length
+        The maximum length of the repr of the value
+
+    Returns
+    -------
+    str
+        The description of the value
+
+    Examples
+    --------
+    >>> from lip_pps_run_manager.snapshot import summarize_value
+    >>> summarize_value(list(range(1000)), max_length=20)
+    'list(len=1000): [0, 1, 2, 3, 4, 5, ...]'
+
+    """
+    details = []
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple):
+        details.append("shape={}".format(shape))
+        dtype = getattr(value, "dtype", None)
+        if dtype is not None:
+            details.append("dtype={}".format(dtype))
+    else:
+        try:
+            details.append("len={}".format(len(value)))
+        except Exception:
+            pass
+
+    summary = type(value).__name__
+    if details:
+        summary += "({})".format(", ".join(details))
+    if isinstance(shape, tuple):
+        return summary
+
+    limited_repr = reprlib.Repr()
+    limited_repr.maxstring = max_length
+    limited_repr.maxother = max_length
+    limited_repr.maxlong = max_length
+    try:
+        value_repr = limited_repr.repr(value)
+    except Exception as e:  # e.g. ints with too many digits to convert to a string
+        value_repr = "<repr failed: {}>".format(type(e).__name__)
+    if len(value_repr) > max_length:
+        value_repr = value_repr[:max_length] + "..."
+    return "{}: {}".format(summary, value_repr)
+
+
+def snapshot_locals(local_variables: dict, max_length: int = 200) -> dict:
+    """Describe each local variable with a string of bounded length, see `summarize_value`
+
+    Only the descriptions are kept, so the snapshot does not keep the
+    variables themselves alive.
+
+    Parameters
+    ----------
+    local_variables
+        The local variables, by name, e.g. from `frame.f_locals`
+    max_length
+        The maximum length of the repr of each variable
+
+    Returns
+    -------
+    dict
+        The descriptions of the variables, by name
+
+    """
+    return {name: summarize_value(value, max_length) for name, value in local_variables.items()}
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""The Task Graph module
+
+Contains the class used to declare the tasks of a run and their
+dependencies, so that independent tasks are processed concurrently.
+
+"""
+
+import concurrent.futures
+import datetime
+import inspect
+from pathlib import Path
+
+from lip_pps_run_manager.task_report import read_task_report
+from lip_pps_run_manager.task_report import read_task_status
+
+skipped_status = "skipped"
+failed_status = "there were errors"
+
+
+def _run_graph_task(
+    path_to_run: Path, task_name: str, function, task_options: dict, status_message_id: str = None, rate_limit_file: Path = None
+) -> str:
+    """Internal function to process a task of a graph, in a worker, returning the status of the task
+
+    Only a report written by this attempt is trusted, so a report left
+    by an earlier attempt is never taken for the status of this one.
+    The telegram messages of the task are replies to `status_message_id`
+    and, if `rate_limit_file` is set, are rate limited with the other
+    workers through that file.
+    """
+    from lip_pps_run_manager.rate_limiter import RateLimiter
+    from lip_pps_run_manager.run_manager import TaskManager  # Imported here to avoid a circular import
+
+    worker_start = datetime.datetime.now()
+    try:
+        task = TaskManager(path_to_run, task_name, **task_options)
+    except Exception:
+        return failed_status  # The task could not be set up, so it wrote no report
+    task._status_message_id = status_message_id
+    if rate_limit_file is not None:
+        task._rate_limiter = RateLimiter(lock_file=rate_limit_file)
+
+    entered = False
+    up_to_date = False
+    try:
+        with task:
+            entered = True
+            up_to_date = task.up_to_date
+            if not up_to_date:
+                function(task)
+    except Exception:
+        pass  # The error is in the report of the task, if the task context was entered
+    if not entered:
+        return failed_status
+
+    if up_to_date:
+        status = read_task_status(path_to_run / task_name)  # The report of the run which made the task up to date
+    else:
+        status = _fresh_task_status(path_to_run / task_name, worker_start)
+    return status if status is not None else failed_status
+
+
+def _fresh_task_report(task_path: Path, since: datetime.datetime):
+    """Internal function to read the report of a task, `None` if there is none or the task started before `since`"""
+    report = read_task_report(task_path)
+    if report is None or "start_time" not in report:
+        return None
+    try:
+        if datetime.datetime.fromisoformat(report["start_time"]) < since:
+            return None
+    except (TypeError, ValueError):
+        return None
+    return report
+
+
+def _fresh_task_status(task_path: Path, since: datetime.datetime):
+    """Internal function to get the status of the report of a task, `None` if there is none or the task started before `since`"""
+    report = _fresh_task_report(task_path, since)
+    return None if report is None else report.get("status")
+
+
+class TaskGraph:
+    """Class to declare the tasks of a run and the tasks each one depends on
+
+    Each task is a function which receives the `TaskManager` of the
+    task, already inside the task context, and does the processing. The
+    graph is processed with `RunManager.run_task_graph`, which runs each
+    task once all the tasks it depends on finished successfully, i.e.
+    with no errors, running the independent tasks concurrently in a
+    pool of processes. The tasks which depend on a task which failed are
+    skipped. Since the tasks run in other processes, the functions must
+    be defined at the top level of a module, so they can be pickled.
+
+    Tasks can only depend on tasks added before them, so the graph never
+    has cycles. Tasks which declare their `inputs` or `parameters`, see
+    the `TaskManager`, are not processed again while they are up to
+    date.
+
+    Examples
+    --------
+    >>> import lip_pps_run_manager as RM
+    >>> def calibrate(task):
+    ...   print("Calibrating")
+    >>> def analyse(task):
+    ...   for item in task.track(range(100)):
+    ...     print(item)
+    >>> graph = RM.TaskGraph()
+    >>> graph.add_task("calibrate", calibrate)
+    >>> graph.add_task("analyse", analyse, depends_on=["calibrate"], loop_iterations=100)
+    >>> with RM.RunManager(Path("Run0001")) as John:
+    ...   print(John.run_task_graph(graph, max_workers=4))
+
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    def __repr__(self):
+        """Get the python representation of this class"""
+        return "TaskGraph()"
+
+    @property
+    def tasks(self) -> list:
+        """The names of the tasks of the graph, in the order they were added"""
+        return list(self._tasks)
+
+    def dependencies(self, task_name: str) -> list:
+        """Get the names of the tasks a task depends on"""
+        return list(self._tasks[task_name]["depends_on"])
+
+    def add_task(self, task_name: str, function, depends_on: list = None, backup_python_file: bool = True, **task_options):
+        """Add a task to the graph
+
+        Parameters
+        ----------
+        task_name
+            The name of the task
+        function
+            The function processing the task, called with the
+            `TaskManager` of the task
+        depends_on
+            The names of the tasks this task depends on, which must
+            already be in the graph
+        backup_python_file
+            If `True`, the file where the function is defined is backed
+            up in the task directory, as with `RunManager.handle_task`,
+            and its content is part of the fingerprint which tells if
+            the task is up to date
+        task_options
+            Other parameters of the `TaskManager` of the task, e.g.
+            `loop_iterations`
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the incorrect type
+        ValueError
+            If the task is already in the graph or if it depends on a
+            task which is not
+
+        """
+        if not isinstance(task_name, str):
+            raise TypeError("The `task_name` must be a str type object, received object of type {}".format(type(task_name)))
+
+        if not callable(function):
+            raise TypeError("The `function` must be a callable type object, received object of type {}".format(type(function)))
+
+        if depends_on is None:
+            depends_on = []
+        if not isinstance(depends_on, list):
+            raise TypeError("The `depends_on` must be a list type object or None, received object of type {}".format(type(depends_on)))
+
+        if not isinstance(backup_python_file, bool):
+            raise TypeError(
+                "The `backup_python_file` must be a bool type object, received object of type {}".format(type(backup_python_file))
+            )
+
+        if task_name in self._tasks:
+            raise ValueError("The task {} is already in the graph".format(task_name))
+
+        for dependency in depends_on:
+            if dependency not in self._tasks:
+                raise ValueError("The task {} depends on {}, which must be added to the graph before it".format(task_name, dependency))
+
+        if backup_python_file:
+            task_options["script_to_backup"] = Path(inspect.getfile(function))
+
+        self._tasks[task_name] = {"function": function, "depends_on": list(depends_on), "options": task_options}
+
+    def run(
+        self,
+        path_to_run: Path,
+        max_workers: int = None,
+        executor: concurrent.futures.Executor = None,
+        task_options: dict = None,
+        status_message_id: str = None,
+        rate_limit_file: Path = None,
+    ):
+        """Process the tasks of the graph, see `RunManager.run_task_graph`
+
+        Parameters
+        ----------
+        path_to_run
+            The path to the directory of the run, which must exist
+        max_workers
+            The maximum number of tasks processed at once, by default
+            the number of processors
+        executor
+            The executor processing the tasks, by default a pool of
+            `max_workers` processes
+        task_options
+            The parameters of the `TaskManager` common to all the tasks,
+            the options of each task take precedence
+        status_message_id
+            The ID of the telegram message the messages of the tasks
+            reply to, if any
+        rate_limit_file
+            The lock file of the `RateLimiter` shared by the telegram
+            reporters of all the tasks, if any
+
+        Returns
+        -------
+        dict
+            The status of each task: "no errors", "incomplete", "there
+            were errors" or "skipped" if a task it depends on failed
+
+        """
+        if task_options is None:
+            task_options = {}
+
+        own_executor = executor is None
+        if own_executor:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+
+        results = {}
+        pending = {}
+        try:
+            while len(results) < len(self._tasks):
+                for task_name, task in self._tasks.items():
+                    if task_name in results or task_name in pending.values():
+                        continue
+                    dependency_results = [results.get(dependency) for dependency in task["depends_on"]]
+                    if any(result in [failed_status, skipped_status] for result in dependency_results):
+                        results[task_name] = skipped_status
+                    elif all(result is not None for result in dependency_results):
+                        options = dict(task_options, **task["options"])
+                        future = executor.submit(
+                            _run_graph_task, path_to_run, task_name, task["function"], options, status_message_id, rate_limit_file
+                        )
+                        pending[future] = task_name
+
+                if not pending:
+                    continue  # Only skipped tasks were found, look for the tasks depending on them
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    task_name = pending.pop(future)
+                    try:
+                        results[task_name] = future.result()
+                    except Exception:  # e.g. the worker process died
+                        results[task_name] = failed_status
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True)
+
+        return {task_name: results[task_name] for task_name in self._tasks}
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""The Task Report module
+
+Contains the functions used to write and read the machine-readable
+reports of the tasks.
+
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+report_file_name = "task_report.json"
+legacy_report_file_name = "task_report.txt"
+
+
+def write_task_report(task_path: Path, report: dict):
+    """Write the machine-readable report of a task, atomically
+
+    The report is written to a temporary file which then replaces the
+    report file, so a reader never sees a partially written report.
+
+    Parameters
+    ----------
+    task_path
+        The path to the directory of the task
+    report
+        The content of the report, it must be serialisable to json
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    """
+    if not isinstance(task_path, Path):
+        raise TypeError("The `task_path` must be a Path type object, received object of type {}".format(type(task_path)))
+
+    if not isinstance(report, dict):
+        raise TypeError("The `report` must be a dict type object, received object of type {}".format(type(report)))
+
+    tmp_path = task_path / (report_file_name + ".tmp")
+    with open(tmp_path, "w", encoding="utf8") as out_file:
+        json.dump(report, out_file, indent=2)
+        out_file.flush()
+        os.fsync(out_file.fileno())
+    os.replace(tmp_path, task_path / report_file_name)
+
+
+def read_task_report(task_path: Path):
+    """Read the machine-readable report of a task
+
+    Parameters
+    ----------
+    task_path
+        The path to the directory of the task
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Returns
+    -------
+    dict
+        The content of the report, `None` if there is no report or it
+        can not be decoded
+
+    """
+    if not isinstance(task_path, Path):
+        raise TypeError("The `task_path` must be a Path type object, received object of type {}".format(type(task_path)))
+
+    try:
+        with open(task_path / report_file_name, "r", encoding="utf8") as in_file:
+            report = json.load(in_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if not isinstance(report, dict):
+        return None
+    return report
+
+
+def read_task_status(task_path: Path):
+    """Get the status a task finished with
+
+    The status is taken from the machine-readable report of the task. For
+    tasks which only have the text report, written by older versions,
+    the status is taken from the "task_status:" line of the text report.
+
+    Parameters
+    ----------
+    task_path
+        The path to the directory of the task
+
+    Raises
+    ------
+    TypeError
+        If a parameter has the incorrect type
+
+    Returns
+    -------
+    str
+        The status of the task, i.e. "no errors", "incomplete" or "there
+        were errors", `None` if the task has no report
+
+    """
+    report = read_task_report(task_path)
+    if report is not None and "status" in report:
+        return report["status"]
+
+    try:
+        with open(task_path / legacy_report_file_name, "r", encoding="utf8") as in_file:
+            for line in in_file:
+                if line.startswith("task_status: "):
+                    return line[len("task_status: "):].strip()
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def task_fingerprint(inputs: list, parameters: dict, script: Path = None) -> str:
+    """Compute the fingerprint of what a task depends on
+
+    Like make, the input files are considered unchanged as long as
+    their size and modification time do not change, so large input
+    files are not read. The script processing the task, on the other
+    hand, is compared by the checksum of its content.
+
+    Parameters
+    ----------
+    inputs
+        The paths to the input files of the task, which must exist
+    parameters
+        The parameters of the task, which must be serialisable to json
+    script
+        The path to the script processing the task, if any
+
+    Raises
+    ------
+    RuntimeError
+        If an input file does not exist
+
+    Returns
+    -------
+    str
+        The fingerprint, a sha256 hex digest
+
+    """
+    input_states = []
+    for path in inputs:
+        if not path.is_file():
+            raise RuntimeError("The input file {} does not exist".format(path))
+        stat = path.stat()
+        input_states.append([str(path.absolute()), stat.st_size, stat.st_mtime_ns])
+
+    script_digest = None
+    if script is not None:
+        script_digest = hashlib.sha256(script.read_bytes()).hexdigest()
+
+    content = json.dumps({"inputs": sorted(input_states), "parameters": parameters, "script": script_digest}, sort_keys=True)
+    return hashlib.sha256(content.encode("utf8")).hexdigest()
@@ -5,12 +5,61 @@ Contains classes and functions used to manage bots to report things to telegram.
 
 """
 
-import datetime
+import logging
+import queue
+import threading
 import time
 import warnings
+from concurrent.futures import Future
 
 import requests
 
+from lip_pps_run_manager.outbox import TelegramOutbox
+from lip_pps_run_manager.rate_limiter import RateLimiter
+from lip_pps_run_manager.rate_limiter import get_shared_rate_limiter
+from lip_pps_run_manager.retry import CircuitBreaker
+from lip_pps_run_manager.retry import CircuitOpenError
+from lip_pps_run_manager.retry import RetryPolicy
+
+_logger = logging.getLogger(__name__)
+
+
+class TelegramAPIError(RuntimeError):
+    """Exception raised when the telegram bot API answers a request with an error
+
+    Parameters
+    ----------
+    response
+        The decoded json response of the telegram bot API
+
+    Attributes
+    ----------
+    error_code
+        The error code of the response, which follows the HTTP status codes
+    description
+        The human readable description of the error
+    retry_after
+        The number of seconds telegram asks to wait before retrying, if any
+    """
+
+    def __init__(self, response: dict):
+        self.error_code = response.get("error_code")
+        self.description = response.get("description")
+        self.retry_after = response.get("parameters", {}).get("retry_after")
+        super().__init__("Telegram answered with error {}: {}".format(self.error_code, self.description))
+
+    @property
+    def is_transient(self) -> bool:
+        """Whether the same request may succeed if retried later"""
+        return self.error_code == 429 or (self.error_code is not None and self.error_code >= 500)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Check if a failed request may succeed if retried later, e.g. once the network is back"""
+    if isinstance(error, TelegramAPIError):
+        return error.is_transient
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, ValueError, CircuitOpenError))
+
 
 class TelegramReporter:
     """Class to report to telegram
@@ -26,11 +75,36 @@ class TelegramReporter:
         The telegram bot token to use (this value should be a secret, so do not share it)
     chat_id
         The telegram chat ID the reporter should send messages to
+    rate_limit
+        If set, messages will be delayed to respect the rate limits set
+        by telegram
+    rate_limiter
+        The `RateLimiter` to use when `rate_limit` is set. If `None`,
+        the rate limiter shared by all the reporters of the same bot in
+        this process is used, see `get_shared_rate_limiter`
+    retry_policy
+        The `RetryPolicy` used to retry requests which failed because of
+        connection problems, server errors or rate limiting by telegram.
+        If `None`, the default `RetryPolicy` is used
+    circuit_breaker
+        The `CircuitBreaker` used to stop sending requests for a while
+        after repeated connection failures, so that an unreachable
+        telegram does not slow down the caller. If `None`, the default
+        `CircuitBreaker` is used
+    asynchronous
+        If set, messages submitted with `submit_message` and
+        `submit_edit` are placed in an outbound queue and delivered by a
+        dedicated worker thread, so the caller only pays for the enqueue
+    max_queue_size
+        The maximum number of requests waiting in the outbound queue
+        when in asynchronous mode. If the queue is full, new requests
+        are dropped with a warning instead of blocking the caller
 
     Attributes
     ----------
     bot_token
     chat_id
+    asynchronous
 
     Raises
     ------
@@ -48,11 +122,40 @@ class TelegramReporter:
     _chat_id = None
     _session = None
 
-    _last_message_time = datetime.datetime.now() - datetime.timedelta(seconds=5)
     _rate_limit = True  # If set, messages will be delayed to respect the rate limits set by telegram
-    _rate_min_time = datetime.timedelta(seconds=1)  # Minimum allowed time between messages
-
-    def __init__(self, bot_token: str, chat_id: str, rate_limit: bool = True):
+    _rate_limiter = None
+    _retry_policy = None
+    _circuit_breaker = None
+
+    _asynchronous = False
+    _max_queue_size = 100
+    _queue = None
+    _worker = None
+    _worker_lock = None
+    _closed = False
+    _pending_edits = None
+    _pending_futures = None
+    _pending_lock = None
+
+    _outbox = None
+    _outbox_lock = None
+    _outbox_futures = None
+    _outboxed = None
+    _replay_lock = None
+    _replayer = None
+    _replayer_stop = None
+
+    def __init__(
+        self,
+        bot_token: str,
+        chat_id: str,
+        rate_limit: bool = True,
+        asynchronous: bool = False,
+        max_queue_size: int = 100,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+    ):
         if not isinstance(bot_token, str):
             raise TypeError("The `bot_token` must be a str type object, received object of type {}".format(type(bot_token)))
 
@@ -62,14 +165,51 @@ class TelegramReporter:
         if not isinstance(rate_limit, bool):
             raise TypeError("The `rate_limit` must be a bool type object, received object of type {}".format(type(chat_id)))
 
+        if not isinstance(asynchronous, bool):
+            raise TypeError("The `asynchronous` must be a bool type object, received object of type {}".format(type(asynchronous)))
+
+        if not isinstance(max_queue_size, int):
+            raise TypeError("The `max_queue_size` must be a int type object, received object of type {}".format(type(max_queue_size)))
+
+        if rate_limiter is not None and not isinstance(rate_limiter, RateLimiter):
+            raise TypeError(
+                "The `rate_limiter` must be a RateLimiter type object or None, received object of type {}".format(type(rate_limiter))
+            )
+
+        if retry_policy is not None and not isinstance(retry_policy, RetryPolicy):
+            raise TypeError(
+                "The `retry_policy` must be a RetryPolicy type object or None, received object of type {}".format(type(retry_policy))
+            )
+
+        if circuit_breaker is not None and not isinstance(circuit_breaker, CircuitBreaker):
+            raise TypeError(
+                "The `circuit_breaker` must be a CircuitBreaker type object or None, received object of type {}".format(
+                    type(circuit_breaker)
+                )
+            )
+
         self._bot_token = bot_token
         self._chat_id = chat_id
         self._session = requests.Session()
         self._rate_limit = rate_limit
+        if rate_limit:
+            self._rate_limiter = rate_limiter if rate_limiter is not None else get_shared_rate_limiter(bot_token)
+        self._retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self._circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self._asynchronous = asynchronous
+        self._max_queue_size = max_queue_size
+        self._worker_lock = threading.Lock()
+
+        if self._asynchronous:
+            self._start_worker()
 
     def __repr__(self):
         """Get the python representation of this class"""
-        return "TelegramReporter({}, {}, rate_limit={})".format(repr(self.bot_token), repr(self.chat_id), repr(self._rate_limit))
+        if not self._asynchronous:
+            return "TelegramReporter({}, {}, rate_limit={})".format(repr(self.bot_token), repr(self.chat_id), repr(self._rate_limit))
+        return "TelegramReporter({}, {}, rate_limit={}, asynchronous={}, max_queue_size={})".format(
+            repr(self.bot_token), repr(self.chat_id), repr(self._rate_limit), repr(self._asynchronous), repr(self._max_queue_size)
+        )
 
     @property
     def bot_token(self) -> str:
@@ -81,7 +221,104 @@ class TelegramReporter:
         """The chat ID property getter method"""
         return self._chat_id
 
-    def _send_message(self, message_text: str, reply_to_message_id: str = None):
+    @property
+    def asynchronous(self) -> bool:
+        """Whether the reporter delivers messages from a background worker thread"""
+        return self._asynchronous
+
+    def _wait_for_rate_limit(self):
+        """Internal function which sleeps until the rate limits allow a new message to be sent"""
+        if self._rate_limit:
+            self._rate_limiter.acquire(self.chat_id)
+
+    def _start_worker(self):
+        """Internal function to start the worker thread which delivers the requests of the outbound queue"""
+        self._pending_edits = {}
+        self._pending_futures = {}
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self._max_queue_size)
+        self._worker = threading.Thread(target=self._process_queue, name="TelegramReporter-{}".format(self.chat_id), daemon=True)
+        self._worker.start()
+
+    def _call_api(self, api_method: str, data: dict, use_post: bool, rate_limit_acquired: bool = False, retry: bool = True):
+        """Internal function to make a request to the telegram bot API, retrying if needed.
+
+        Requests failing because of connection problems, invalid
+        responses, server errors or rate limiting are retried according
+        to the retry policy, honouring the `retry_after` time requested
+        by telegram. Connection problems and server errors are recorded
+        in the circuit breaker, and no request is made while it is open.
+
+        Parameters
+        ----------
+        api_method
+            The name of the bot API method to call
+        data
+            The parameters of the API method
+        use_post
+            If set, the request is made with POST, otherwise with GET
+        rate_limit_acquired
+            If set, the rate limit has already been waited for the first
+            attempt
+        retry
+            If not set, the request is only attempted once, so that the
+            caller is never put to sleep waiting for a retry
+
+        Raises
+        ------
+        CircuitOpenError
+            If the circuit breaker is open
+        TelegramAPIError
+            If telegram answered with an error which is not transient or
+            if there are no retries left
+        Exception
+            The exception of the last attempt if there are no retries left
+
+        Returns
+        -------
+        json
+            The decoded json response of telegram
+
+        """
+        attempt = 0
+        while True:
+            if not self._circuit_breaker.allow():
+                raise CircuitOpenError(
+                    "Telegram could not be reached recently, not trying again for {:.0f} s".format(
+                        self._circuit_breaker.remaining_cool_down
+                    )
+                )
+
+            if attempt > 0 or not rate_limit_acquired:
+                self._wait_for_rate_limit()
+
+            retry_after = None
+            try:
+                request = self._session.post if use_post else self._session.get
+                response = request("https://api.telegram.org/bot{}/{}".format(self.bot_token, api_method), data=data, timeout=1)
+                response_json = response.json()
+                if not response_json["ok"]:
+                    raise TelegramAPIError(response_json)
+                self._circuit_breaker.record_success()
+                return response_json
+            except TelegramAPIError as e:
+                if not e.is_transient:
+                    self._circuit_breaker.record_success()  # Telegram was reached, so the connection is fine
+                    raise
+                if e.error_code != 429:
+                    self._circuit_breaker.record_failure()
+                retry_after = e.retry_after
+                if not retry or attempt >= self._retry_policy.max_retries:
+                    raise
+            except (requests.ConnectionError, requests.Timeout, ValueError):
+                self._circuit_breaker.record_failure()
+                if not retry or attempt >= self._retry_policy.max_retries:
+                    raise
+
+            time.sleep(self._retry_policy.delay(attempt, retry_after))
+            attempt += 1
+
+    def _send_message(self, message_text: str, reply_to_message_id: str = None, retry: bool = True):
         """Internal function to send a message to the chat using the bot.
 
         This is the internal counterpart to `send_message`. Avoid calling
@@ -96,27 +333,27 @@ class TelegramReporter:
         reply_to_message_id
             If the message is in reply to another message, place the ID
             of the message being replied to here
+        retry
+            If set, failed attempts are retried according to the retry
+            policy of the reporter
 
         """
         message_params = {'chat_id': self.chat_id, 'text': message_text}
         if reply_to_message_id is not None:
             message_params["reply_to_message_id"] = reply_to_message_id
 
-        if self._rate_limit:
-            if datetime.datetime.now() - self._last_message_time < self._rate_min_time:
-                time.sleep((self._rate_min_time - (datetime.datetime.now() - self._last_message_time)).total_seconds())
-
-        response = self._session.get(
-            "https://api.telegram.org/bot{}/sendMessage".format(self.bot_token),
-            data=message_params,
-            timeout=1,
-        )
-        self._last_message_time = datetime.datetime.now()
-        return response.json()
+        return self._call_api("sendMessage", message_params, use_post=False, retry=retry)
 
     def send_message(self, message_text: str, reply_to_message_id: str = None):
         """Send a message to the chat using the bot.
 
+        The message is only attempted once, so that the caller is never
+        put to sleep. If it fails for a transient reason, it is stored
+        in the outbox, if there is one, or otherwise retried by the
+        worker thread of the reporter, according to its retry policy.
+        If the message can not be sent right away, a warning is issued
+        and `None` is returned.
+
         Parameters
         ----------
         message_text
@@ -148,13 +385,26 @@ class TelegramReporter:
             )
 
         try:
-            return self._send_message(message_text, reply_to_message_id)
+            return self._send_message(message_text, reply_to_message_id, retry=False)
         except KeyboardInterrupt:
             raise
         except Exception as e:
+            if self._outbox is not None and _is_transient(e):
+                self._add_to_outbox("send", message_text, reply_to_message_id)
+                warnings.warn(
+                    "Failed sending to telegram, the message was stored in the outbox. Reason: {}".format(repr(e)), category=RuntimeWarning
+                )
+                return None
+            retriable = _is_transient(e) and not isinstance(e, CircuitOpenError)
+            if retriable and self._retry_in_background("send", message_text, reply_to_message_id):
+                warnings.warn(
+                    "Failed sending to telegram, the message will be retried in the background. Reason: {}".format(repr(e)),
+                    category=RuntimeWarning,
+                )
+                return None
             warnings.warn("Failed sending to telegram. Reason: {}".format(repr(e)), category=RuntimeWarning)
 
-    def _edit_message(self, message_text: str, message_id: str):
+    def _edit_message(self, message_text: str, message_id: str, rate_limit_acquired: bool = False, retry: bool = True):
         """Internal function to edit a message that was previously sent to the chat using the bot.
 
         This is the internal counterpart to `edit_message`. Avoid calling
@@ -168,28 +418,35 @@ class TelegramReporter:
             The message the bot should change to message to
         message_id
             The ID of the message to edit
+        rate_limit_acquired
+            If set, the rate limit has already been waited for
+        retry
+            If set, failed attempts are retried according to the retry
+            policy of the reporter
 
         """
-        if self._rate_limit:
-            if datetime.datetime.now() - self._last_message_time < self._rate_min_time:
-                time.sleep((self._rate_min_time - (datetime.datetime.now() - self._last_message_time)).total_seconds())
-
-        response = self._session.post(
-            "https://api.telegram.org/bot{}/editMessageText".format(self.bot_token),
-            data={
+        return self._call_api(
+            "editMessageText",
+            {
                 "chat_id": self.chat_id,
                 "text": message_text,
                 "message_id": message_id,
             },
-            timeout=1,
+            use_post=True,
+            rate_limit_acquired=rate_limit_acquired,
+            retry=retry,
         )
 
-        self._last_message_time = datetime.datetime.now()
-        return response.json()
-
     def edit_message(self, message_text: str, message_id: str):
         """Edit a message that was previously sent to the chat using the bot.
 
+        The edit is only attempted once, so that the caller is never put
+        to sleep. If it fails for a transient reason, it is stored in
+        the outbox, if there is one, or otherwise retried by the worker
+        thread of the reporter, according to its retry policy. If the
+        message can not be edited right away, a warning is issued and
+        `None` is returned.
+
         Parameters
         ----------
         message_text
@@ -218,8 +475,405 @@ class TelegramReporter:
             raise TypeError("The `message_id` must be a str type object, received object of type {}".format(type(message_id)))
 
         try:
-            return self._edit_message(message_text, message_id)
+            return self._edit_message(message_text, message_id, retry=False)
         except KeyboardInterrupt:
             raise
         except Exception as e:
+            if self._outbox is not None and _is_transient(e):
+                self._add_to_outbox("edit", message_text, message_id)
+                warnings.warn(
+                    "Failed sending to telegram, the edit was stored in the outbox. Reason: {}".format(repr(e)), category=RuntimeWarning
+                )
+                return None
+            retriable = _is_transient(e) and not isinstance(e, CircuitOpenError)
+            if retriable and self._retry_in_background("edit", message_text, message_id):
+                warnings.warn(
+                    "Failed sending to telegram, the edit will be retried in the background. Reason: {}".format(repr(e)),
+                    category=RuntimeWarning,
+                )
+                return None
             warnings.warn("Failed sending to telegram. Reason: {}".format(repr(e)), category=RuntimeWarning)
+
+    def _retry_in_background(self, kind: str, message_text: str, message_id: str) -> bool:
+        """Internal function to hand a request which failed for a transient reason to the worker thread, which retries it
+
+        The worker thread is started when first needed. Returns `False`
+        if the reporter has been closed or the outbound queue is full.
+        """
+        with self._worker_lock:
+            if self._closed:
+                return False
+            if self._worker is None:
+                self._start_worker()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # The caller warns about the failure
+            if kind == "edit":
+                future = self._queue_edit(message_text, message_id)
+            else:
+                future = self._put(kind, message_text, message_id)
+        return not future.done()
+
+    @property
+    def outbox(self) -> TelegramOutbox:
+        """The outbox where undelivered messages are stored property getter method"""
+        return self._outbox
+
+    def set_outbox(self, outbox: TelegramOutbox, replay_interval: float = 30.0):
+        """Store the messages which can not be delivered in an outbox and replay them later
+
+        From now on, messages and edits which fail because of connection
+        problems (or while the circuit breaker is open) are appended to
+        the outbox instead of being lost. A background thread tries to
+        deliver the content of the outbox every `replay_interval`
+        seconds, including any requests left in it by a previous
+        process. In asynchronous mode, the future of a request stored in
+        the outbox only resolves once the request is finally delivered.
+
+        Parameters
+        ----------
+        outbox
+            The outbox to use
+        replay_interval
+            The time, in seconds, between attempts to deliver the
+            content of the outbox
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the wrong type
+        RuntimeError
+            If the reporter already has an outbox
+
+        """
+        if not isinstance(outbox, TelegramOutbox):
+            raise TypeError("The `outbox` must be a TelegramOutbox type object, received object of type {}".format(type(outbox)))
+
+        if not isinstance(replay_interval, (int, float)):
+            raise TypeError("The `replay_interval` must be a float type object, received object of type {}".format(type(replay_interval)))
+
+        if self._outbox is not None:
+            raise RuntimeError("The TelegramReporter already has an outbox")
+
+        outbox.compact()  # Merge superseded edits left by a previous process before replaying
+
+        self._outbox = outbox
+        self._outbox_lock = threading.Lock()
+        self._outbox_futures = {}
+        self._outboxed = {}
+        self._replay_lock = threading.Lock()
+        self._replayer_stop = threading.Event()
+        self._replayer = threading.Thread(
+            target=self._replay_loop, args=(float(replay_interval),), name="TelegramReplayer-{}".format(self.chat_id), daemon=True
+        )
+        self._replayer.start()
+
+    def _add_to_outbox(self, kind: str, message_text: str, message_id, future: Future = None) -> str:
+        """Internal function to store a request which could not be delivered in the outbox
+
+        The `message_id` can be a `Future` of a request which is itself
+        in the outbox, in which case the outbox key of that request is
+        used as reference.
+        """
+        message_key = None
+        with self._outbox_lock:
+            if isinstance(message_id, Future):
+                message_key = self._outboxed[message_id]
+                message_id = None
+
+            if kind == "edit":
+                key = self._outbox.add_edit(message_text, message_id=message_id, message_key=message_key)
+            else:
+                key = self._outbox.add_message(message_text, reply_to_message_id=message_id, reply_to_key=message_key)
+
+            if future is not None:
+                self._outbox_futures[key] = future
+                self._outboxed[future] = key
+        return key
+
+    def _is_outboxed(self, message_id) -> bool:
+        """Internal function to check if a message ID is the future of a request waiting in the outbox"""
+        if self._outbox is None or not isinstance(message_id, Future):
+            return False
+        with self._outbox_lock:
+            return message_id in self._outboxed
+
+    def replay_outbox(self) -> bool:
+        """Try to deliver the requests stored in the outbox
+
+        The requests are compacted first, so superseded edits are not
+        sent. Delivery stops at the first request which fails for a
+        transient reason, the remaining requests are kept for the next
+        attempt. Requests which telegram refuses are dropped.
+
+        Returns
+        -------
+        bool
+            `True` if the outbox is now empty, `False` otherwise
+
+        """
+        if self._outbox is None:
+            return True
+
+        with self._replay_lock:
+            return self._replay_outbox()
+
+    def _replay_outbox(self) -> bool:
+        """Internal function implementing `replay_outbox`, the replay lock must be held"""
+        delivered = {}
+        for record in self._outbox.pending():
+            message_id = record["message_id"]
+            if record["message_key"] is not None:
+                if record["message_key"] not in delivered:
+                    continue  # The referenced message was just dropped
+                message_id = delivered[record["message_key"]]
+
+            error = None
+            result = None
+            try:
+                if record["kind"] == "edit":
+                    response = self._edit_message(record["text"], message_id)
+                else:
+                    response = self._send_message(record["text"], message_id)
+                result = str(response['result']['message_id'])
+            except Exception as e:
+                if _is_transient(e):
+                    self._outbox.sync()
+                    return False
+                _logger.warning("Dropping a message from the telegram outbox. Reason: {}".format(repr(e)))
+                error = e
+
+            for key in [record["key"]] + record["superseded"]:
+                self._outbox.mark_delivered(key, result)
+                with self._outbox_lock:
+                    future = self._outbox_futures.pop(key, None)
+                    if future is not None:
+                        self._outboxed.pop(future)
+                if future is not None:
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+            if error is None:
+                delivered[record["key"]] = result
+
+        self._outbox.compact()
+        return True
+
+    def _replay_loop(self, replay_interval: float):
+        """Internal function run by the replayer thread"""
+        while not self._replayer_stop.wait(replay_interval):
+            try:
+                self._outbox.sync()
+                if not self._circuit_breaker.is_open:
+                    self.replay_outbox()
+            except Exception as e:  # pragma: no cover
+                _logger.warning("Failed replaying the telegram outbox. Reason: {}".format(repr(e)))
+
+    def _process_queue(self):
+        """Internal function run by the worker thread to drain the outbound queue.
+
+        Each entry in the queue is a tuple with the kind of request
+        ("send" or "edit"), its arguments and the future to resolve with
+        the resulting message ID. Message IDs passed as futures (i.e.
+        replies to or edits of a message which was itself queued) are
+        resolved before sending, which is safe since the queue is
+        processed in order. The text of an edit is only fetched from the
+        pending edits once the rate limit allows the edit to be sent, so
+        that only the newest text is sent. Requests failing for transient
+        reasons, or which refer to a request waiting in the outbox, are
+        stored in the outbox if there is one, and their future is left
+        pending until they are replayed. A `None` entry stops the worker.
+
+        """
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is None:
+                    return
+
+                kind, message_text, message_id, future = entry
+                if not future.set_running_or_notify_cancel():  # pragma: no cover
+                    continue
+
+                try:
+                    if kind == "edit":
+                        self._wait_for_rate_limit()
+                        with self._pending_lock:
+                            message_text = self._pending_edits.pop(message_id)
+                            self._pending_futures.pop(message_id)
+                    if self._is_outboxed(message_id):
+                        self._add_to_outbox(kind, message_text, message_id, future)
+                        continue
+                    if isinstance(message_id, Future):
+                        message_id = message_id.result()
+                    if kind == "edit":
+                        response = self._edit_message(message_text, message_id, rate_limit_acquired=True)
+                    else:
+                        response = self._send_message(message_text, message_id)
+                    future.set_result(str(response['result']['message_id']))
+                except Exception as e:
+                    if self._outbox is not None and _is_transient(e) and not isinstance(message_id, Future):
+                        self._add_to_outbox(kind, message_text, message_id, future)
+                        continue
+                    _logger.warning("Failed sending to telegram. Reason: {}".format(repr(e)))
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def _enqueue(self, kind: str, message_text: str, message_id) -> Future:
+        """Internal function to place a request in the outbound queue without blocking"""
+        if not self._asynchronous:
+            raise RuntimeError("The TelegramReporter is not in asynchronous mode, use `send_message` or `edit_message` instead")
+        if self._worker is None:
+            raise RuntimeError("The TelegramReporter has been closed, no more messages can be submitted")
+        return self._put(kind, message_text, message_id)
+
+    def _put(self, kind: str, message_text: str, message_id) -> Future:
+        """Internal function to place a request in the outbound queue, the worker thread must be running"""
+        future = Future()
+        try:
+            self._queue.put_nowait((kind, message_text, message_id, future))
+        except queue.Full:
+            warnings.warn("The telegram outbound queue is full, the message was dropped", category=RuntimeWarning)
+            future.set_exception(RuntimeError("The telegram outbound queue is full"))
+        return future
+
+    def submit_message(self, message_text: str, reply_to_message_id=None) -> Future:
+        """Queue a message to be sent to the chat by the worker thread.
+
+        Only available in asynchronous mode. The call returns as soon as
+        the message is queued.
+
+        Parameters
+        ----------
+        message_text
+            The message the bot should send to the chat
+        reply_to_message_id
+            If the message is in reply to another message, place the ID
+            of the message being replied to here. A `Future` returned by
+            a previous submission is also accepted
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the wrong type
+        RuntimeError
+            If the reporter is not in asynchronous mode
+        Warning
+            If the outbound queue is full and the message is dropped
+
+        Returns
+        -------
+        Future
+            A future which resolves to the ID of the sent message
+
+        Examples
+        --------
+        >>> import lip_pps_run_manager as RM
+        >>> bot = RM.TelegramReporter("SecretBotToken", "PostToThisChat_ID", asynchronous=True)
+        >>> message_id = bot.submit_message("Hello World!")
+        >>> bot.submit_edit("Hello again!", message_id)
+
+        """
+        if not isinstance(message_text, str):
+            raise TypeError("The `message_text` must be a str type object, received object of type {}".format(type(message_text)))
+
+        if reply_to_message_id is not None and not isinstance(reply_to_message_id, (str, Future)):
+            raise TypeError(
+                "The `reply_to_message_id` must be a str or Future type object, received object of type {}".format(
+                    type(reply_to_message_id)
+                )
+            )
+
+        return self._enqueue("send", message_text, reply_to_message_id)
+
+    def submit_edit(self, message_text: str, message_id) -> Future:
+        """Queue an edit of a previously sent message to be made by the worker thread.
+
+        Only available in asynchronous mode. The call returns as soon as
+        the edit is queued. If an edit of the same message is already
+        waiting to be sent, no new request is queued, the pending edit is
+        instead updated to the new text and its future is returned. This
+        way, only the newest text of a message is sent, no matter how
+        often it is edited.
+
+        Parameters
+        ----------
+        message_text
+            The message the bot should change to message to
+        message_id
+            The ID of the message to edit. A `Future` returned by a
+            previous submission is also accepted
+
+        Raises
+        ------
+        TypeError
+            If a parameter has the wrong type
+        RuntimeError
+            If the reporter is not in asynchronous mode
+        Warning
+            If the outbound queue is full and the edit is dropped
+
+        Returns
+        -------
+        Future
+            A future which resolves to the ID of the edited message
+
+        """
+        if not isinstance(message_text, str):
+            raise TypeError("The `message_text` must be a str type object, received object of type {}".format(type(message_text)))
+
+        if not isinstance(message_id, (str, Future)):
+            raise TypeError("The `message_id` must be a str or Future type object, received object of type {}".format(type(message_id)))
+
+        if not self._asynchronous:
+            raise RuntimeError("The TelegramReporter is not in asynchronous mode, use `send_message` or `edit_message` instead")
+        if self._worker is None:
+            raise RuntimeError("The TelegramReporter has been closed, no more messages can be submitted")
+        return self._queue_edit(message_text, message_id)
+
+    def _queue_edit(self, message_text: str, message_id) -> Future:
+        """Internal function to queue an edit, or update the text of the edit of the same message already queued"""
+        with self._pending_lock:
+            if message_id in self._pending_edits:
+                self._pending_edits[message_id] = message_text
+                return self._pending_futures[message_id]
+
+            future = self._put("edit", None, message_id)
+            if not future.done():
+                self._pending_edits[message_id] = message_text
+                self._pending_futures[message_id] = future
+            return future
+
+    def flush(self):
+        """Block until all the queued requests have been processed
+
+        Does nothing if there is no outbound queue, i.e. if the reporter
+        is not in asynchronous mode and never had to retry a request.
+        """
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """Deliver all the queued requests and stop the worker threads
+
+        The queued requests, in asynchronous mode or being retried in
+        the background, are processed before the worker thread stops.
+        No more requests are retried in the background. If there is an outbox, the replayer
+        thread is stopped and the outbox is synced to disk, the requests
+        still in it are kept for a later replay. Does nothing for what
+        has already been closed.
+        """
+        with self._worker_lock:
+            self._closed = True
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+        if self._replayer is not None:
+            self._replayer_stop.set()
+            self._replayer.join()
+            self._replayer = None
+            self._outbox.close()
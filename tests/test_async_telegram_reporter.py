@@ -0,0 +1,210 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from test_telegram_reporter_class import SessionReplacement
+
+import lip_pps_run_manager as RM
+
+
+def test_async_telegram_reporter():
+    session = SessionReplacement()
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", session=session)
+
+    assert reporter.bot_token == "bot_token"
+    assert reporter.chat_id == "chat_id"
+    assert reporter.asynchronous
+    assert reporter.outbox is None
+    assert repr(reporter) == "AsyncTelegramReporter('bot_token', 'chat_id', rate_limit=True)"
+
+
+def test_fail_async_telegram_reporter():
+    try:
+        RM.AsyncTelegramReporter(1, "chat_id", session=SessionReplacement())
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == ("The `bot_token` must be a str type object, received object of type <class 'int'>")
+
+    try:
+        RM.AsyncTelegramReporter("bot_token", 1, session=SessionReplacement())
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == ("The `chat_id` must be a str type object, received object of type <class 'int'>")
+
+    try:
+        RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limit=1, session=SessionReplacement())
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == ("The `rate_limit` must be a bool type object, received object of type <class 'int'>")
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_async_telegram_reporter_shared_session():
+    first = RM.AsyncTelegramReporter("shared_session_bot_token", "chat_id")
+    second = RM.AsyncTelegramReporter("shared_session_bot_token", "other_chat_id")
+
+    assert first._session is second._session
+
+
+def test_async_telegram_reporter_send_and_edit_message():
+    session = SessionReplacement()
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limit=False, session=session)
+
+    async def send():
+        sent = await reporter.send_message("Hello there", "123")
+        edited = await reporter.edit_message("General Kenobi", "456")
+        return sent, edited
+
+    sent, edited = asyncio.run(send())
+
+    assert sent["previous message"]["url"] == "https://api.telegram.org/botbot_token/sendMessage"
+    assert sent["previous message"]["data"] == {"chat_id": "chat_id", "text": "Hello there", "reply_to_message_id": "123"}
+    assert edited["url"] == "https://api.telegram.org/botbot_token/editMessageText"
+    assert edited["data"] == {"chat_id": "chat_id", "text": "General Kenobi", "message_id": "456"}
+    assert edited["timeout"] == 1
+
+
+def test_async_telegram_reporter_send_message_bad_types():
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limit=False, session=SessionReplacement())
+
+    async def send():
+        with pytest.raises(TypeError, match="The `message_text` must be a str type object"):
+            await reporter.send_message(1)
+        with pytest.raises(TypeError, match="The `reply_to_message_id` must be a str type object"):
+            await reporter.send_message("Hello", 1)
+        with pytest.raises(TypeError, match="The `message_id` must be a str type object"):
+            await reporter.edit_message("Hello", 1)
+
+    asyncio.run(send())
+
+
+def test_async_telegram_reporter_failure_warns():
+    session = SessionReplacement()
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limit=False, session=session)
+    session._set_error_type("BadRequest")
+
+    async def send():
+        with pytest.warns(RuntimeWarning, match="Failed sending to telegram"):
+            assert await reporter.send_message("Hello there") is None
+        with pytest.warns(RuntimeWarning, match="Failed sending to telegram"):
+            assert await reporter.edit_message("Hello there", "123") is None
+
+    asyncio.run(send())
+    assert reporter._circuit_breaker.is_open is False
+
+
+def test_async_telegram_reporter_retry_after():
+    session = SessionReplacement()
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limit=False, session=session)
+    session._set_error_type("RetryAfter")
+
+    response = asyncio.run(reporter.send_message("Hello there"))
+
+    assert response["result"]["message_id"] == "This is the message ID"
+
+
+def test_async_telegram_reporter_rate_limit_does_not_block_loop():
+    limiter = RM.RateLimiter(chat_rate=20.0, chat_burst=1)
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limiter=limiter, session=SessionReplacement())
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.005)
+
+    async def send():
+        start = time.monotonic()
+        await asyncio.gather(reporter.send_message("One"), reporter.send_message("Two"), reporter.send_message("Three"), ticker())
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(send())
+
+    assert elapsed >= 0.09  # Three messages at 20 per second
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.09  # The ticker kept running while the messages waited for the rate limit
+
+
+def test_async_telegram_reporter_submit():
+    session = SessionReplacement()
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limit=False, session=session)
+
+    async def submit():
+        message_id = reporter.submit_message("Hello there")
+        reply_id = reporter.submit_message("A reply", message_id)
+        edit_id = reporter.submit_edit("Hello again", message_id)
+        await reporter.aclose()
+        return message_id, reply_id, edit_id
+
+    message_id, reply_id, edit_id = asyncio.run(submit())
+
+    assert message_id.result() == "This is the message ID"
+    assert reply_id.result() == "This is the message ID"
+    assert edit_id.result() == "This is the message ID"
+    assert len(reporter._submitted) == 0
+
+    try:
+        reporter.submit_message("Too late")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except RuntimeError as e:
+        assert str(e) == "The AsyncTelegramReporter has been closed, no more messages can be submitted"
+
+
+def test_async_telegram_reporter_submit_without_loop():
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limit=False, session=SessionReplacement())
+
+    try:
+        reporter.submit_message("Hello there")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except RuntimeError as e:
+        assert str(e) == "The AsyncTelegramReporter does not know which event loop to submit the message to"
+
+
+class RecordingSession(SessionReplacement):
+    def __init__(self, delays: dict):
+        super().__init__()
+        self._delays = delays
+        self.texts = []
+
+    def post(self, url: str, data=None, timeout=None):
+        time.sleep(self._delays.get(data["text"], 0))
+        self.texts.append(data["text"])
+        return super().post(url, data=data, timeout=timeout)
+
+
+def test_async_telegram_reporter_submit_edit_coalescing_and_order():
+    session = RecordingSession(delays={"Edit 2": 0.1})  # The first edit is the slowest to be delivered
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limit=False, session=session)
+
+    async def submit():
+        futures = [reporter.submit_edit("Edit {}".format(i), "message_id") for i in range(3)]
+        other_future = reporter.submit_edit("Other edit", "other_message_id")
+        await asyncio.sleep(0.05)  # The edit of "message_id" is being delivered
+        later_future = reporter.submit_edit("Edit 3", "message_id")
+        await reporter.flush()
+        return futures, other_future, later_future
+
+    futures, other_future, later_future = asyncio.run(submit())
+
+    assert all(future is futures[0] for future in futures)
+    assert other_future is not futures[0]
+    assert later_future is not futures[0]
+    assert futures[0].result() == "This is the message ID"
+    assert [text for text in session.texts if text != "Other edit"] == ["Edit 2", "Edit 3"]
+    assert reporter._pending_edits == {}
+    assert reporter._edit_locks == {}
+
+
+def test_async_telegram_reporter_submit_edit_takes_one_token():
+    limiter = RM.RateLimiter()
+    reporter = RM.AsyncTelegramReporter("bot_token", "chat_id", rate_limiter=limiter, session=SessionReplacement())
+
+    async def submit():
+        future = reporter.submit_edit("Edit", "message_id")
+        await reporter.flush()
+        return future
+
+    with patch.object(limiter, "reserve", wraps=limiter.reserve) as reserve:
+        assert asyncio.run(submit()).result() == "This is the message ID"
+        assert reserve.call_count == 1
@@ -0,0 +1,274 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import lip_pps_run_manager as RM
+from lip_pps_run_manager.backup_index import BackupIndex
+
+
+class PrepareBackupDir:
+    def __init__(self):
+        self._path = Path(tempfile.gettempdir()) / "test_backup_index"
+
+    def __enter__(self):
+        if self._path.exists():  # pragma: no cover
+            shutil.rmtree(self._path)
+        self._path.mkdir()
+        (self._path / "backup").mkdir()
+        return self._path
+
+    def __exit__(self, type, value, traceback):
+        shutil.rmtree(self._path)
+
+
+def touch_later(path: Path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_backup_index_bad_type():
+    try:
+        BackupIndex("backup")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `path_to_directory` must be a Path type object, received object of type <class 'str'>"
+
+
+def test_backup_index_repr():
+    assert repr(BackupIndex(Path("backup"))) == "BackupIndex({})".format(repr(Path("backup")))
+
+
+def test_backup_index_needs_backup():
+    with PrepareBackupDir() as path:
+        source = path / "config.json"
+        destination = path / "backup" / "config.json"
+        source.write_text("{}")
+
+        index = BackupIndex(path / "backup")
+        assert index.needs_backup(source, destination) is True
+        shutil.copy(source, destination)
+        index.record(source, destination)
+        assert index.needs_backup(source, destination) is False
+
+        touch_later(source)
+        assert index.needs_backup(source, destination) is True
+
+        source.write_text("[]")
+        assert index.needs_backup(source, destination) is True
+
+        destination.unlink()
+        assert index.needs_backup(source, destination) is True
+
+
+def test_backup_index_other_source_with_same_name():
+    with PrepareBackupDir() as path:
+        sources = [path / "a" / "config.json", path / "b" / "config.json"]
+        for source, content in zip(sources, ["{}", "[]"]):
+            source.parent.mkdir()
+            source.write_text(content)
+        stat = sources[0].stat()
+        os.utime(sources[1], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        destination = path / "backup" / "config.json"
+
+        index = BackupIndex(path / "backup")
+        shutil.copy(sources[0], destination)
+        index.record(sources[0], destination)
+        assert index.needs_backup(sources[0], destination) is False
+        assert index.needs_backup(sources[1], destination) is True
+
+
+def test_backup_index_compare_hash():
+    with PrepareBackupDir() as path:
+        source = path / "config.json"
+        destination = path / "backup" / "config.json"
+        source.write_text("{}")
+
+        index = BackupIndex(path / "backup")
+        digest = index.needs_backup(source, destination, compare_hash=True)
+        assert isinstance(digest, str)
+        shutil.copy(source, destination)
+        index.record(source, destination, digest)
+
+        touch_later(source)
+        assert index.needs_backup(source, destination, compare_hash=True) is False
+        assert index.needs_backup(source, destination) is False  # The new modification time was remembered
+
+        source.write_text("[]")
+        assert index.needs_backup(source, destination, compare_hash=True) not in [True, False]
+
+
+def test_backup_index_save_and_load():
+    with PrepareBackupDir() as path:
+        source = path / "config.json"
+        destination = path / "backup" / "config.json"
+        source.write_text("{}")
+        shutil.copy(source, destination)
+
+        index = BackupIndex(path / "backup")
+        index.record(source, destination)
+        index.save()
+        assert index.path == path / "backup" / "backup_index.json"
+
+        assert BackupIndex(path / "backup").needs_backup(source, destination) is False
+
+        index.path.write_text("not json")
+        assert BackupIndex(path / "backup").needs_backup(source, destination) is True
+
+
+def test_backup_index_save_merges():
+    with PrepareBackupDir() as path:
+        indexes = []
+        for name in ["first.json", "second.json"]:
+            source = path / name
+            source.write_text("{}")
+            shutil.copy(source, path / "backup" / name)
+            indexes.append((BackupIndex(path / "backup"), source, path / "backup" / name))
+
+        for index, source, destination in indexes:
+            index.record(source, destination)
+            index.save()
+
+        for _, source, destination in indexes:
+            assert BackupIndex(path / "backup").needs_backup(source, destination) is False
+
+
+def test_backup_files_incremental():
+    with PrepareBackupDir() as path:
+        run_path = path / "Run0001"
+        sources = []
+        for index in range(10):
+            sources.append(path / "calibration_{}.json".format(index))
+            sources[-1].write_text("{}".format(index))
+
+        with RM.RunManager(run_path) as John:
+            John.create_run(raise_error=True)
+            assert John.backup_files(sources, incremental=True) == [True] * 10
+            assert (John.backup_directory / "backup_index.json").is_file()
+            assert (John.backup_directory / "calibration_3.json").read_text() == "3"
+
+            sources[3].write_text("33")
+            touch_later(sources[5])
+            assert John.backup_files(sources, incremental=True) == [i in [3, 5] for i in range(10)]
+            assert (John.backup_directory / "calibration_3.json").read_text() == "33"
+
+            touch_later(sources[5])
+            assert John.backup_files(sources, incremental=True, compare_hash=True) == [i == 5 for i in range(10)]  # No hash recorded yet
+            touch_later(sources[5])
+            assert John.backup_files(sources, incremental=True, compare_hash=True) == [False] * 10
+
+            assert John.backup_files(sources[:2]) == [True, True]
+
+
+def test_backup_file_incremental():
+    with PrepareBackupDir() as path:
+        run_path = path / "Run0001"
+        source = path / "calibration.json"
+        source.write_text("{}")
+
+        with RM.RunManager(run_path) as John:
+            John.create_run(raise_error=True)
+            assert John.backup_file(source, incremental=True) is None
+            backup = John.backup_directory / "calibration.json"
+            mtime = backup.stat().st_mtime_ns
+            backup_time = os.path.getmtime(John.backup_directory / "backup_index.json")
+
+            future = John.backup_file(source, incremental=True, background=True)
+            assert future.result() == backup
+            assert backup.stat().st_mtime_ns == mtime
+            assert os.path.getmtime(John.backup_directory / "backup_index.json") >= backup_time
+
+            with John.handle_task("myTask", backup_python_file=False) as Paul:
+                Paul.backup_file(source, incremental=True)
+                assert (Paul.task_path / "calibration.json.bak").read_text() == "{}"
+                assert (Paul.task_path / "backup_index.json").is_file()
+
+
+def test_backup_file_incremental_other_source_with_same_name():
+    with PrepareBackupDir() as path:
+        sources = [path / "a" / "config.json", path / "b" / "config.json"]
+        for source, content in zip(sources, ["{}", "[]"]):
+            source.parent.mkdir()
+            source.write_text(content)
+        stat = sources[0].stat()
+        os.utime(sources[1], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        with RM.RunManager(path / "Run0001") as John:
+            John.create_run(raise_error=True)
+            John.backup_file(sources[0], incremental=True)
+            John.backup_file(sources[1], incremental=True)
+            assert (John.backup_directory / "config.json").read_text() == "[]"
+
+
+def test_backup_file_incremental_concurrent():
+    with PrepareBackupDir() as path:
+        run_path = path / "Run0001"
+        sources = []
+        for index in range(6):
+            sources.append(path / "calibration_{}.json".format(index))
+            sources[-1].write_text("{}".format(index))
+
+        with RM.RunManager(run_path) as John:
+            John.create_run(raise_error=True)
+            futures = [John.backup_file(source, incremental=True, background=True) for source in sources]
+            for future in futures:
+                future.result()
+
+        index = BackupIndex(run_path / "backup")
+        for source in sources:
+            assert index.needs_backup(source, run_path / "backup" / source.name) is False
+
+
+def test_backup_files_duplicate_names():
+    with PrepareBackupDir() as path:
+        sources = [path / "a" / "calibration.json", path / "b" / "calibration.json"]
+        for source in sources:
+            source.parent.mkdir()
+            source.write_text("{}")
+
+        with RM.RunManager(path / "Run0001") as John:
+            John.create_run(raise_error=True)
+            try:
+                John.backup_files(sources)
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except ValueError as e:
+                assert str(e) == "The `sources` must have distinct file names, calibration.json is backed up more than once"
+            assert not (John.backup_directory / "calibration.json").exists()
+
+
+def test_backup_files_bad_types():
+    with PrepareBackupDir() as path:
+        with RM.RunManager(path / "Run0001") as John:
+            John.create_run(raise_error=True)
+            try:
+                John.backup_files(path / "calibration.json")
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except TypeError as e:
+                assert str(e) == "The `sources` must be a list type object, received object of type {} instead".format(
+                    type(path / "calibration.json")
+                )
+
+            try:
+                John.backup_files([], max_workers=2.0)
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except TypeError as e:
+                assert str(e) == "The `max_workers` must be a int type object, received object of type <class 'float'> instead"
+
+            try:
+                John.backup_files(["calibration.json"])
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except TypeError as e:
+                assert str(e) == "The `source` must be a Path type object, received object of type <class 'str'> instead"
+
+            for parameter in ["verify", "incremental", "compare_hash"]:
+                try:
+                    John.backup_files([path], **{parameter: 1})
+                    raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+                except TypeError as e:
+                    assert str(e) == "The `{}` must be a bool type object, received object of type <class 'int'> instead".format(parameter)
+
+            try:
+                John.backup_files([path / "missing.json"])
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except RuntimeError as e:
+                assert str(e) == "The source file does not exist or it is not a file."
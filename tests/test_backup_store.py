@@ -0,0 +1,170 @@
+import gzip
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import lip_pps_run_manager as RM
+from lip_pps_run_manager.backup_store import restore_backup
+from lip_pps_run_manager.backup_store import write_script_backup
+
+testdata_true_false = [(True), (False)]
+
+
+class PrepareStoreDir:
+    def __init__(self):
+        self._path = Path(tempfile.gettempdir()) / "test_backup_store"
+
+    def __enter__(self):
+        if self._path.exists():  # pragma: no cover
+            shutil.rmtree(self._path)
+        self._path.mkdir()
+        return self._path
+
+    def __exit__(self, type, value, traceback):
+        shutil.rmtree(self._path)
+
+
+def test_backup_store_bad_types():
+    try:
+        RM.BackupStore("store")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `path_to_store` must be a Path type object, received object of type <class 'str'>"
+
+    try:
+        RM.BackupStore(Path("store"), compress=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `compress` must be a bool type object, received object of type <class 'int'>"
+
+    store = RM.BackupStore(Path("store"))
+    try:
+        store.add_file("file.txt")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `source` must be a Path type object, received object of type <class 'str'>"
+
+    try:
+        restore_backup("file.manifest.json", Path("file.txt"))
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `manifest_path` must be a Path type object, received object of type <class 'str'>"
+
+    try:
+        restore_backup(Path("file.manifest.json"), "file.txt")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `destination` must be a Path type object, received object of type <class 'str'>"
+
+
+def test_backup_store_repr():
+    store = RM.BackupStore(Path("store"), compress=True)
+    assert repr(store) == "BackupStore({}, compress=True)".format(repr(Path("store")))
+    assert store.path == Path("store")
+    assert store.compress
+
+
+def test_backup_store_missing_source():
+    with PrepareStoreDir() as path:
+        store = RM.BackupStore(path / "store")
+        try:
+            store.add_file(path / "missing.txt")
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except RuntimeError as e:
+            assert str(e) == "The source file does not exist or it is not a file."
+
+
+@pytest.mark.parametrize("compress", testdata_true_false)
+def test_backup_store_deduplicates(compress: bool):
+    with PrepareStoreDir() as path:
+        store = RM.BackupStore(path / "store", compress=compress)
+        first = path / "first.py"
+        second = path / "second.py"
+        other = path / "other.py"
+        first.write_text("print('Hello')\n")
+        second.write_text("print('Hello')\n")
+        other.write_text("print('Bye')\n")
+
+        digest = store.add_file(first)
+        assert store.add_file(second) == digest
+        assert store.add_file(other) != digest
+        assert len([blob for blob in (path / "store" / "objects").rglob("*") if blob.is_file()]) == 2
+
+        blob_path = store.blob_path(digest)
+        assert (blob_path.suffix == ".gz") == compress
+        with store.open_blob(digest) as in_file:
+            assert in_file.read() == b"print('Hello')\n"
+        if compress:
+            assert gzip.decompress(blob_path.read_bytes()) == b"print('Hello')\n"
+
+        assert store.blob_path("0" * 64) is None
+        try:
+            store.open_blob("0" * 64)
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except RuntimeError as e:
+            assert str(e) == "The content {} is not in the backup store {}".format("0" * 64, path / "store")
+
+
+@pytest.mark.parametrize("compress", testdata_true_false)
+def test_backup_store_backup_and_restore(compress: bool):
+    with PrepareStoreDir() as path:
+        store = RM.BackupStore(path / "store", compress=compress)
+        source = path / "script.py"
+        source.write_text("print('Hello')\n")
+        (path / "task").mkdir()
+        manifest_path = path / "task" / "script.py.manifest.json"
+
+        manifest = store.backup_file(source, manifest_path, extra={"task_name": "myTask"})
+        with open(manifest_path, "r", encoding="utf8") as in_file:
+            assert json.load(in_file) == manifest
+        assert manifest["name"] == "script.py"
+        assert manifest["size"] == len("print('Hello')\n")
+        assert manifest["store"] == str(Path("..") / "store")
+        assert manifest["task_name"] == "myTask"
+        assert manifest["version"] == RM.__version__
+
+        source.unlink()
+        restore_backup(manifest_path, path / "restored.py")
+        assert (path / "restored.py").read_text() == "print('Hello')\n"
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_write_script_backup(compression):
+    with PrepareStoreDir() as path:
+        source = path / "script.py"
+        content = "".join("print({})\n".format(index) for index in range(100000))
+        source.write_text(content)
+
+        backup_path = write_script_backup(source, path / "backup.script.py", "# Header\n", compression=compression)
+        if compression is None:
+            assert backup_path == path / "backup.script.py"
+            assert backup_path.read_text() == "# Header\n" + content
+        else:
+            assert backup_path == path / "backup.script.py.gz"
+            assert gzip.decompress(backup_path.read_bytes()).decode("utf8") == "# Header\n" + content
+
+
+def test_write_script_backup_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    with PrepareStoreDir() as path:
+        source = path / "script.py"
+        source.write_text("print('Hello')\n")
+
+        backup_path = write_script_backup(source, path / "backup.script.py", "# Header\n", compression="zstd")
+        assert backup_path == path / "backup.script.py.zst"
+        with zstandard.ZstdDecompressor().stream_reader(open(backup_path, "rb")) as in_file:
+            assert in_file.read() == b"# Header\nprint('Hello')\n"
+
+
+def test_write_script_backup_bad_compression():
+    with PrepareStoreDir() as path:
+        source = path / "script.py"
+        source.write_text("print('Hello')\n")
+        try:
+            write_script_backup(source, path / "backup.script.py", "# Header\n", compression="bzip2")
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except ValueError as e:
+            assert str(e) == "The `compression` must be one of None, 'gzip', 'zstd', received 'bzip2'"
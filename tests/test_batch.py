@@ -0,0 +1,180 @@
+import concurrent.futures
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from test_telegram_reporter_class import SessionReplacement
+
+import lip_pps_run_manager as RM
+from lip_pps_run_manager.batch import find_runs
+from lip_pps_run_manager.run_manager import create_run
+from lip_pps_run_manager.task_report import write_task_report
+
+
+def process_run(task):
+    if task.run_name == "Run0002":
+        raise RuntimeError("The run is corrupted")
+    if task.run_name == "Run0003":
+        time.sleep(30)
+    for _ in task.track(range(10)):
+        pass
+    (task.task_path / "result.txt").write_text(task.run_name)
+
+
+def crash_run(task):
+    if task.run_name == "Run0002":
+        os._exit(1)  # The worker process dies without writing a report
+
+
+class RecordingReporter(RM.TelegramReporter):
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        RecordingReporter.instances.append(self)
+
+
+class PrepareRunsDir:
+    def __init__(self):
+        self._path = Path(tempfile.gettempdir()) / "test_run_batch"
+
+    def __enter__(self):
+        if self._path.exists():  # pragma: no cover
+            shutil.rmtree(self._path)
+        self._path.mkdir()
+        for run_name in ["Run0001", "Run0002", "Run0003"]:
+            create_run(self._path, run_name)
+        (self._path / "RunNotCreated").mkdir()
+        return self._path
+
+    def __exit__(self, type, value, traceback):
+        shutil.rmtree(self._path)
+
+
+def test_find_runs():
+    with PrepareRunsDir() as runs_path:
+        assert find_runs(str(runs_path / "Run*")) == [runs_path / "Run0001", runs_path / "Run0002", runs_path / "Run0003"]
+        assert find_runs(str(runs_path / "Other*")) == []
+
+
+def test_run_batch_bad_types():
+    try:
+        RM.RunBatch(2, process_run)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `task_name` must be a str type object, received object of type <class 'int'>"
+
+    try:
+        RM.RunBatch("myTask", "process_run")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `function` must be a callable type object, received object of type <class 'str'>"
+
+    try:
+        RM.RunBatch("myTask", process_run, backup_python_file=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `backup_python_file` must be a bool type object, received object of type <class 'int'>"
+
+    try:
+        RM.RunBatch("myTask", process_run, telegram_bot_token=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `telegram_bot_token` must be a str type object, received object of type <class 'int'>"
+
+    try:
+        RM.RunBatch("myTask", process_run, telegram_chat_id=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `telegram_chat_id` must be a str type object, received object of type <class 'int'>"
+
+    try:
+        RM.RunBatch("myTask", process_run, rate_limit=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `rate_limit` must be a bool type object, received object of type <class 'int'>"
+
+    batch = RM.RunBatch("myTask", process_run)
+    assert repr(batch) == "RunBatch('myTask', process_run)"
+    assert batch.task_name == "myTask"
+
+    try:
+        batch.run(["Run0001"])
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `runs` must be a list of Path type objects or a str type object, received object of type <class 'list'>"
+
+    try:
+        batch.run([], max_workers=2.0)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `max_workers` must be a int type object or None, received object of type <class 'float'>"
+
+    try:
+        batch.run([], timeout="1")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `timeout` must be a float type object or None, received object of type <class 'str'>"
+
+
+def test_run_batch_processes():
+    with PrepareRunsDir() as runs_path:
+        batch = RM.RunBatch("myTask", process_run, loop_iterations=10)
+        summary = batch.run(str(runs_path / "Run*"), max_workers=2, timeout=1)
+
+        assert summary["task_name"] == "myTask"
+        assert summary["elapsed"] < 30
+        assert summary["counts"] == {"no errors": 1, "there were errors": 1, "timed out": 1}
+        assert sorted(summary["runs"]) == [str(runs_path / run_name) for run_name in ["Run0001", "Run0002", "Run0003"]]
+
+        first_run = summary["runs"][str(runs_path / "Run0001")]
+        assert first_run["status"] == "no errors"
+        assert first_run["report"]["processed_iterations"] == 10
+        assert summary["runs"][str(runs_path / "Run0002")]["report"]["exception_type"] == "RuntimeError"
+        assert summary["runs"][str(runs_path / "Run0003")]["status"] == "timed out"
+
+        assert (runs_path / "Run0001" / "myTask" / "result.txt").read_text() == "Run0001"
+        assert (runs_path / "Run0001" / "myTask" / "backup.test_batch.py").is_file()
+        assert not (runs_path / "RunNotCreated" / "myTask").exists()
+
+
+def test_run_batch_worker_dies():
+    with PrepareRunsDir() as runs_path:
+        (runs_path / "Run0002" / "myTask").mkdir()
+        write_task_report(runs_path / "Run0002" / "myTask", {"status": "no errors", "start_time": "2020-01-01T00:00:00"})
+
+        batch = RM.RunBatch("myTask", crash_run, backup_python_file=False)
+        summary = batch.run(str(runs_path / "Run*"), max_workers=1)
+
+        assert summary["counts"] == {"no errors": 2, "there were errors": 1}
+        assert summary["runs"][str(runs_path / "Run0002")] == {"status": "there were errors", "report": None}
+        assert summary["runs"][str(runs_path / "Run0003")]["status"] == "no errors"  # Processed by a new pool
+
+
+def test_run_batch_with_executor():
+    with PrepareRunsDir() as runs_path:
+        batch = RM.RunBatch("myTask", process_run, backup_python_file=False)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            summary = batch.run([runs_path / "Run0001", runs_path / "Run0002"], executor=executor)
+        assert summary["counts"] == {"no errors": 1, "there were errors": 1}
+        assert not (runs_path / "Run0001" / "myTask" / "backup.test_batch.py").exists()
+
+
+@patch('lip_pps_run_manager.telegram_reporter.TelegramReporter', new=RecordingReporter)
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_run_batch_single_telegram_message():
+    with PrepareRunsDir() as runs_path:
+        batch = RM.RunBatch("myTask", process_run, telegram_bot_token="bot_token", telegram_chat_id="chat_id", rate_limit=False)
+        summary = batch.run([runs_path / "Run0001", runs_path / "Run0002"], max_workers=1)
+        assert summary["counts"] == {"no errors": 1, "there were errors": 1}
+
+        reporter = RecordingReporter.instances[-1]
+        assert "editMessageText" in reporter._session["url"]
+        text = reporter._session["data"]["text"]
+        assert "Processing task myTask of 2 runs" in text
+        assert "Progress: 100 % (2/2)" in text
+        assert "     no errors: 1\n" in text
+        assert "     there were errors: 1\n" in text
@@ -0,0 +1,107 @@
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import lip_pps_run_manager as RM
+from lip_pps_run_manager.run_manager import create_run
+
+
+class PrepareRunsDir:
+    def __init__(self, with_catalog: bool = True):
+        self._path = Path(tempfile.gettempdir()) / "test_run_catalog"
+        self._with_catalog = with_catalog
+
+    def __enter__(self):
+        if self._path.exists():  # pragma: no cover
+            shutil.rmtree(self._path)
+        self._path.mkdir()
+        if self._with_catalog:
+            with RM.RunCatalog(self._path) as catalog:
+                catalog.rebuild()
+        return self._path
+
+    def __exit__(self, type, value, traceback):
+        shutil.rmtree(self._path)
+
+
+def run_task(run_path: Path, task_name: str, fail: bool = False, complete: bool = True):
+    try:
+        with RM.TaskManager(run_path, task_name, loop_iterations=2) as Tobias:
+            Tobias.loop_tick()
+            if complete:
+                Tobias.loop_tick()
+            if fail:
+                raise RuntimeError("The task failed")
+    except RuntimeError:
+        pass
+
+
+def test_run_catalog_bad_type():
+    try:
+        RM.RunCatalog("runs")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `path_to_directory` must be a Path type object, received object of type <class 'str'>"
+
+
+def test_run_catalog_repr():
+    assert repr(RM.RunCatalog(Path("runs"))) == "RunCatalog({})".format(repr(Path("runs")))
+
+
+def test_run_catalog_is_updated_incrementally():
+    with PrepareRunsDir() as runs_path:
+        for run_name in ["Run0001", "Run0002", "Run0003"]:
+            create_run(runs_path, run_name)
+        run_task(runs_path / "Run0001", "myTask")
+        run_task(runs_path / "Run0002", "myTask", fail=True)
+        run_task(runs_path / "Run0003", "myTask", complete=False)
+        run_task(runs_path / "Run0003", "otherTask")
+
+        with RM.RunCatalog(runs_path) as catalog:
+            assert catalog.runs() == ["Run0001", "Run0002", "Run0003"]
+            assert catalog.completed_runs("myTask") == ["Run0001"]
+            assert catalog.successful_runs("myTask") == ["Run0001", "Run0003"]
+            assert catalog.failed_runs("myTask") == ["Run0002"]
+            assert catalog.missing_runs("myTask") == []
+            assert catalog.missing_runs("otherTask") == ["Run0001", "Run0002"]
+            assert catalog.task_status("Run0003", "myTask") == "incomplete"
+            assert catalog.task_status("Run0003", "unknownTask") is None
+
+
+def test_run_catalog_rebuild():
+    with PrepareRunsDir(with_catalog=False) as runs_path:
+        create_run(runs_path, "Run0001")
+        create_run(runs_path, "Run0002")
+        (runs_path / "NotARun").mkdir()
+        run_task(runs_path / "Run0001", "myTask")
+        run_task(runs_path / "Run0002", "myTask", fail=True)
+        (runs_path / "Run0002" / "emptyTask").mkdir()
+
+        assert not (runs_path / "run_catalog.sqlite").exists()  # The catalog is only created on request
+
+        with RM.RunCatalog(runs_path) as catalog:
+            catalog.rebuild()
+            assert catalog.path == runs_path / "run_catalog.sqlite"
+            assert catalog.runs() == ["Run0001", "Run0002"]
+            assert catalog.completed_runs("myTask") == ["Run0001"]
+            assert catalog.failed_runs("myTask") == ["Run0002"]
+            assert catalog.missing_runs("emptyTask") == ["Run0001", "Run0002"]
+
+            catalog.update_task("Run0003", "myTask", "no errors")  # A run which is not on disk gets a row too
+            assert catalog.completed_runs("myTask") == ["Run0001", "Run0003"]
+
+
+def test_run_catalog_broken_file_warns():
+    with PrepareRunsDir(with_catalog=False) as runs_path:
+        with open(runs_path / "run_catalog.sqlite", "w", encoding="utf8") as out_file:
+            out_file.write("This is not a database" * 100)
+
+        with pytest.warns(RuntimeWarning, match="Could not update the run catalog"):
+            create_run(runs_path, "Run0001")
+
+        assert (runs_path / "Run0001" / "run_info.txt").is_file()
+        with pytest.raises(sqlite3.DatabaseError):
+            RM.RunCatalog(runs_path).runs()
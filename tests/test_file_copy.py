@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from lip_pps_run_manager import file_copy
+from lip_pps_run_manager.file_copy import copy_file
+
+
+class PrepareCopyDir:
+    def __init__(self):
+        self._path = Path(tempfile.gettempdir()) / "test_file_copy"
+
+    def __enter__(self):
+        if self._path.exists():  # pragma: no cover
+            shutil.rmtree(self._path)
+        self._path.mkdir()
+        source = self._path / "data.bin"
+        source.write_bytes(os.urandom(3 * 1024 * 1024 + 7))
+        return source
+
+    def __exit__(self, type, value, traceback):
+        shutil.rmtree(self._path)
+
+
+def unsupported_method(in_file, out_file, total, progress):
+    out_file.write(b"partial")
+    raise OSError("Operation not supported")
+
+
+@pytest.mark.parametrize(
+    "methods",
+    [
+        file_copy._copy_methods,
+        [unsupported_method, file_copy._copy_file_range],
+        [unsupported_method, file_copy._buffered_copy],
+    ],
+)
+def test_copy_file(methods):
+    with PrepareCopyDir() as source:
+        destination = source.with_name("copy.bin")
+        destination.write_bytes(b"old content which is longer than nothing")
+        os.chmod(source, 0o640)
+        calls = []
+
+        with patch.object(file_copy, "_copy_methods", new=methods), patch.object(file_copy, "_buffer_size", new=1024 * 1024):
+            copy_file(source, destination, progress=lambda copied, total: calls.append((copied, total)), verify=True)
+
+        assert destination.read_bytes() == source.read_bytes()
+        assert destination.stat().st_mode & 0o777 == 0o640
+        assert calls[-1] == (source.stat().st_size, source.stat().st_size)
+        assert all(earlier[0] <= later[0] for earlier, later in zip(calls, calls[1:]))
+
+
+def test_copy_file_last_method_fails():
+    with PrepareCopyDir() as source:
+        with patch.object(file_copy, "_copy_methods", new=[unsupported_method]):
+            try:
+                copy_file(source, source.with_name("copy.bin"))
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except OSError as e:
+                assert str(e) == "Operation not supported"
+
+
+def test_copy_file_verify_mismatch():
+    with PrepareCopyDir() as source:
+        destination = source.with_name("copy.bin")
+        with patch.object(file_copy, "_hash_file", side_effect=["source digest", "copy digest"]):
+            try:
+                copy_file(source, destination, verify=True)
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except RuntimeError as e:
+                assert str(e) == "The copy of {} to {} is corrupted, the checksums do not match".format(source, destination)
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import lip_pps_run_manager as RM
+
+import_time_budget_us = 50000  # Generous, importing the package itself takes about 1 ms
+
+
+def import_times(statement: str) -> dict:
+    """Import in a new interpreter with -X importtime, returning the cumulative import time, in microseconds, of each module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split(":", 1)[1].split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_package_is_fast():
+    times = import_times("import lip_pps_run_manager")
+    assert times["lip_pps_run_manager"] < import_time_budget_us
+    for heavy_module in ["requests", "humanize", "asyncio", "pyvisa", "lip_pps_run_manager.run_manager"]:
+        assert heavy_module not in times
+
+
+def test_import_instruments_does_not_import_pyvisa():
+    times = import_times("import lip_pps_run_manager.instruments")
+    assert "lip_pps_run_manager.instruments" in times
+    assert "pyvisa" not in times
+
+
+def test_import_run_manager_does_not_import_telegram():
+    times = import_times("import lip_pps_run_manager.run_manager")
+    for heavy_module in ["requests", "humanize", "asyncio"]:
+        assert heavy_module not in times
+
+
+def test_lazy_attributes():
+    assert sorted(RM.__all__) == sorted(RM._lazy_attributes)
+    assert set(RM.__all__) <= set(dir(RM))
+    assert RM.TaskGraph.__name__ == "TaskGraph"
+    assert "TaskGraph" in vars(RM)
+
+    try:
+        RM.NotAClass
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except AttributeError as e:
+        assert str(e) == "module 'lip_pps_run_manager' has no attribute 'NotAClass'"
@@ -1,5 +1,130 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from test_scanner import PrepareRunsDir
+from test_scanner import make_runs
+
 from lip_pps_run_manager.cli import main
+from lip_pps_run_manager.run_manager import create_run
 
 
 def test_main():
     main([])
+
+
+def test_main_rebuild_catalog(capsys):
+    runs_path = Path(tempfile.gettempdir()) / "test_cli_catalog"
+    if runs_path.exists():  # pragma: no cover
+        shutil.rmtree(runs_path)
+    runs_path.mkdir()
+    try:
+        create_run(runs_path, "Run0001")
+        assert main(["rebuild-catalog", str(runs_path)]) == 0
+        assert "Indexed 1 runs" in capsys.readouterr().out
+        assert (runs_path / "run_catalog.sqlite").is_file()
+    finally:
+        shutil.rmtree(runs_path)
+
+
+def test_main_status(capsys):
+    with PrepareRunsDir() as runs_path:
+        make_runs(runs_path)
+
+        assert main(["status", str(runs_path)]) == 0
+        out = capsys.readouterr().out
+        assert "Run0003 (2 tasks)" in out
+        assert "there were errors" in out
+        assert "(RuntimeError)" in out
+        assert "3 runs" in out
+        assert not (runs_path / "run_scan_cache.json").exists()
+
+        assert main(["status", str(runs_path), "--json"]) == 0
+        runs = json.loads(capsys.readouterr().out)
+        assert sorted(runs) == ["Run0001", "Run0002", "Run0003"]
+        assert runs["Run0001"]["tasks"]["myTask"]["status"] == "no errors"
+        assert runs["Run0001"]["tasks"]["myTask"]["duration"] >= 0
+
+
+def test_main_tasks(capsys):
+    with PrepareRunsDir() as runs_path:
+        make_runs(runs_path)
+
+        assert main(["tasks", str(runs_path / "Run0003")]) == 0
+        out = capsys.readouterr().out
+        assert "Run0003 (2 tasks)" in out
+        assert "incomplete" in out
+        assert "it/s" in out
+
+        assert main(["tasks", str(runs_path / "Run0003"), "--json"]) == 0
+        run = json.loads(capsys.readouterr().out)
+        assert sorted(run["tasks"]) == ["myTask", "otherTask"]
+
+        assert main(["tasks", str(runs_path / "Run0004")]) == 1
+        assert "is not a run" in capsys.readouterr().out
+
+
+def test_main_failed(capsys):
+    with PrepareRunsDir() as runs_path:
+        make_runs(runs_path)
+
+        assert main(["failed", str(runs_path)]) == 0
+        out = capsys.readouterr().out
+        assert "Run0002:" in out
+        assert "1 failed tasks" in out
+
+        assert main(["failed", str(runs_path), "--json"]) == 0
+        failed_tasks = json.loads(capsys.readouterr().out)
+        assert [(info["run_name"], info["task_name"]) for info in failed_tasks] == [("Run0002", "myTask")]
+        assert failed_tasks[0]["exception_type"] == "RuntimeError"
+
+
+def test_main_batch(capsys):
+    with PrepareRunsDir() as runs_path:
+        create_run(runs_path, "Run0001")
+        create_run(runs_path, "Run0002")
+        script = runs_path / "analysis.py"
+        script.write_text(
+            "def analyse(task):\n"
+            "    if task.run_name == 'Run0002':\n"
+            "        raise RuntimeError('The run is corrupted')\n"
+            "    (task.task_path / 'result.txt').write_text('done')\n"
+        )
+
+        assert main(["batch", "{}:analyse".format(script), "analyse", str(runs_path / "Run0001")]) == 0
+        out = capsys.readouterr().out
+        assert "no errors" in out
+        assert "1 runs processed in" in out
+        assert (runs_path / "Run0001" / "analyse" / "backup.analysis.py").is_file()
+
+        assert main(["batch", "{}:analyse".format(script), "analyse", str(runs_path / "Run*"), "--max-workers", "2", "--json"]) == 1
+        summary = json.loads(capsys.readouterr().out)
+        assert summary["counts"] == {"no errors": 1, "there were errors": 1}
+
+
+def test_main_status_cache(capsys, monkeypatch):
+    with PrepareRunsDir() as runs_path:
+        make_runs(runs_path)
+        cache_home = runs_path.parent / "test_cli_cache_home"
+        if cache_home.exists():  # pragma: no cover
+            shutil.rmtree(cache_home)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+        try:
+            assert main(["status", str(runs_path), "--cache"]) == 0
+            assert "3 runs" in capsys.readouterr().out
+            assert not (runs_path / "run_scan_cache.json").exists()
+            assert len(list((cache_home / "lip_pps_run_manager").glob("*.run_scan_cache.json"))) == 1
+
+            assert main(["failed", str(runs_path), "--cache"]) == 0
+            assert "1 failed tasks" in capsys.readouterr().out
+            assert len(list((cache_home / "lip_pps_run_manager").glob("*.run_scan_cache.json"))) == 1
+        finally:
+            shutil.rmtree(cache_home)
+
+        cache_home.write_text("Not a directory")  # The cache can not be written
+        try:
+            assert main(["status", str(runs_path), "--cache"]) == 0
+            assert "3 runs" in capsys.readouterr().out
+        finally:
+            cache_home.unlink()
@@ -0,0 +1,103 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import lip_pps_run_manager as RM
+
+
+def prepare_outbox_path():
+    path = Path(tempfile.gettempdir()) / "test_telegram_outbox.jsonl"
+    if path.exists():  # pragma: no cover
+        path.unlink()
+    return path
+
+
+def test_outbox_repr():
+    path = prepare_outbox_path()
+    outbox = RM.TelegramOutbox(path, fsync_interval=2)
+
+    assert outbox.path == path
+    assert repr(outbox) == "TelegramOutbox({}, fsync_interval=2.0)".format(repr(path))
+
+
+def test_fail_outbox():
+    try:
+        RM.TelegramOutbox("outbox.jsonl")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `path` must be a Path type object, received object of type <class 'str'>"
+
+    try:
+        RM.TelegramOutbox(prepare_outbox_path(), fsync_interval="1")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `fsync_interval` must be a float type object, received object of type <class 'str'>"
+
+
+def test_outbox_pending_compaction():
+    path = prepare_outbox_path()
+    outbox = RM.TelegramOutbox(path, fsync_interval=0)
+
+    assert outbox.pending() == []
+
+    status_key = outbox.add_message("Status")
+    edit_1 = outbox.add_edit("Status 1", message_key=status_key)
+    reply_key = outbox.add_message("Warning", reply_to_key=status_key)
+    edit_2 = outbox.add_edit("Old 1", message_id="123")
+    edit_3 = outbox.add_edit("Old 2", message_id="123")
+    edit_4 = outbox.add_edit("Status 2", message_key=status_key)
+    outbox.close()
+
+    pending = outbox.pending()
+    assert [record["key"] for record in pending] == [status_key, reply_key, edit_3]
+    assert pending[0]["text"] == "Status 2"
+    assert pending[0]["superseded"] == [edit_1, edit_4]
+    assert pending[1]["message_key"] == status_key
+    assert pending[2]["text"] == "Old 2"
+    assert pending[2]["superseded"] == [edit_2]
+
+    for key in [status_key, edit_1, edit_4]:
+        outbox.mark_delivered(key, "456")
+    pending = outbox.pending()
+    assert [record["key"] for record in pending] == [reply_key, edit_3]
+    assert pending[0]["message_id"] == "456"
+    assert pending[0]["message_key"] is None
+
+    outbox.compact()
+    assert [record["key"] for record in outbox.pending()] == [reply_key, edit_3]
+    assert outbox.pending()[1]["superseded"] == [edit_2]
+
+    with open(path, "a", encoding="utf-8") as out_file:
+        out_file.write('{"key": "partially written')  # As if the process crashed while appending
+    assert len(outbox.pending()) == 2
+
+    outbox.mark_delivered(reply_key, "789")
+    outbox.mark_delivered(edit_3, "123")
+    outbox.mark_delivered(edit_2, "123")
+    outbox.compact()
+    assert not path.exists()
+
+
+def test_outbox_compact_does_not_lose_appends():
+    path = prepare_outbox_path()
+    outbox = RM.TelegramOutbox(path, fsync_interval=0)
+    first_key = outbox.add_message("First")
+    appended = []
+    compact_records = outbox._pending
+
+    def append_while_compacting(records, delivered):
+        appender = threading.Thread(target=lambda: appended.append(outbox.add_message("Second")))
+        appender.start()
+        appender.join(0.1)  # The append waits for the compaction to finish
+        return compact_records(records, delivered)
+
+    with patch.object(outbox, "_pending", new=append_while_compacting):
+        outbox.compact()
+    while not appended:
+        time.sleep(0.01)
+
+    assert [record["key"] for record in outbox.pending()] == [first_key, appended[0]]
+    outbox.close()
+    path.unlink()
@@ -0,0 +1,180 @@
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import lip_pps_run_manager as RM
+
+
+def add_to_counter(counter: RM.SharedProgressCounter, count: int):
+    for _ in range(count):
+        counter.add()
+    return counter.value
+
+
+def test_shared_progress_counter():
+    counter = RM.SharedProgressCounter(slots=4)
+    try:
+        assert repr(counter) == "SharedProgressCounter(slots=4)"
+        assert counter.value == 0
+        counter.add()
+        counter.add(9)
+        assert counter.value == 10
+    finally:
+        counter.unlink()
+
+
+def test_shared_progress_counter_bad_slots():
+    try:
+        RM.SharedProgressCounter(slots=1.5)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `slots` must be a int type object, received object of type <class 'float'>"
+
+    try:
+        RM.SharedProgressCounter(slots=0)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except ValueError as e:
+        assert str(e) == "The `slots` must be positive, received 0"
+
+
+def test_shared_progress_counter_pickle():
+    counter = RM.SharedProgressCounter(slots=4)
+    try:
+        copy = pickle.loads(pickle.dumps(counter))
+        assert copy.name == counter.name
+        copy.add(5)
+        counter.add(2)
+        assert counter.value == 7
+        assert copy.value == 7
+        copy.unlink()  # Only detaches, since the copy did not create the shared memory
+        assert counter.value == 7
+    finally:
+        counter.unlink()
+
+
+def test_shared_progress_counter_threads():
+    counter = RM.SharedProgressCounter(slots=8)
+    try:
+        threads = [threading.Thread(target=add_to_counter, args=(counter, 10000)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counter.value == 40000
+    finally:
+        counter.unlink()
+
+
+def test_shared_progress_counter_full():
+    counter = RM.SharedProgressCounter(slots=1)
+    try:
+        counter.add()
+        thread_errors = []
+
+        def add_from_thread():
+            try:
+                counter.add()
+            except RuntimeError as e:
+                thread_errors.append(str(e))
+
+        thread = threading.Thread(target=add_from_thread)
+        thread.start()
+        thread.join()
+        assert thread_errors == ["All the 1 slots of the SharedProgressCounter are taken, use more slots"]
+    finally:
+        counter.unlink()
+
+
+def test_shared_progress_counter_processes():
+    counter = RM.SharedProgressCounter(slots=16)
+    try:
+        with ProcessPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(add_to_counter, [counter] * 6, [1000] * 6))
+        assert counter.value == 6000
+        assert max(results) <= 6000
+    finally:
+        counter.unlink()
+
+
+@pytest.mark.parametrize("slots", [2, 32])
+def test_shared_progress_counter_unlink_twice(slots):
+    counter = RM.SharedProgressCounter(slots=slots)
+    counter.unlink()
+    counter.unlink()
+
+
+def test_linear_estimator():
+    estimator = RM.LinearEstimator()
+    assert repr(estimator) == "LinearEstimator()"
+    assert estimator.rate is None
+    assert estimator.remaining_time(0, 100) is None
+
+    estimator.add_sample(10.0, 0)
+    assert estimator.rate is None
+    estimator.add_sample(20.0, 10)
+    estimator.add_sample(30.0, 60)
+    assert estimator.rate == 3.0
+    assert estimator.remaining_time(60, 120) == 20.0
+    assert estimator.remaining_time(130, 120) == 0.0
+
+
+def test_sliding_window_estimator_forgets_slow_start():
+    estimator = RM.SlidingWindowEstimator(window=3)
+    assert repr(estimator) == "SlidingWindowEstimator(window=3)"
+    assert estimator.rate is None
+
+    estimator.add_sample(0.0, 0)
+    estimator.add_sample(100.0, 10)  # Slow warm-up
+    assert estimator.rate == 0.1
+    estimator.add_sample(110.0, 110)
+    estimator.add_sample(120.0, 210)
+    assert estimator.rate == 10.0
+    assert estimator.remaining_time(210, 310) == 10.0
+
+
+def test_sliding_window_estimator_bad_window():
+    try:
+        RM.SlidingWindowEstimator(window=2.0)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `window` must be a int type object, received object of type <class 'float'>"
+
+    try:
+        RM.SlidingWindowEstimator(window=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except ValueError as e:
+        assert str(e) == "The `window` must be at least 2, received 1"
+
+
+def test_ewma_estimator():
+    estimator = RM.EWMAEstimator(half_life=10)
+    assert repr(estimator) == "EWMAEstimator(half_life=10.0)"
+    assert estimator.rate is None
+
+    estimator.add_sample(0.0, 0)
+    estimator.add_sample(0.0, 5)  # No time elapsed, ignored
+    assert estimator.rate is None
+    estimator.add_sample(10.0, 10)
+    assert estimator.rate == 1.0
+    estimator.add_sample(20.0, 110)  # One half life later, the new rate of 10 it/s has half the weight
+    assert estimator.rate == pytest.approx(5.5)
+    assert estimator.remaining_time(110, 121) == pytest.approx(2.0)
+
+    estimator.add_sample(30.0, 110)  # Stalled
+    assert estimator.rate == pytest.approx(2.75)
+
+
+def test_ewma_estimator_bad_half_life():
+    try:
+        RM.EWMAEstimator(half_life="60")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `half_life` must be a float type object, received object of type <class 'str'>"
+
+    try:
+        RM.EWMAEstimator(half_life=0)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except ValueError as e:
+        assert str(e) == "The `half_life` must be positive, received 0"
@@ -0,0 +1,94 @@
+import tempfile
+import time
+from pathlib import Path
+
+import lip_pps_run_manager as RM
+import lip_pps_run_manager.rate_limiter as RL
+
+
+def test_rate_limiter_repr():
+    limiter = RM.RateLimiter(chat_rate=2, chat_burst=3, global_rate=20, global_burst=25)
+
+    assert repr(limiter) == "RateLimiter(chat_rate=2.0, chat_burst=3.0, global_rate=20.0, global_burst=25.0, lock_file=None)"
+
+
+def test_fail_rate_limiter():
+    try:
+        RM.RateLimiter(chat_rate="1")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `chat_rate` must be a float type object, received object of type <class 'str'>"
+
+    try:
+        RM.RateLimiter(global_burst=0)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except ValueError as e:
+        assert str(e) == "The `global_burst` must be positive, received 0"
+
+    try:
+        RM.RateLimiter(lock_file="bot.lock")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `lock_file` must be a Path type object or None, received object of type <class 'str'>"
+
+    try:
+        RM.RateLimiter().reserve(1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `chat_id` must be a str type object, received object of type <class 'int'>"
+
+
+def test_rate_limiter_chat_burst():
+    limiter = RM.RateLimiter(chat_rate=10, chat_burst=2)
+
+    assert limiter.reserve("chat") == 0
+    assert limiter.reserve("chat") == 0
+    wait = limiter.reserve("chat")
+    assert wait > 0 and wait <= 0.1
+    assert limiter.reserve("other_chat") == 0  # Each chat has its own budget
+
+    time.sleep(wait)
+    assert limiter.reserve("chat") == 0
+
+
+def test_rate_limiter_global_budget():
+    limiter = RM.RateLimiter(chat_rate=10, chat_burst=10, global_rate=10, global_burst=2)
+
+    assert limiter.reserve("chat_1") == 0
+    assert limiter.reserve("chat_2") == 0
+    assert limiter.reserve("chat_3") > 0
+
+    start = time.monotonic()
+    limiter.acquire("chat_3")
+    assert time.monotonic() - start > 0.05
+
+
+def test_rate_limiter_lock_file():
+    lock_file = Path(tempfile.gettempdir()) / "test_rate_limiter.lock"
+    if lock_file.exists():  # pragma: no cover
+        lock_file.unlink()
+
+    limiter_1 = RM.RateLimiter(chat_rate=1, chat_burst=1, lock_file=lock_file)
+    limiter_2 = RM.RateLimiter(chat_rate=1, chat_burst=1, lock_file=lock_file)
+
+    assert limiter_1.reserve("chat") == 0
+    assert limiter_2.reserve("chat") > 0  # The budget is shared through the lock file
+    assert lock_file.is_file()
+
+    lock_file.unlink()
+
+
+def test_shared_rate_limiter():
+    limiter = RL.get_shared_rate_limiter("test_shared_bot_token")
+
+    assert RL.get_shared_rate_limiter("test_shared_bot_token") is limiter
+
+    new_limiter = RM.RateLimiter(chat_rate=5)
+    RL.set_shared_rate_limiter("test_shared_bot_token", new_limiter)
+    assert RL.get_shared_rate_limiter("test_shared_bot_token") is new_limiter
+
+    try:
+        RL.set_shared_rate_limiter("test_shared_bot_token", None)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `rate_limiter` must be a RateLimiter type object, received object of type <class 'NoneType'>"
@@ -0,0 +1,81 @@
+import time
+
+import lip_pps_run_manager as RM
+
+
+def test_retry_policy_repr():
+    policy = RM.RetryPolicy(max_retries=5, base_delay=1, max_delay=10)
+
+    assert policy.max_retries == 5
+    assert repr(policy) == "RetryPolicy(max_retries=5, base_delay=1.0, max_delay=10.0)"
+
+
+def test_fail_retry_policy():
+    try:
+        RM.RetryPolicy(max_retries=1.5)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `max_retries` must be a int type object, received object of type <class 'float'>"
+
+    try:
+        RM.RetryPolicy(base_delay="1")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `base_delay` must be a float type object, received object of type <class 'str'>"
+
+    try:
+        RM.RetryPolicy(max_delay=None)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `max_delay` must be a float type object, received object of type <class 'NoneType'>"
+
+
+def test_retry_policy_delay():
+    policy = RM.RetryPolicy(base_delay=1, max_delay=10)
+
+    for attempt, expected in [(0, 1), (1, 2), (2, 4), (3, 8), (4, 10), (10, 10)]:
+        delay = policy.delay(attempt)
+        assert delay >= expected / 2 and delay <= expected
+
+    assert policy.delay(0, retry_after=4) == 4
+    assert policy.delay(0, retry_after=42) == 10  # Capped, so that telegram can not stall the reporter for long
+
+
+def test_circuit_breaker():
+    breaker = RM.CircuitBreaker(failure_threshold=2, cool_down=0.05)
+    assert repr(breaker) == "CircuitBreaker(failure_threshold=2, cool_down=0.05)"
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.remaining_cool_down == 0
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+    assert breaker.remaining_cool_down > 0
+
+    time.sleep(0.06)
+    assert breaker.allow()  # A single trial is let through
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_fail_circuit_breaker():
+    try:
+        RM.CircuitBreaker(failure_threshold="3")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `failure_threshold` must be a int type object, received object of type <class 'str'>"
+
+    try:
+        RM.CircuitBreaker(cool_down=None)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `cool_down` must be a float type object, received object of type <class 'NoneType'>"
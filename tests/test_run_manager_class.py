@@ -1,14 +1,48 @@
+import asyncio
 import datetime
+import json
 import shutil
 import tempfile
+from concurrent.futures import Future
 from pathlib import Path
 from unittest.mock import patch
 
+import pytest
 from test_telegram_reporter_class import SessionReplacement
 
 import lip_pps_run_manager as RM
 
 
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_async_with_run_manager():
+    tmpdir = tempfile.gettempdir()
+    run_name = "Run0001"
+    runPath = Path(tmpdir) / run_name
+    ensure_clean(runPath)
+
+    async def process_run():
+        async with RM.RunManager(runPath, telegram_bot_token="async_bot_token", telegram_chat_id="chat_id", rate_limit=False) as John:
+            John.create_run()
+            reporter = John._telegram_reporter
+            assert isinstance(reporter, RM.AsyncTelegramReporter)
+            assert isinstance(John._status_message_id, Future)
+
+            async with John.handle_task("myTask", loop_iterations=2) as Paul:
+                assert Paul._telegram_reporter is reporter
+                for _ in range(2):
+                    await asyncio.sleep(0)  # Instrument I/O would go here
+                    Paul.loop_tick()
+            assert (Paul.task_path / "task_report.txt").is_file()
+        return reporter
+
+    reporter = asyncio.run(process_run())
+
+    assert len(reporter._submitted) == 0
+    assert reporter._session["data"]["text"] == "✔️✔️ Successfully Finished processing Run {} ✔️✔️".format(run_name)
+
+    ensure_clean(runPath)
+
+
 def ensure_clean(path: Path):  # pragma: no cover
     if path.exists() and path.is_dir():
         shutil.rmtree(path)
@@ -247,6 +281,22 @@ def test_init_bad_type_rate_limit():
         assert str(e) == "The `rate_limit` must be a bool type object, received object of type <class 'int'>"
 
 
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_init_bad_type_backup_store():
+    tmpdir = tempfile.gettempdir()
+    run_name = "Run0001"
+    runPath = Path(tmpdir) / run_name
+    ensure_clean(runPath)
+
+    try:
+        RM.RunManager(runPath, backup_store=runPath / "backup_store")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `backup_store` must be a BackupStore type object or None, received object of type {}".format(
+            type(runPath / "backup_store")
+        )
+
+
 @patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
 def test_repr_no_bot():
     tmpdir = tempfile.gettempdir()
@@ -1385,6 +1435,57 @@ def test_copy_file_to_destination_is_file_no_overwrite():
     source.unlink()
 
 
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_copy_file_to_bad_type_verify_background():
+    tmpdir = tempfile.gettempdir()
+    run_name = "Run0001"
+    runPath = Path(tmpdir) / run_name
+    ensure_clean(runPath)
+
+    source = Path(tmpdir) / "test_in_file.txt"
+    destination = runPath / "copied_file.txt"
+
+    with RM.RunManager(runPath) as John:
+        John.create_run(raise_error=True)
+        try:
+            John.copy_file_to(source, destination, verify=1)
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except TypeError as e:
+            assert str(e) == "The `verify` must be a bool type object, received object of type <class 'int'> instead"
+
+        try:
+            John.copy_file_to(source, destination, background=1)
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except TypeError as e:
+            assert str(e) == "The `background` must be a bool type object, received object of type <class 'int'> instead"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_copy_file_to_background():
+    tmpdir = tempfile.gettempdir()
+    run_name = "Run0001"
+    runPath = Path(tmpdir) / run_name
+    ensure_clean(runPath)
+
+    source = Path(tmpdir) / "test_in_file.txt"
+    with open(source, "w") as file:
+        file.write("Hello!\n")
+
+    with RM.RunManager(runPath) as John:
+        John.create_run(raise_error=True)
+        future = John.copy_file_to(source, runPath, verify=True, background=True)
+        assert isinstance(future, Future)
+        assert future.result() == runPath / source.name
+        assert (runPath / source.name).read_text() == "Hello!\n"
+
+        future = John.backup_file(source, background=True)
+    assert future.done()  # The background copies are waited for at the end of the run
+    assert (John.backup_directory / source.name).read_text() == "Hello!\n"
+    assert John._copy_executor is None
+
+    source.unlink()
+
+
 @patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
 def test_copy_file_to_bad_type_source():
     tmpdir = tempfile.gettempdir()
@@ -1532,6 +1633,92 @@ def test_backup_file():
     source.unlink()
 
 
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_backup_file_backup_store():
+    tmpdir = tempfile.gettempdir()
+    run_name = "Run0001"
+    runPath = Path(tmpdir) / run_name
+    ensure_clean(runPath)
+
+    source = Path(tmpdir) / "test_in_file.txt"
+    with open(source, "w") as file:
+        file.write("Hello!\n")
+
+    store = RM.BackupStore(runPath / "backup_store")
+    with RM.RunManager(runPath, backup_store=store) as John:
+        assert repr(John) == "RunManager({}, backup_store={})".format(repr(runPath), repr(store))
+        John.create_run(raise_error=True)
+
+        John.backup_file(source)
+        John.backup_file(source)
+
+        assert not (John.backup_directory / source.name).exists()
+        manifest_path = John.backup_directory / (source.name + ".manifest.json")
+        assert manifest_path.is_file()
+        with store.open_blob(json.loads(manifest_path.read_text())["sha256"]) as in_file:
+            assert in_file.read() == b"Hello!\n"
+
+        with John.handle_task("myTask", backup_python_file=False) as Paul:
+            assert Paul._backup_store is store
+            Paul.backup_file(source)
+            assert (Paul.task_path / (source.name + ".bak.manifest.json")).is_file()
+            assert not (Paul.task_path / (source.name + ".bak")).exists()
+
+        blobs = [blob for blob in (runPath / "backup_store").rglob("*") if blob.is_file()]
+        assert len(blobs) == 1
+
+    source.unlink()
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_backup_file_backup_store_options():
+    tmpdir = tempfile.gettempdir()
+    run_name = "Run0001"
+    runPath = Path(tmpdir) / run_name
+    ensure_clean(runPath)
+
+    source = Path(tmpdir) / "test_in_file.txt"
+    with open(source, "w") as file:
+        file.write("Hello!\n")
+
+    store = RM.BackupStore(runPath / "backup_store")
+    with RM.RunManager(runPath, backup_store=store) as John:
+        John.create_run(raise_error=True)
+        manifest_path = John.backup_directory / (source.name + ".manifest.json")
+
+        future = John.backup_file(source, background=True)
+        assert future.result() == manifest_path
+        assert not (John.backup_directory / source.name).exists()
+
+        assert John.backup_file(source, verify=True) is None
+        with store.open_blob(json.loads(manifest_path.read_text())["sha256"]) as in_file:
+            assert in_file.read() == b"Hello!\n"
+
+        John.backup_file(source, incremental=True)
+        created = json.loads(manifest_path.read_text())["created"]
+        assert John.backup_file(source, incremental=True, background=True).result() == manifest_path
+        assert json.loads(manifest_path.read_text())["created"] == created  # Skipped, the file did not change
+        assert John.backup_files([source], incremental=True) == [False]
+
+        with open(source, "w") as file:
+            file.write("Hello again!\n")
+        assert John.backup_files([source], incremental=True, verify=True) == [True]
+        with store.open_blob(json.loads(manifest_path.read_text())["sha256"]) as in_file:
+            assert in_file.read() == b"Hello again!\n"
+
+        blob_path = store.blob_path(json.loads(manifest_path.read_text())["sha256"])
+        blob_path.write_bytes(b"Corrupted\n")
+        try:
+            John.backup_file(source, verify=True, background=True).result()
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except RuntimeError as e:
+            assert str(e) == "The backup of {} in the store {} is corrupted, the checksums do not match".format(
+                source, runPath / "backup_store"
+            )
+
+    source.unlink()
+
+
 @patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
 def test_backup_file_backup_dir_exists():
     tmpdir = tempfile.gettempdir()
@@ -1620,3 +1807,49 @@ def test_backup_file_source_is_not_file():
             raise Exception("Passed through a fail condition without failing")  # pragma: no cover
         except RuntimeError as e:
             assert str(e) == "The source file does not exist or it is not a file."
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_asynchronous_telegram():
+    tmpdir = tempfile.gettempdir()
+    run_name = "Run0001"
+    bot_token = "bot_token"
+    chat_id = "chat_id"
+    runPath = Path(tmpdir) / run_name
+    ensure_clean(runPath)
+
+    John = RM.RunManager(runPath, telegram_bot_token=bot_token, telegram_chat_id=chat_id, rate_limit=False, asynchronous_telegram=True)
+    assert repr(John) == (
+        "RunManager({}, telegram_bot_token='bot_token', telegram_chat_id='chat_id', "
+        "rate_limit=False, asynchronous_telegram=True)".format(repr(runPath))
+    )
+
+    with John:
+        reporter = John._telegram_reporter
+        assert reporter.asynchronous
+        assert isinstance(John._status_message_id, Future)
+        message_id = John.send_message("This is the test message", John._status_message_id)
+        assert message_id.result(timeout=5) == "This is the message ID"
+
+    assert reporter._worker is None
+    assert reporter._session["data"]["text"] == "✔️✔️ Successfully Finished processing Run {} ✔️✔️".format(run_name)
+
+    ensure_clean(runPath)
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_send_message_with_bot_failure_returns_none():
+    tmpdir = tempfile.gettempdir()
+    run_name = "Run0001"
+    runPath = Path(tmpdir) / run_name
+    ensure_clean(runPath)
+
+    with RM.RunManager(runPath, telegram_bot_token="bot_token", telegram_chat_id="chat_id", rate_limit=False) as John:
+        John._telegram_reporter._session._set_error_type(error_type="BadRequest")
+
+        with pytest.warns(RuntimeWarning):
+            assert John.send_message("This is the test message") is None
+        with pytest.warns(RuntimeWarning):
+            assert John.edit_message("This is the test message", "message_id") is None
+
+        John._telegram_reporter._session._set_error_type()
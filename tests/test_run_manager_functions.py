@@ -1,6 +1,7 @@
 import shutil
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
 
 import lip_pps_run_manager.run_manager as internalRM
 
@@ -102,3 +103,37 @@ def test_load_telegram_config_function():
     assert cfg["chats"]["testChat"] == "chat_id"
 
     config_file.unlink()
+
+
+def test_load_telegram_config_function_cached():
+    config_file = Path(tempfile.gettempdir()) / "cached_telegram_config.json"
+    config_file.write_text('{"bots": {"testBot": "bot_token"}, "chats": {"testChat": "chat_id"}}')
+
+    cfg = internalRM.load_telegram_config(config_file)
+    assert cfg["bots"]["testBot"] == "bot_token"
+
+    with patch.object(Path, "open", side_effect=RuntimeError("The config file was read again")):
+        assert internalRM.load_telegram_config(config_file) is cfg
+
+    config_file.write_text('{"bots": {"testBot": "other_bot_token"}, "chats": {"testChat": "chat_id"}}')
+    assert internalRM.load_telegram_config(config_file)["bots"]["testBot"] == "other_bot_token"
+
+    config_file.unlink()
+
+
+def test_set_telegram_config_function():
+    try:
+        internalRM.set_telegram_config("config")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `config` must be a dict type object or None, received object of type <class 'str'>"
+
+    config = {"bots": {"testBot": "injected_token"}, "chats": {"testChat": "injected_chat_id"}}
+    internalRM.set_telegram_config(config)
+    try:
+        assert internalRM.load_telegram_config() is config
+        John = internalRM.RunManager(Path("Run0001"), telegram_bot_name="testBot", telegram_chat_name="testChat")
+        assert John._bot_token == "injected_token"
+        assert John._chat_id == "injected_chat_id"
+    finally:
+        internalRM.set_telegram_config(None)
@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import lip_pps_run_manager as RM
+from lip_pps_run_manager.run_manager import create_run
+
+
+class PrepareRunsDir:
+    def __init__(self):
+        self._path = Path(tempfile.gettempdir()) / "test_run_scanner"
+
+    def __enter__(self):
+        if self._path.exists():  # pragma: no cover
+            shutil.rmtree(self._path)
+        self._path.mkdir()
+        return self._path
+
+    def __exit__(self, type, value, traceback):
+        shutil.rmtree(self._path)
+
+
+def run_task(run_path: Path, task_name: str, fail: bool = False, complete: bool = True):
+    try:
+        with RM.TaskManager(run_path, task_name, loop_iterations=2) as Tobias:
+            Tobias.loop_tick()
+            if complete:
+                Tobias.loop_tick()
+            if fail:
+                raise RuntimeError("The task failed")
+    except RuntimeError:
+        pass
+
+
+def make_runs(runs_path: Path):
+    for run_name in ["Run0001", "Run0002", "Run0003"]:
+        create_run(runs_path, run_name)
+    (runs_path / "NotARun").mkdir()
+    (runs_path / "notes.txt").touch()
+    run_task(runs_path / "Run0001", "myTask")
+    run_task(runs_path / "Run0002", "myTask", fail=True)
+    run_task(runs_path / "Run0003", "myTask", complete=False)
+    run_task(runs_path / "Run0003", "otherTask")
+
+
+def test_run_scanner_bad_types():
+    try:
+        RM.RunScanner("runs")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `path_to_directory` must be a Path type object, received object of type <class 'str'>"
+
+    try:
+        RM.RunScanner(Path("runs"), max_workers=2.0)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `max_workers` must be a int type object, received object of type <class 'float'>"
+
+    try:
+        RM.RunScanner(Path("runs"), cache_file="cache.json")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `cache_file` must be a Path type object or None, received object of type <class 'str'>"
+
+
+def test_run_scanner_repr():
+    assert repr(RM.RunScanner(Path("runs"))) == "RunScanner({}, max_workers=8, cache_file=None)".format(repr(Path("runs")))
+
+
+def test_run_scanner_scan():
+    with PrepareRunsDir() as runs_path:
+        make_runs(runs_path)
+        (runs_path / "Run0001" / ".trash" / "myTask.0123").mkdir(parents=True)
+        (runs_path / "Run0001" / ".trash" / "myTask.0123" / "task_report.txt").write_text("task_status: no errors\n")
+
+        scanner = RM.RunScanner(runs_path, max_workers=2)
+        runs = scanner.scan()
+        assert sorted(runs) == ["Run0001", "Run0002", "Run0003"]
+        assert runs["Run0001"]["run_name"] == "Run0001"
+        assert runs["Run0001"]["created"] is not None
+        assert sorted(runs["Run0001"]["tasks"]) == ["myTask"]
+        assert sorted(runs["Run0003"]["tasks"]) == ["myTask", "otherTask"]
+
+        task = runs["Run0001"]["tasks"]["myTask"]
+        assert task["status"] == "no errors"
+        assert task["processed_iterations"] == 2
+        assert task["expected_iterations"] == 2
+        assert task["start_time"] is not None
+        assert task["end_time"] is not None
+        assert runs["Run0002"]["tasks"]["myTask"]["status"] == "there were errors"
+        assert runs["Run0002"]["tasks"]["myTask"]["exception_type"] == "RuntimeError"
+        assert runs["Run0003"]["tasks"]["myTask"]["status"] == "incomplete"
+
+        assert scanner.summary() == {
+            "myTask": {"no errors": 1, "there were errors": 1, "incomplete": 1},
+            "otherTask": {"no errors": 1, "missing": 2},
+        }
+
+
+def test_run_scanner_legacy_report():
+    with PrepareRunsDir() as runs_path:
+        create_run(runs_path, "Run0001")
+        run_task(runs_path / "Run0001", "myTask")
+        os.remove(runs_path / "Run0001" / "myTask" / "task_report.json")
+
+        task = RM.RunScanner(runs_path).scan()["Run0001"]["tasks"]["myTask"]
+        assert task["status"] == "no errors"
+        assert task["processed_iterations"] is None
+        assert task["end_time"] is not None
+
+
+def test_run_scanner_only_reads_changed_tasks():
+    with PrepareRunsDir() as runs_path:
+        make_runs(runs_path)
+
+        scanner = RM.RunScanner(runs_path)
+        scanner.scan()
+        assert scanner.reads == 4
+        runs = scanner.scan()
+        assert scanner.reads == 0
+        assert runs["Run0002"]["tasks"]["myTask"]["status"] == "there were errors"
+
+        run_task(runs_path / "Run0002", "myTask")
+        runs = scanner.scan()
+        assert scanner.reads == 1
+        assert runs["Run0002"]["tasks"]["myTask"]["status"] == "no errors"
+
+        shutil.rmtree(runs_path / "Run0003")
+        runs = scanner.scan()
+        assert scanner.reads == 0
+        assert sorted(runs) == ["Run0001", "Run0002"]
+
+
+def test_run_scanner_cache_file():
+    with PrepareRunsDir() as runs_path:
+        make_runs(runs_path)
+        cache_file = runs_path / "scan_cache.json"
+
+        scanner = RM.RunScanner(runs_path, cache_file=cache_file)
+        first_runs = scanner.scan()
+        assert cache_file.is_file()
+
+        scanner = RM.RunScanner(runs_path, cache_file=cache_file)
+        assert scanner.scan() == first_runs
+        assert scanner.reads == 0
+
+        cache_file.write_text("not json")
+        scanner = RM.RunScanner(runs_path, cache_file=cache_file)
+        assert scanner.scan() == first_runs
+        assert scanner.reads > 0
+
+
+def test_run_scanner_scan_run():
+    with PrepareRunsDir() as runs_path:
+        make_runs(runs_path)
+
+        scanner = RM.RunScanner(runs_path)
+        run = scanner.scan_run("Run0003")
+        assert sorted(run["tasks"]) == ["myTask", "otherTask"]
+        assert scanner.reads == 2
+        assert scanner.scan_run("NotARun") is None
+        assert scanner.scan_run("Run0004") is None
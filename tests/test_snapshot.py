@@ -0,0 +1,44 @@
+import reprlib
+from unittest.mock import patch
+
+from lip_pps_run_manager.snapshot import snapshot_locals
+from lip_pps_run_manager.snapshot import summarize_value
+
+
+class ArrayLike:
+    shape = (1000, 1000)
+    dtype = "float64"
+
+    def __repr__(self):  # pragma: no cover
+        raise Exception("The repr of array-like values should not be computed")
+
+
+class BadRepr:
+    def __repr__(self):
+        raise ValueError("Can not repr")
+
+
+def test_summarize_value():
+    assert summarize_value(5) == "int: 5"
+    assert summarize_value("hello") == "str(len=5): 'hello'"
+    assert summarize_value(list(range(1000))) == "list(len=1000): [0, 1, 2, 3, 4, 5, ...]"
+    assert summarize_value(ArrayLike()) == "ArrayLike(shape=(1000, 1000), dtype=float64)"
+    assert summarize_value(BadRepr()).startswith("BadRepr: <BadRepr instance at ")
+    with patch.object(reprlib.Repr, "repr", side_effect=ValueError("Exceeds the limit for integer string conversion")):
+        assert summarize_value(5) == "int: <repr failed: ValueError>"
+
+
+def test_summarize_value_is_bounded():
+    summary = summarize_value("a" * 10000, max_length=20)
+    assert summary.startswith("str(len=10000): 'aaaaaaa")
+    assert len(summary) <= len("str(len=10000): ") + 20 + len("...")
+
+    summary = summarize_value(10 ** 100, max_length=20)
+    assert len(summary) <= len("int: ") + 20 + len("...")
+
+
+def test_snapshot_locals():
+    big_list = list(range(100000))
+    number = 2
+    snapshot = snapshot_locals(locals())
+    assert snapshot == {"big_list": "list(len=100000): [0, 1, 2, 3, 4, 5, ...]", "number": "int: 2"}
@@ -0,0 +1,227 @@
+import asyncio
+import concurrent.futures
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+from test_telegram_reporter_class import SessionReplacement
+
+import lip_pps_run_manager as RM
+from lip_pps_run_manager.task_report import write_task_report
+
+barrier = threading.Barrier(2, timeout=10)
+
+
+def calibrate(task):
+    (task.task_path / "calibration.txt").write_text("1.5")
+
+
+def analyse(task):
+    calibration = (task.path_directory / "calibrate" / "calibration.txt").read_text()
+    for _ in task.track(range(10)):
+        pass
+    (task.task_path / "result.txt").write_text(calibration)
+
+
+def fail(task):
+    raise RuntimeError("The task failed")
+
+
+def wait_for_the_other(task):
+    barrier.wait()  # Only passes if both tasks run at the same time
+
+
+telegram_of_tasks = {}
+
+
+def record_telegram(task):
+    telegram_of_tasks[task.task_name] = {
+        "status_message_id": task._status_message_id,
+        "outbox": task._telegram_reporter.outbox,
+        "rate_limit_file": task._telegram_reporter._rate_limiter._lock_file,
+    }
+
+
+class PrepareRunsDir:
+    def __init__(self):
+        self._path = Path(tempfile.gettempdir()) / "test_task_graph"
+
+    def __enter__(self):
+        if self._path.exists():  # pragma: no cover
+            shutil.rmtree(self._path)
+        self._path.mkdir()
+        return self._path
+
+    def __exit__(self, type, value, traceback):
+        shutil.rmtree(self._path)
+
+
+def test_task_graph_add_task_errors():
+    graph = RM.TaskGraph()
+    assert repr(graph) == "TaskGraph()"
+    graph.add_task("calibrate", calibrate)
+
+    try:
+        graph.add_task(2, calibrate)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `task_name` must be a str type object, received object of type <class 'int'>"
+
+    try:
+        graph.add_task("analyse", "analyse")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `function` must be a callable type object, received object of type <class 'str'>"
+
+    try:
+        graph.add_task("analyse", analyse, depends_on="calibrate")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `depends_on` must be a list type object or None, received object of type <class 'str'>"
+
+    try:
+        graph.add_task("analyse", analyse, backup_python_file=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `backup_python_file` must be a bool type object, received object of type <class 'int'>"
+
+    try:
+        graph.add_task("calibrate", calibrate)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except ValueError as e:
+        assert str(e) == "The task calibrate is already in the graph"
+
+    try:
+        graph.add_task("analyse", analyse, depends_on=["plot"])
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except ValueError as e:
+        assert str(e) == "The task analyse depends on plot, which must be added to the graph before it"
+
+    graph.add_task("analyse", analyse, depends_on=["calibrate"])
+    assert graph.tasks == ["calibrate", "analyse"]
+    assert graph.dependencies("analyse") == ["calibrate"]
+
+
+def test_run_task_graph_processes():
+    with PrepareRunsDir() as runs_path:
+        graph = RM.TaskGraph()
+        graph.add_task("calibrate", calibrate)
+        graph.add_task("analyse", analyse, depends_on=["calibrate"], loop_iterations=10)
+        graph.add_task("fail", fail, backup_python_file=False)
+        graph.add_task("plot", analyse, depends_on=["analyse", "fail"])
+        graph.add_task("summary", analyse, depends_on=["plot"])
+
+        with RM.RunManager(runs_path / "Run0001") as John:
+            results = John.run_task_graph(graph, max_workers=2)
+            assert John.task_completed("analyse")
+
+        assert results == {
+            "calibrate": "no errors",
+            "analyse": "no errors",
+            "fail": "there were errors",
+            "plot": "skipped",
+            "summary": "skipped",
+        }
+        assert (runs_path / "Run0001" / "analyse" / "result.txt").read_text() == "1.5"
+        assert (runs_path / "Run0001" / "analyse" / "backup.test_task_graph.py").is_file()
+        assert not (runs_path / "Run0001" / "plot").exists()
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_run_task_graph_runs_independent_tasks_concurrently():
+    with PrepareRunsDir() as runs_path:
+        graph = RM.TaskGraph()
+        graph.add_task("first", wait_for_the_other, backup_python_file=False)
+        graph.add_task("second", wait_for_the_other, backup_python_file=False)
+
+        with RM.RunManager(runs_path / "Run0001", telegram_bot_token="bot_token", telegram_chat_id="chat_id", rate_limit=False) as John:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                assert John.run_task_graph(graph, executor=executor) == {"first": "no errors", "second": "no errors"}
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_run_task_graph_telegram_of_workers():
+    with PrepareRunsDir() as runs_path:
+        graph = RM.TaskGraph()
+        graph.add_task("first", record_telegram, backup_python_file=False)
+        graph.add_task("second", record_telegram, backup_python_file=False)
+
+        run_path = runs_path / "Run0001"
+        with RM.RunManager(run_path, telegram_bot_token="bot_token", telegram_chat_id="chat_id", telegram_outbox=True) as John:
+            John.create_run(raise_error=True)
+            John._status_message_id = "status_message_id"
+            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+                assert John.run_task_graph(graph, executor=executor) == {"first": "no errors", "second": "no errors"}
+
+        for task_name in graph.tasks:
+            assert telegram_of_tasks[task_name] == {
+                "status_message_id": "status_message_id",
+                "outbox": None,
+                "rate_limit_file": run_path / "telegram_rate_limit.json",
+            }
+        assert (run_path / "telegram_rate_limit.json").is_file()
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_run_task_graph_asynchronous_telegram():
+    with PrepareRunsDir() as runs_path:
+        graph = RM.TaskGraph()
+        graph.add_task("calibrate", calibrate, backup_python_file=False)
+        options = {"telegram_bot_token": "bot_token", "telegram_chat_id": "chat_id", "rate_limit": False}
+
+        with RM.RunManager(runs_path / "Run0001", asynchronous_telegram=True, **options) as John:
+            assert isinstance(John._status_message_id, concurrent.futures.Future)
+            assert John.run_task_graph(graph, max_workers=1) == {"calibrate": "no errors"}
+
+        async def process():
+            async with RM.RunManager(runs_path / "Run0002", **options) as Paul:
+                assert isinstance(Paul._status_message_id, concurrent.futures.Future)
+                return Paul.run_task_graph(graph, max_workers=1)
+
+        assert asyncio.run(process()) == {"calibrate": "no errors"}
+
+
+def test_run_task_graph_ignores_stale_reports():
+    with PrepareRunsDir() as runs_path:
+        graph = RM.TaskGraph()
+        graph.add_task("bad_options", calibrate, backup_python_file=False, loop_iterations="10")
+        graph.add_task("enter_fails", calibrate, backup_python_file=False)
+
+        with RM.RunManager(runs_path / "Run0001") as John:
+            John.create_run(raise_error=True)
+            for task_name in graph.tasks:
+                (runs_path / "Run0001" / task_name).mkdir()
+                write_task_report(runs_path / "Run0001" / task_name, {"status": "no errors", "start_time": "2020-01-01T00:00:00"})
+
+            with patch("lip_pps_run_manager.run_manager.TaskManager._enter_task", side_effect=OSError("Disk full")):
+                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                    results = John.run_task_graph(graph, executor=executor)
+
+        assert results == {"bad_options": "there were errors", "enter_fails": "there were errors"}
+
+
+def test_run_task_graph_errors():
+    with PrepareRunsDir() as runs_path:
+        John = RM.RunManager(runs_path / "Run0001")
+        try:
+            John.run_task_graph(RM.TaskGraph())
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except RuntimeError as e:
+            assert str(e) == (
+                "Tried calling run_task_graph() while not inside a run context. Use the 'with RunManager as handle' syntax"
+            )
+
+        with John:
+            try:
+                John.run_task_graph("graph")
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except TypeError as e:
+                assert str(e) == "The `graph` must be a TaskGraph type object, received object of type <class 'str'>"
+
+            try:
+                John.run_task_graph(RM.TaskGraph(), max_workers=2.0)
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except TypeError as e:
+                assert str(e) == "The `max_workers` must be a int type object or None, received object of type <class 'float'>"
@@ -1,17 +1,25 @@
+import asyncio
+import concurrent.futures
 import copy
 import datetime
+import gzip
+import json
 import shutil
 import tempfile
+import time
 import traceback
 from pathlib import Path
 from unittest.mock import patch
 
 import humanize
 import pytest
+from test_progress import add_to_counter
 from test_run_manager_class import prepare_config_file
 from test_telegram_reporter_class import SessionReplacement
 
 import lip_pps_run_manager as RM
+import lip_pps_run_manager.run_manager as run_manager_module
+from lip_pps_run_manager.task_report import read_task_report
 
 testdata_true_false = [(True), (False)]
 
@@ -492,6 +500,148 @@ def test_loop_tick_ticks():
             assert Tobias._processed_iterations == 7
 
 
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_loop_tick_defers_bookkeeping():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask", loop_iterations=30) as Tobias:
+            Tobias.loop_tick()
+            first_update = Tobias._last_update
+            assert Tobias._next_bookkeeping > time.monotonic()
+
+            del Tobias._last_update
+            Tobias.loop_tick()
+            assert not hasattr(Tobias, '_last_update')  # Only the counter was increased
+            assert Tobias._processed_iterations == 2
+
+            Tobias._next_bookkeeping = 0.0
+            Tobias.loop_tick()
+            assert Tobias._last_update >= first_update
+
+
+@pytest.mark.perf
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_loop_tick_overhead():
+    with PrepareRunDir() as handler:
+        iterations = 200000
+        with RM.TaskManager(handler.run_path, "testTask", loop_iterations=5 * iterations) as Tobias:
+            loop_tick = Tobias.loop_tick
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    loop_tick()
+                best = min(best, time.perf_counter() - start)
+            Tobias.set_completed()
+
+        assert best / iterations < 1e-6
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_track_outside_context():
+    with PrepareRunDir() as handler:
+        Tobias = RM.TaskManager(handler.run_path, "testTask")
+
+        try:
+            Tobias.track(range(10))
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except RuntimeError as e:
+            assert str(e) == ("Tried calling track() while not inside a task context. Use the 'with TaskManager as handle' syntax")
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_track_bad_types():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask") as Tobias:
+            try:
+                Tobias.track(range(10), total=1.5)
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except TypeError as e:
+                assert str(e) == ("The `total` must be a int type object or None, received object of type <class 'float'>")
+
+            try:
+                Tobias.track(range(10), chunked=1)
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except TypeError as e:
+                assert str(e) == ("The `chunked` must be a bool type object, received object of type <class 'int'>")
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_track_infers_total():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask") as Tobias:
+            items = [item for item in Tobias.track(range(10000))]
+            assert items == list(range(10000))
+            assert Tobias._loop_iterations == 10000
+            assert Tobias.processed_iterations == 10000
+
+        with open(Tobias.task_path / "task_report.txt", "r", encoding="utf8") as report_file:
+            assert report_file.readline() == "task_status: no errors\n"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_track_without_len():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask") as Tobias:
+            for _ in Tobias.track(item for item in range(50)):
+                pass
+            assert Tobias._loop_iterations is None
+            assert Tobias.processed_iterations == 50
+
+        with RM.TaskManager(handler.run_path, "otherTask") as Tobias:
+            for _ in Tobias.track((item for item in range(50)), total=50):
+                pass
+            assert Tobias._loop_iterations == 50
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_track_early_exit():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask") as Tobias:
+            iterator = Tobias.track(range(100))
+            for item in iterator:
+                if item == 20:
+                    break
+            iterator.close()
+            assert Tobias.processed_iterations == 20  # Item 20 was being processed, so it does not count
+
+        with open(Tobias.task_path / "task_report.txt", "r", encoding="utf8") as report_file:
+            assert report_file.readline() == "task_status: incomplete\n"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_track_chunked():
+    with PrepareRunDir() as handler:
+        chunks = [[0] * 100, [1] * 100, [2] * 50]
+        with RM.TaskManager(handler.run_path, "testTask") as Tobias:
+            for chunk in Tobias.track(chunks, chunked=True):
+                assert len(chunk) in [100, 50]
+            assert Tobias._loop_iterations == 250
+            assert Tobias.processed_iterations == 250
+
+        with RM.TaskManager(handler.run_path, "otherTask") as Tobias:
+            for chunk in Tobias.track(iter(chunks), chunked=True):
+                pass
+            assert Tobias._loop_iterations is None
+            assert Tobias.processed_iterations == 250
+
+
+@pytest.mark.perf
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_track_overhead():
+    with PrepareRunDir() as handler:
+        items = list(range(500000))
+        with RM.TaskManager(handler.run_path, "testTask", loop_iterations=5 * len(items)) as Tobias:
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                for _ in Tobias.track(items):
+                    pass
+                best = min(best, time.perf_counter() - start)
+            assert Tobias.processed_iterations == 5 * len(items)
+
+        assert best / len(items) < 2e-7
+
+
 @patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
 def test_loop_tick_overload():
     with PrepareRunDir() as handler:
@@ -1341,6 +1491,31 @@ def test_exit_backup_file_created():
         assert (Tobias.task_path / "backup.{}".format(Path(traceback.extract_stack()[-1].filename).parts[-1])).is_file()
 
 
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_exit_backs_up_script_to_store():
+    with PrepareRunDir() as handler:
+        script_to_backup = Path(traceback.extract_stack()[-1].filename)
+        store = RM.BackupStore(handler.run_path / "backup_store", compress=True)
+
+        for task_name in ["firstTask", "secondTask"]:
+            Tobias = RM.TaskManager(handler.run_path, task_name, script_to_backup=script_to_backup, backup_store=store)
+            assert repr(Tobias).endswith("backup_store={})".format(repr(store)))
+            with Tobias:
+                pass
+
+            assert not (Tobias.task_path / "backup.{}".format(script_to_backup.name)).exists()
+            with open(Tobias.task_path / "backup.{}.manifest.json".format(script_to_backup.name), "r", encoding="utf8") as in_file:
+                manifest = json.load(in_file)
+            assert manifest["task_name"] == task_name
+            assert manifest["source"] == str(script_to_backup)
+            assert "script_to_backup" in manifest["locals"]
+
+        blobs = [blob for blob in (handler.run_path / "backup_store").rglob("*") if blob.is_file()]
+        assert len(blobs) == 1
+        with store.open_blob(manifest["sha256"]) as in_file:
+            assert in_file.read() == script_to_backup.read_bytes()
+
+
 @pytest.mark.parametrize("own_run_context", testdata_true_false)
 @patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
 def test_exit_sets_run_context(own_run_context: bool):
@@ -1917,3 +2092,472 @@ def test_backup_file_source_is_not_file():
                 raise Exception("Passed through a fail condition without failing")  # pragma: no cover
             except RuntimeError as e:
                 assert str(e) == "The source file does not exist or it is not a file."
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_async_with_own_run_context():
+    with PrepareRunDir() as handler:
+        task_name = "testTask"
+        instrument_value = 42  # noqa: F841 A local variable of the caller, to check it is captured
+
+        async def process_task():
+            async with RM.TaskManager(
+                handler.run_path,
+                task_name,
+                telegram_bot_token="async_bot_token",
+                telegram_chat_id="chat_id",
+                loop_iterations=3,
+                rate_limit=False,
+            ) as Tobias:
+                assert isinstance(Tobias._telegram_reporter, RM.AsyncTelegramReporter)
+                for _ in range(3):
+                    await asyncio.sleep(0)
+                    Tobias.loop_tick()
+            return Tobias
+
+        Tobias = asyncio.run(process_task())
+
+        assert "handler" in Tobias._locals_on_call
+        assert len(Tobias._telegram_reporter._submitted) == 0
+        assert Tobias._telegram_reporter._closed
+        with open(Tobias.task_path / "task_report.txt", "r", encoding="utf8") as in_file:
+            assert in_file.readline() == "task_status: no errors\n"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_progress_counter_outside_context():
+    with PrepareRunDir() as handler:
+        Tobias = RM.TaskManager(handler.run_path, "testTask")
+
+        try:
+            Tobias.progress_counter()
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except RuntimeError as e:
+            assert str(e) == (
+                "Tried calling progress_counter() while not inside a task context. Use the 'with TaskManager as handle' syntax"
+            )
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_progress_counter_aggregates_workers():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask", loop_iterations=4000) as Tobias:
+            counter = Tobias.progress_counter()
+            assert Tobias.progress_counter() is counter
+            assert Tobias.processed_iterations == 0
+
+            with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(add_to_counter, counter, 1000) for _ in range(3)]
+                for future in concurrent.futures.as_completed(futures):
+                    Tobias.loop_tick(count=0)
+            Tobias.loop_tick(1000)
+
+            assert Tobias.processed_iterations == 4000
+            assert Tobias.expected_finish_time is not None
+
+        assert Tobias._shared_progress is None
+        assert Tobias.processed_iterations == 4000
+        with open(Tobias.task_path / "task_report.txt", "r", encoding="utf8") as report_file:
+            assert report_file.readline() == "task_status: no errors\n"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_progress_counter_set_completed():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask", loop_iterations=100) as Tobias:
+            Tobias.progress_counter().add(30)
+            Tobias.set_completed()
+            assert Tobias.processed_iterations == 100
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_eta_estimator_bad_type():
+    with PrepareRunDir() as handler:
+        try:
+            RM.TaskManager(handler.run_path, "testTask", eta_estimator="fast")
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except TypeError as e:
+            assert str(e) == ("The `eta_estimator` must be a ProgressEstimator type object or None, received object of type <class 'str'>")
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_eta_estimator_repr():
+    with PrepareRunDir() as handler:
+        Tobias = RM.TaskManager(handler.run_path, "testTask", eta_estimator=RM.EWMAEstimator(half_life=30))
+        assert repr(Tobias) == (
+            "TaskManager({}, 'testTask', drop_old_data=True, script_to_backup=None, "
+            "loop_iterations=None, minimum_update_time_seconds=60, "
+            "minimum_warn_time_seconds=60, eta_estimator=EWMAEstimator(half_life=30.0))".format(repr(handler.run_path))
+        )
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_eta_estimator_drives_expected_finish_and_throughput():
+    with PrepareRunDir() as handler:
+        estimator = RM.SlidingWindowEstimator(window=2)
+        with RM.TaskManager(
+            handler.run_path,
+            "testTask",
+            loop_iterations=1000,
+            telegram_bot_token="bot_token",
+            telegram_chat_id="chat_id",
+            rate_limit=False,
+            eta_estimator=estimator,
+        ) as Tobias:
+            Tobias._processed_iterations = 500
+            Tobias._start_time = datetime.datetime.now() - datetime.timedelta(hours=10)  # A very slow start
+            assert Tobias.throughput is None
+
+            now = time.monotonic()
+            estimator.add_sample(now - 10, 400)
+            estimator.add_sample(now, 500)
+            assert Tobias.throughput == 10.0
+
+            remaining = Tobias.expected_finish_time - datetime.datetime.now()
+            assert datetime.timedelta(seconds=49) < remaining < datetime.timedelta(seconds=51)
+
+            Tobias._last_update = datetime.datetime.now() - datetime.timedelta(seconds=70)
+            Tobias._update_status()
+            assert "     Throughput: 10.00 it/s\n\n" in Tobias._telegram_reporter._session["data"]["text"]
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_exit_writes_json_report():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask", loop_iterations=10) as Tobias:
+            for _ in range(4):
+                Tobias.loop_tick()
+            Tobias.warn("Watch out")
+            Tobias.warn("Watch out")
+
+        with open(Tobias.task_path / "task_report.json", "r", encoding="utf8") as in_file:
+            report = json.load(in_file)
+
+        assert report["task_name"] == "testTask"
+        assert report["status"] == "incomplete"
+        assert report["processed_iterations"] == 4
+        assert report["expected_iterations"] == 10
+        assert report["throughput"] > 0
+        assert report["warning_count"] == 2
+        assert report["warnings"] == {"Watch out": 2}
+        assert report["exception_type"] is None
+        assert datetime.datetime.fromisoformat(report["end_time"]) >= datetime.datetime.fromisoformat(report["start_time"])
+
+        try:
+            with RM.TaskManager(handler.run_path, "failedTask") as Tobias:
+                raise ValueError("Something broke")
+        except ValueError:
+            pass
+
+        with open(Tobias.task_path / "task_report.json", "r", encoding="utf8") as in_file:
+            report = json.load(in_file)
+        assert report["status"] == "there were errors"
+        assert report["exception_type"] == "ValueError"
+        assert report["exception_message"] == "Something broke"
+        assert report["processed_iterations"] is None
+        assert report["throughput"] is None
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_locals_repr_limit_bad_type():
+    with PrepareRunDir() as handler:
+        try:
+            RM.TaskManager(handler.run_path, "testTask", locals_repr_limit="200")
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except TypeError as e:
+            assert str(e) == "The `locals_repr_limit` must be a int type object, received object of type <class 'str'>"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_locals_repr_limit_repr():
+    with PrepareRunDir() as handler:
+        Tobias = RM.TaskManager(handler.run_path, "testTask", locals_repr_limit=50)
+        assert repr(Tobias) == (
+            "TaskManager({}, 'testTask', drop_old_data=True, script_to_backup=None, "
+            "loop_iterations=None, minimum_update_time_seconds=60, "
+            "minimum_warn_time_seconds=60, locals_repr_limit=50)".format(repr(handler.run_path))
+        )
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_enter_snapshots_bounded_locals():
+    with PrepareRunDir() as handler:
+        script_to_backup = Path(traceback.extract_stack()[-1].filename)
+        big_list = list(range(100000))
+        long_text = "a" * 10000
+
+        with RM.TaskManager(handler.run_path, "testTask", script_to_backup=script_to_backup, locals_repr_limit=50) as Tobias:
+            assert all(isinstance(summary, str) for summary in Tobias._locals_on_call.values())
+            assert Tobias._locals_on_call["big_list"] == "list(len=100000): [0, 1, 2, 3, 4, 5, ...]"
+
+        with open(Tobias.task_path / "backup.{}".format(script_to_backup.name), "r", encoding="utf8") as in_file:
+            header = [line for line in in_file if line.startswith("#   ")]
+        assert "#   big_list: list(len=100000): [0, 1, 2, 3, 4, 5, ...]\n" in header
+        assert all(len(line) < 200 for line in header if line.startswith("#   long_text: "))
+        assert len(long_text) == 10000 and len(big_list) == 100000
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_backup_compression_bad_type():
+    with PrepareRunDir() as handler:
+        try:
+            RM.TaskManager(handler.run_path, "testTask", backup_compression=True)
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except TypeError as e:
+            assert str(e) == "The `backup_compression` must be a str type object or None, received object of type <class 'bool'>"
+
+        try:
+            RM.TaskManager(handler.run_path, "testTask", backup_compression="bzip2")
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except ValueError as e:
+            assert str(e) == "The `compression` must be one of None, 'gzip', 'zstd', received 'bzip2'"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_exit_compressed_script_backup():
+    with PrepareRunDir() as handler:
+        script_to_backup = Path(traceback.extract_stack()[-1].filename)
+
+        Tobias = RM.TaskManager(handler.run_path, "testTask", script_to_backup=script_to_backup, backup_compression="gzip")
+        assert repr(Tobias).endswith("backup_compression='gzip')")
+        with Tobias:
+            pass
+
+        assert not (Tobias.task_path / "backup.{}".format(script_to_backup.name)).exists()
+        with gzip.open(Tobias.task_path / "backup.{}.gz".format(script_to_backup.name), "rb") as in_file:
+            backup = in_file.read()
+        assert backup.startswith(b"# ------")
+        assert backup.endswith(script_to_backup.read_bytes())
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_copy_progress_in_status():
+    with PrepareRunDir() as handler:
+        source = handler.run_path / "data.bin"
+        source.write_bytes(b"0" * 1000)
+
+        with RM.TaskManager(
+            handler.run_path, "testTask", telegram_bot_token="bot_token", telegram_chat_id="chat_id", rate_limit=False
+        ) as Tobias:
+            Tobias._report_copy_progress(Tobias.task_path / "data.bin.bak", 500, 1000)
+            Tobias._update_status()
+            assert "     Copying data.bin.bak: 500 Bytes of 1.0 kB\n" in Tobias._telegram_reporter._session["data"]["text"]
+
+            future = Tobias.backup_file(source, verify=True, background=True)
+        assert future.result() == Tobias.task_path / "data.bin.bak"
+        assert Tobias._copy_progress == {}
+        assert (Tobias.task_path / "data.bin.bak").read_bytes() == source.read_bytes()
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_background_cleanup_bad_type():
+    with PrepareRunDir() as handler:
+        try:
+            RM.TaskManager(handler.run_path, "testTask", background_cleanup=1)
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except TypeError as e:
+            assert str(e) == "The `background_cleanup` must be a bool type object, received object of type <class 'int'>"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_background_cleanup():
+    with PrepareRunDir() as handler:
+        old_task_path = handler.run_path / "testTask"
+        (old_task_path / "subdir").mkdir(parents=True)
+        for index in range(100):
+            (old_task_path / "subdir" / "file_{}.tmp".format(index)).touch()
+        (old_task_path / "old_file.tmp").touch()
+        (handler.run_path / ".trash" / "leftover").mkdir(parents=True)  # From an interrupted cleanup
+
+        Tobias = RM.TaskManager(handler.run_path, "testTask", background_cleanup=True)
+        assert repr(Tobias).endswith("background_cleanup=True)")
+        with Tobias:
+            assert next(Tobias.task_path.iterdir(), None) is None
+            Tobias._cleanup_thread.join()
+            assert list((handler.run_path / ".trash").iterdir()) == []
+
+        assert (Tobias.task_path / "task_report.json").is_file()
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_background_cleanup_single_thread():
+    empty_trash = run_manager_module._empty_trash
+
+    def slow_empty_trash(trash_path):
+        time.sleep(0.1)
+        empty_trash(trash_path)
+
+    with PrepareRunDir() as handler:
+        shutil.rmtree(handler.run_path)  # Created by the RunManager instead
+
+        with patch("lip_pps_run_manager.run_manager._empty_trash", new=slow_empty_trash):
+            with RM.RunManager(handler.run_path) as John:
+                John.create_run(raise_error=True)
+                for task_name in ["firstTask", "secondTask"]:
+                    (handler.run_path / task_name).mkdir()
+                    (handler.run_path / task_name / "old_file.tmp").touch()
+                with John.handle_task("firstTask", background_cleanup=True) as Tobias:
+                    pass
+                with John.handle_task("secondTask", background_cleanup=True) as Paul:
+                    pass
+                assert Paul._cleanup_thread is Tobias._cleanup_thread
+                assert Paul._cleanup_thread.is_alive()
+            assert not Paul._cleanup_thread.is_alive()  # The run context waited for the cleanup
+            assert list((handler.run_path / ".trash").iterdir()) == []
+            assert run_manager_module._trash_cleanup_threads == {}
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_inputs_bad_type():
+    with PrepareRunDir() as handler:
+        try:
+            RM.TaskManager(handler.run_path, "testTask", inputs=["raw.bin"])
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except TypeError as e:
+            assert str(e) == "The `inputs` must be a list of Path type objects or None, received object of type <class 'list'>"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_parameters_bad_type():
+    with PrepareRunDir() as handler:
+        try:
+            RM.TaskManager(handler.run_path, "testTask", parameters=[1])
+            raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except TypeError as e:
+            assert str(e) == "The `parameters` must be a dict type object or None, received object of type <class 'list'>"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_inputs_missing_file():
+    with PrepareRunDir() as handler:
+        raw_file = handler.run_path / "raw.bin"
+        Tobias = RM.TaskManager(handler.run_path, "testTask", inputs=[raw_file])
+        assert not Tobias.up_to_date
+        try:
+            with Tobias:
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+        except RuntimeError as e:
+            assert str(e) == "The input file {} does not exist".format(raw_file)
+
+        with open(Tobias.task_path / "task_report.json", "r", encoding="utf8") as in_file:
+            report = json.load(in_file)
+        assert report["status"] == "there were errors"
+        assert report["exception_message"] == "The input file {} does not exist".format(raw_file)
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_up_to_date():
+    with PrepareRunDir() as handler:
+        raw_file = handler.run_path / "raw.bin"
+        raw_file.write_bytes(b"raw data")
+        script = Path(__file__)
+        options = {"inputs": [raw_file], "parameters": {"threshold": 3}, "script_to_backup": script}
+
+        Tobias = RM.TaskManager(handler.run_path, "testTask", **options)
+        assert repr(Tobias).endswith("inputs=[{}], parameters={{'threshold': 3}})".format(repr(raw_file)))
+        assert not Tobias.up_to_date
+        with Tobias:
+            (Tobias.task_path / "output.txt").touch()
+        with open(Tobias.task_path / "task_report.json", "r", encoding="utf8") as in_file:
+            fingerprint = json.load(in_file)["fingerprint"]
+        assert len(fingerprint) == 64
+
+        report_mtime = (Tobias.task_path / "task_report.json").stat().st_mtime_ns
+        with RM.TaskManager(handler.run_path, "testTask", **options) as Tobias:
+            assert Tobias.up_to_date
+            assert (Tobias.task_path / "output.txt").is_file()
+        assert (Tobias.task_path / "task_report.json").stat().st_mtime_ns == report_mtime
+
+        with RM.TaskManager(handler.run_path, "testTask", **dict(options, parameters={"threshold": 4})) as Tobias:
+            assert not Tobias.up_to_date
+            assert not (Tobias.task_path / "output.txt").exists()
+
+        raw_file.write_bytes(b"new raw data")
+        assert not RM.TaskManager(handler.run_path, "testTask", **dict(options, parameters={"threshold": 4})).up_to_date
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_up_to_date_not_checked():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask", parameters={"threshold": 3}):
+            pass
+        first_report = read_task_report(handler.run_path / "testTask")
+
+        with RM.TaskManager(handler.run_path, "testTask", parameters={"threshold": 3}) as Tobias:
+            pass  # The task is processed again, without checking whether it is up to date
+        assert not Tobias._up_to_date  # Its old data was dropped when leaving the task
+        second_report = read_task_report(Tobias.task_path)
+        assert second_report["start_time"] != first_report["start_time"]
+
+        with RM.TaskManager(handler.run_path, "testTask", parameters={"threshold": 3}) as Tobias:
+            assert Tobias.up_to_date
+        assert read_task_report(Tobias.task_path) == second_report
+
+
+@pytest.mark.parametrize("background_cleanup", testdata_true_false)
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_up_to_date_old_data_dropped_lazily(background_cleanup: bool):
+    with PrepareRunDir() as handler:
+        options = {"parameters": {"threshold": 3}, "background_cleanup": background_cleanup}
+        with RM.TaskManager(handler.run_path, "testTask", **options) as Tobias:
+            (Tobias.task_path / "output.txt").write_text("old")
+
+        with RM.TaskManager(handler.run_path, "testTask", **options) as Tobias:
+            assert (handler.run_path / "testTask" / "output.txt").is_file()  # Set aside until the body decides
+            assert not (Tobias.task_path / "output.txt").exists()  # Processed again, without checking
+            (Tobias.task_path / "output.txt").write_text("new")
+            assert not Tobias.up_to_date  # Its old data is gone
+        assert (Tobias.task_path / "output.txt").read_text() == "new"
+        assert read_task_report(Tobias.task_path)["status"] == "no errors"
+
+        with RM.TaskManager(handler.run_path, "testTask", **options) as Tobias:
+            pass  # Left without checking, the task was processed again
+        assert not (Tobias.task_path / "output.txt").exists()
+        assert read_task_report(Tobias.task_path)["status"] == "no errors"
+
+        with RM.TaskManager(handler.run_path, "testTask", **options) as Tobias:
+            (Tobias.task_path / "output.txt").write_text("kept")
+        Tobias = RM.TaskManager(handler.run_path, "testTask", **options)
+        assert Tobias.up_to_date  # Checked before entering, the old data is kept
+        with Tobias:
+            assert (Tobias.task_path / "output.txt").read_text() == "kept"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_up_to_date_not_after_errors():
+    with PrepareRunDir() as handler:
+        try:
+            with RM.TaskManager(handler.run_path, "testTask", parameters={"threshold": 3}):
+                raise RuntimeError("Processing failed")
+        except RuntimeError:
+            pass
+        assert not RM.TaskManager(handler.run_path, "testTask", parameters={"threshold": 3}).up_to_date
+        assert not RM.TaskManager(handler.run_path, "testTask").up_to_date
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_warning_counts_are_bounded():
+    with PrepareRunDir() as handler:
+        with RM.TaskManager(handler.run_path, "testTask", loop_iterations=2) as Tobias:
+            for _ in range(10):
+                Tobias._next_bookkeeping = 0.0  # Force a round of bookkeeping on each tick
+                Tobias.loop_tick()
+            for index in range(150):
+                Tobias.warn("Warning number {}".format(index))
+
+            try:
+                Tobias.warn("Watch out", category=1)
+                raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+            except TypeError as e:
+                assert str(e) == "The `category` must be a str type object or None, received object of type <class 'int'>"
+
+        with open(Tobias.task_path / "task_report.json", "r", encoding="utf8") as in_file:
+            report = json.load(in_file)
+
+        assert report["warnings"]["iterations exceeded"] == 8
+        assert report["warning_samples"]["iterations exceeded"][-1].endswith("Processed 10 iterations")
+        assert len(report["warning_samples"]["iterations exceeded"]) == 3
+        assert len(report["warnings"]) == 101  # With the "other warnings"
+        assert report["warnings"]["other warnings"] == 51
+        assert report["warning_count"] == 158
+        assert len(report["warning_samples"]["other warnings"]) == 3
@@ -0,0 +1,71 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from lip_pps_run_manager.task_report import read_task_report
+from lip_pps_run_manager.task_report import read_task_status
+from lip_pps_run_manager.task_report import write_task_report
+
+
+def make_task_dir() -> Path:
+    task_path = Path(tempfile.gettempdir()) / "test_task_report"
+    if task_path.exists():  # pragma: no cover
+        shutil.rmtree(task_path)
+    task_path.mkdir()
+    return task_path
+
+
+def test_write_and_read_task_report():
+    task_path = make_task_dir()
+    try:
+        assert read_task_report(task_path) is None
+        assert read_task_status(task_path) is None
+
+        write_task_report(task_path, {"status": "incomplete", "processed_iterations": 10})
+
+        assert not (task_path / "task_report.json.tmp").exists()
+        assert read_task_report(task_path) == {"status": "incomplete", "processed_iterations": 10}
+        assert read_task_status(task_path) == "incomplete"
+    finally:
+        shutil.rmtree(task_path)
+
+
+def test_write_task_report_bad_types():
+    try:
+        write_task_report("task", {})
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `task_path` must be a Path type object, received object of type <class 'str'>"
+
+    try:
+        write_task_report(Path("task"), [])
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `report` must be a dict type object, received object of type <class 'list'>"
+
+    try:
+        read_task_report("task")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `task_path` must be a Path type object, received object of type <class 'str'>"
+
+
+def test_read_task_status_legacy_report():
+    task_path = make_task_dir()
+    try:
+        with open(task_path / "task_report.txt", "w", encoding="utf8") as out_file:
+            out_file.write("task_status: there were errors\n")
+            out_file.write("Task could not be completed because there were errors\n")
+        assert read_task_status(task_path) == "there were errors"
+
+        with open(task_path / "task_report.json", "w", encoding="utf8") as out_file:
+            out_file.write('{"status": "no err')  # Corrupted, so the text report is used
+        assert read_task_report(task_path) is None
+        assert read_task_status(task_path) == "there were errors"
+
+        with open(task_path / "task_report.json", "w", encoding="utf8") as out_file:
+            json.dump(["not", "a", "report"], out_file)
+        assert read_task_report(task_path) is None
+    finally:
+        shutil.rmtree(task_path)
@@ -1,8 +1,23 @@
+import tempfile
+import time
+from concurrent.futures import Future
+from pathlib import Path
 from unittest.mock import patch
 
+import pytest
+import requests
+
 import lip_pps_run_manager as RM
 
 
+class ErrorResponse:
+    def __init__(self, response):
+        self._response = response
+
+    def json(self):
+        return self._response
+
+
 class SessionReplacement:
     _params = {}
     _prev_params = {}
@@ -12,6 +27,8 @@ class SessionReplacement:
         pass
 
     def __getitem__(self, key: str):
+        if key == 'ok':
+            return True
         if key == 'result':
             return {'message_id': "This is the message ID"}
         if key == 'previous message':
@@ -20,6 +37,9 @@ class SessionReplacement:
             return self._params[key]
         raise RuntimeError("Unknown key: {}".format(key))  # pragma: no cover
 
+    def mount(self, prefix, adapter):
+        pass
+
     def _set_error_type(self, error_type=None):
         self._error_type = error_type
 
@@ -41,6 +61,7 @@ class SessionReplacement:
                 raise KeyboardInterrupt
             elif self._error_type == "Exception":  # pragma: no cover
                 raise Exception()
+            return self._error_response()
 
         return self
 
@@ -58,9 +79,21 @@ class SessionReplacement:
                 raise KeyboardInterrupt
             elif self._error_type == "Exception":  # pragma: no cover
                 raise Exception()
+            return self._error_response()
 
         return self
 
+    def _error_response(self):
+        if self._error_type == "ConnectionError":
+            raise requests.ConnectionError()
+        elif self._error_type == "RetryAfter":
+            self._error_type = None
+            response = {"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 0.01}}
+            return ErrorResponse(response)
+        elif self._error_type == "BadRequest":
+            return ErrorResponse({"ok": False, "error_code": 400, "description": "Bad Request"})
+        return self  # pragma: no cover
+
     def json(self):
         return self
 
@@ -202,3 +235,268 @@ def test_telegram_reporter_repr():
     reporter = RM.TelegramReporter(bot_token, chat_id, rate_limit=rate_limit)
 
     assert repr(reporter) == "TelegramReporter({}, {}, rate_limit={})".format(repr(bot_token), repr(chat_id), repr(rate_limit))
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_asynchronous_repr():
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False, asynchronous=True, max_queue_size=10)
+
+    assert reporter.asynchronous
+    assert repr(reporter) == "TelegramReporter('bot_token', 'chat_id', rate_limit=False, asynchronous=True, max_queue_size=10)"
+
+    reporter.close()
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_fail_telegram_reporter_asynchronous():
+    try:
+        RM.TelegramReporter("bot_token", "chat_id", asynchronous=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `asynchronous` must be a bool type object, received object of type <class 'int'>"
+
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False)
+    try:
+        reporter.submit_message("Hello there")
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except RuntimeError as e:
+        assert str(e) == "The TelegramReporter is not in asynchronous mode, use `send_message` or `edit_message` instead"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_submit_message():
+    bot_token = "bot_token"
+    chat_id = "chat_id"
+    reporter = RM.TelegramReporter(bot_token, chat_id, rate_limit=False, asynchronous=True)
+    sessionHandler = reporter._session
+
+    message = "Hello there"
+    future = reporter.submit_message(message_text=message)
+    assert future.result(timeout=5) == "This is the message ID"
+    assert sessionHandler["url"] == "https://api.telegram.org/bot{}/sendMessage".format(bot_token)
+    assert sessionHandler["data"]["text"] == message
+
+    reply_future = reporter.submit_message(message_text="A reply", reply_to_message_id=future)
+    edit_future = reporter.submit_edit(message_text="An edit", message_id=reply_future)
+    reporter.flush()
+
+    assert edit_future.result() == "This is the message ID"
+    assert sessionHandler["previous message"]["data"]["reply_to_message_id"] == "This is the message ID"
+    assert sessionHandler["url"] == "https://api.telegram.org/bot{}/editMessageText".format(bot_token)
+    assert sessionHandler["data"]["message_id"] == "This is the message ID"
+    assert sessionHandler["data"]["text"] == "An edit"
+
+    reporter.close()
+    try:
+        reporter.submit_message(message_text=message)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except RuntimeError as e:
+        assert str(e) == "The TelegramReporter has been closed, no more messages can be submitted"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_submit_failure():
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False, asynchronous=True)
+    reporter._session._set_error_type(error_type="Exception")
+
+    future = reporter.submit_message(message_text="Hello there")
+    edit_future = reporter.submit_edit(message_text="An edit", message_id=future)
+    reporter.close()
+
+    assert isinstance(future.exception(), Exception)
+    assert isinstance(edit_future.exception(), Exception)
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_submit_edit_coalescing():
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False, asynchronous=True)
+    sessionHandler = reporter._session
+    sessionHandler._clear()
+
+    # Keep the worker busy until all the edits are queued
+    blocker = Future()
+    reporter.submit_message(message_text="Status", reply_to_message_id=blocker)
+
+    futures = [reporter.submit_edit(message_text="Edit {}".format(i), message_id="message_id") for i in range(5)]
+    other_future = reporter.submit_edit(message_text="Other edit", message_id="other_message_id")
+    assert all([future is futures[0] for future in futures])
+    assert other_future is not futures[0]
+    assert reporter._queue.qsize() == 3
+
+    blocker.set_result("reply_id")
+    reporter.flush()
+
+    assert futures[0].result() == "This is the message ID"
+    assert sessionHandler["previous message"]["data"]["message_id"] == "message_id"
+    assert sessionHandler["previous message"]["data"]["text"] == "Edit 4"
+    assert sessionHandler["data"]["message_id"] == "other_message_id"
+    assert reporter._pending_edits == {}
+
+    new_future = reporter.submit_edit(message_text="Edit 5", message_id="message_id")
+    assert new_future is not futures[0]
+    reporter.close()
+    assert sessionHandler["data"]["text"] == "Edit 5"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_submit_edit_takes_one_token():
+    limiter = RM.RateLimiter()
+    reporter = RM.TelegramReporter("bot_token", "chat_id", asynchronous=True, rate_limiter=limiter)
+    with patch.object(limiter, "acquire", wraps=limiter.acquire) as acquire:
+        reporter.submit_edit(message_text="Edit", message_id="message_id").result()
+        assert acquire.call_count == 1
+    reporter.close()
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_rate_limiter():
+    limiter = RM.RateLimiter(chat_rate=20, chat_burst=1)
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limiter=limiter)
+    other_reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limiter=limiter)
+
+    assert reporter._rate_limiter is limiter
+    assert RM.TelegramReporter("bot_token", "chat_id")._rate_limiter is RM.TelegramReporter("bot_token", "other_chat")._rate_limiter
+
+    reporter.send_message("Hello there")
+    start = time.monotonic()
+    other_reporter.send_message("Hello there")  # The budget is shared by both reporters
+    assert time.monotonic() - start > 0.025
+
+    try:
+        RM.TelegramReporter("bot_token", "chat_id", rate_limiter=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `rate_limiter` must be a RateLimiter type object or None, received object of type <class 'int'>"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_retry_after():
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False)
+    reporter._session._set_error_type(error_type="RetryAfter")
+
+    with pytest.warns(RuntimeWarning, match="the message will be retried in the background"):
+        assert reporter.send_message(message_text="Hello there") is None  # The caller does not wait for the retry
+    reporter.flush()
+    assert reporter._session["data"]["text"] == "Hello there"
+
+    reporter._session._set_error_type(error_type="RetryAfter")
+    with pytest.warns(RuntimeWarning, match="the edit will be retried in the background"):
+        assert reporter.edit_message("General Kenobi", "123") is None
+    reporter.close()
+    assert reporter._session["data"]["text"] == "General Kenobi"
+
+    reporter._session._set_error_type(error_type="RetryAfter")
+    with pytest.warns(RuntimeWarning, match="Failed sending to telegram. Reason"):
+        assert reporter.send_message(message_text="Hello there") is None  # No more retries once closed
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_no_retry_bad_request():
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False)
+    reporter._session._set_error_type(error_type="BadRequest")
+
+    with pytest.warns(RuntimeWarning, match="Telegram answered with error 400: Bad Request"):
+        assert reporter.send_message(message_text="Hello there") is None
+    assert not reporter._circuit_breaker.is_open
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_circuit_breaker():
+    policy = RM.RetryPolicy(max_retries=1, base_delay=0.001)
+    breaker = RM.CircuitBreaker(failure_threshold=3, cool_down=60)
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False, retry_policy=policy, circuit_breaker=breaker)
+    reporter._session._set_error_type(error_type="ConnectionError")
+
+    with pytest.warns(RuntimeWarning, match="retried in the background. Reason: ConnectionError"):
+        reporter.send_message(message_text="Hello there")
+    reporter.flush()  # The retries fail as well, which opens the circuit
+    assert breaker.is_open
+
+    reporter._session._set_error_type()
+    reporter._session._clear()
+    with pytest.warns(RuntimeWarning, match="not trying again"):
+        reporter.send_message(message_text="Hello there")
+    assert reporter._session._params == {}  # No request is made while the circuit is open
+
+    try:
+        RM.TelegramReporter("bot_token", "chat_id", retry_policy=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `retry_policy` must be a RetryPolicy type object or None, received object of type <class 'int'>"
+
+    try:
+        RM.TelegramReporter("bot_token", "chat_id", circuit_breaker=1)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `circuit_breaker` must be a CircuitBreaker type object or None, received object of type <class 'int'>"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_outbox():
+    outbox_path = Path(tempfile.gettempdir()) / "test_reporter_outbox.jsonl"
+    if outbox_path.exists():  # pragma: no cover
+        outbox_path.unlink()
+
+    policy = RM.RetryPolicy(max_retries=0)
+    breaker = RM.CircuitBreaker(failure_threshold=10)
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False, retry_policy=policy, circuit_breaker=breaker)
+    reporter.set_outbox(RM.TelegramOutbox(outbox_path))
+    assert reporter.outbox.path == outbox_path
+
+    reporter._session._set_error_type(error_type="ConnectionError")
+    with pytest.warns(RuntimeWarning, match="the message was stored in the outbox"):
+        assert reporter.send_message("Hello there") is None
+    with pytest.warns(RuntimeWarning, match="the edit was stored in the outbox"):
+        assert reporter.edit_message("First edit", "123") is None
+    with pytest.warns(RuntimeWarning, match="the edit was stored in the outbox"):
+        assert reporter.edit_message("Second edit", "123") is None
+    assert len(reporter.outbox.pending()) == 2
+    assert not reporter.replay_outbox()
+
+    reporter._session._set_error_type()
+    reporter._session._clear()
+    assert reporter.replay_outbox()
+    assert reporter._session["previous message"]["data"]["text"] == "Hello there"
+    assert reporter._session["data"]["text"] == "Second edit"
+    assert not outbox_path.exists()
+
+    try:
+        reporter.set_outbox(RM.TelegramOutbox(outbox_path))
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except RuntimeError as e:
+        assert str(e) == "The TelegramReporter already has an outbox"
+
+    reporter.close()
+
+    try:
+        reporter.set_outbox(None)
+        raise Exception("Passed through a fail condition without failing")  # pragma: no cover
+    except TypeError as e:
+        assert str(e) == "The `outbox` must be a TelegramOutbox type object, received object of type <class 'NoneType'>"
+
+
+@patch('requests.Session', new=SessionReplacement)  # To avoid sending actual http requests
+def test_telegram_reporter_asynchronous_outbox():
+    outbox_path = Path(tempfile.gettempdir()) / "test_reporter_outbox.jsonl"
+    if outbox_path.exists():  # pragma: no cover
+        outbox_path.unlink()
+
+    breaker = RM.CircuitBreaker(failure_threshold=1, cool_down=60)
+    reporter = RM.TelegramReporter("bot_token", "chat_id", rate_limit=False, asynchronous=True, circuit_breaker=breaker)
+    reporter.set_outbox(RM.TelegramOutbox(outbox_path))
+    breaker.record_failure()  # As if the network was down
+
+    message_future = reporter.submit_message("Status")
+    edit_future = reporter.submit_edit("Status edited", message_future)
+    reporter.flush()
+    assert not message_future.done()
+    assert not edit_future.done()
+    assert len(reporter.outbox.pending()) == 1
+
+    breaker.record_success()
+    assert reporter.replay_outbox()
+    assert message_future.result() == "This is the message ID"
+    assert edit_future.result() == "This is the message ID"
+    assert reporter._session["data"]["text"] == "Status edited"
+
+    reporter.close()